@@ -0,0 +1,88 @@
+"""
+Latency of delivering orderbook updates to 1, 5 and 20 callbacks, per delivery mode.
+The latency of an update is measured from the start of the delivery till the
+last callback has received it.
+
+    python -m test.bench_callbacks [n_updates]
+"""
+
+import random
+import sys
+import time
+
+from uxs.base.socket.callbacks import deliver, DELIVERY_MODES
+
+SUBSCRIBERS = (1, 5, 20)
+
+
+def synthetic_orderbook_stream(n, depth=50, seed=0):
+    rnd = random.Random(seed)
+    nonce = 0
+    for _ in range(n):
+        updates = {}
+        for side, sign in (("bids", -1), ("asks", 1)):
+            updates[side] = [
+                [
+                    round(100 + sign * rnd.randint(1, depth) / 100, 2),
+                    rnd.choice([0.0, rnd.randint(1, 1000) / 10]),
+                    rnd.choice([0.0, rnd.randint(1, 1000) / 10]),
+                ]
+                for _ in range(rnd.randint(1, 20))
+            ]
+        yield {
+            "_": "orderbook",
+            "symbol": "BTC/USDT",
+            "data": {
+                "symbol": "BTC/USDT",
+                "bids": updates["bids"],
+                "asks": updates["asks"],
+                "nonce": (nonce, nonce + 1),
+            },
+        }
+        nonce += 1
+
+
+def consumer(update):
+    # a typical consumer reads the best level of both sides
+    data = update["data"]
+    for side in ("bids", "asks"):
+        if len(data[side]):
+            data[side][0][2]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(n_updates=5000):
+    stream = list(synthetic_orderbook_stream(n_updates))
+    results = []
+    for n_subs in SUBSCRIBERS:
+        for delivery in DELIVERY_MODES:
+            callbacks = [(consumer, delivery)] * n_subs
+            latencies = []
+            for update in stream:
+                start = time.perf_counter()
+                deliver(callbacks, update)
+                latencies.append(time.perf_counter() - start)
+            results.append(
+                (
+                    n_subs,
+                    delivery,
+                    percentile(latencies, 0.5) * 1e6,
+                    percentile(latencies, 0.99) * 1e6,
+                )
+            )
+    return results
+
+
+def main():
+    n_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print("{:>11} {:>8} {:>10} {:>10}".format("subscribers", "delivery", "p50 us", "p99 us"))
+    for n_subs, delivery, p50, p99 in run(n_updates):
+        print("{:>11} {:>8} {:>10.1f} {:>10.1f}".format(n_subs, delivery, p50, p99))
+
+
+if __name__ == "__main__":
+    main()
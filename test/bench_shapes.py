@@ -0,0 +1,64 @@
+"""
+Enumeration of the shape tuples of the frozen multi-exchange markets fixture
+(test/data/shapes_markets.json): `get_shape_tuples` (materialized) vs
+`iter_shape_tuples` (streaming, serially and sharded across a process pool).
+
+    python -m test.bench_shapes [n ...]
+"""
+
+import json
+import os
+import sys
+import time
+
+from uxs.fintls.shapes import get_shape_tuples, iter_shape_tuples
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "shapes_markets.json")
+
+
+def load_markets_coll(path=FIXTURE):
+    with open(path) as f:
+        symbols_coll = json.load(f)
+    return {
+        xc: {s: dict(zip(("base", "quote"), s.split("/"))) for s in symbols}
+        for xc, symbols in symbols_coll.items()
+    }
+
+
+def measure(shape_tuples):
+    """:returns: (number of shape tuples, seconds till the first, total seconds)"""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in shape_tuples():
+        if not count:
+            first = time.perf_counter() - start
+        count += 1
+    return count, first, time.perf_counter() - start
+
+
+def run(n=(2, 3, 4)):
+    markets_coll = load_markets_coll()
+    n = list(n)
+    cases = [
+        ("get_shape_tuples", lambda: get_shape_tuples(n, markets_coll)),
+        ("iter_shape_tuples", lambda: iter_shape_tuples(n, markets_coll)),
+    ] + [
+        (
+            "iter_shape_tuples(processes={})".format(p),
+            lambda p=p: iter_shape_tuples(n, markets_coll, processes=p),
+        )
+        for p in (2, 4)
+    ]
+    return [(name,) + measure(shape_tuples) for name, shape_tuples in cases]
+
+
+def main():
+    n = [int(x) for x in sys.argv[1:]] or (2, 3, 4)
+    print("{:>32} {:>10} {:>10} {:>10}".format("", "shapes", "first s", "total s"))
+    for name, count, first, total in run(n):
+        print("{:>32} {:>10} {:>10.3f} {:>10.2f}".format(name, count, first, total))
+
+
+if __name__ == "__main__":
+    main()
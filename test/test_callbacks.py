@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from uxs.base.socket.callbacks import (
+    deliver,
+    freeze,
+    verify_delivery,
+    FrozenDict,
+    StreamQueue,
+)
+
+
+def _update():
+    return {
+        "_": "orderbook",
+        "symbol": "BTC/USDT",
+        "data": {"bids": [[1.0, 0.0, 2.0]], "asks": [], "nonce": (1, 2)},
+    }
+
+
+def test_delivery_modes():
+    update = _update()
+    received = []
+    callbacks = [
+        (received.append, "deep"),
+        (received.append, "shallow"),
+        (received.append, "shared"),
+        (received.append, "shared"),
+    ]
+    deliver(callbacks, update)
+    deep, shallow, shared, shared2 = received
+
+    assert deep == shallow == shared == update
+    assert deep is not update and deep["data"] is not update["data"]
+    assert shallow is not update and shallow["data"] is update["data"]
+    # "shared" callbacks receive the very same view
+    assert shared is shared2
+    assert isinstance(shared, FrozenDict)
+
+    received.clear()
+    deliver(callbacks, update, copy=False)
+    assert all(x is update for x in received)
+
+
+def test_frozen_view_is_read_only():
+    update = _update()
+    view = freeze(update)
+    assert view["data"]["bids"][0] == [1.0, 0.0, 2.0]
+    assert view["data"]["bids"][0][2] == 2.0
+    assert list(view["data"]["bids"]) == [[1.0, 0.0, 2.0]]
+    assert dict(view)["symbol"] == "BTC/USDT"
+
+    with pytest.raises(TypeError):
+        view["symbol"] = "ETH/USDT"
+    with pytest.raises(TypeError):
+        view["data"]["bids"][0][1] = 5.0
+    with pytest.raises(AttributeError):
+        view["data"]["bids"].append([0.5, 0.0, 1.0])
+
+    # the copy is mutable and detached from the original
+    copy = view.copy()
+    copy["data"]["bids"].clear()
+    assert update["data"]["bids"] == [[1.0, 0.0, 2.0]]
+
+
+def test_unknown_delivery():
+    with pytest.raises(ValueError):
+        verify_delivery("none")
+
+
+def _updates(symbols):
+    return [{"symbol": symbol, "data": i} for i, symbol in enumerate(symbols)]
+
+
+def test_stream_queue_overflow():
+    queue = StreamQueue(3, "drop_oldest")
+    for update in _updates("ABCDE"):
+        queue.put(update)
+    assert [queue.get_nowait()["data"] for _ in range(3)] == [2, 3, 4]
+    assert queue.dropped == 2
+
+    queue = StreamQueue(3, "coalesce", flatten=True)
+    queue.put(_updates("ABABC"))
+    assert [queue.get_nowait() for _ in range(3)] == [
+        {"symbol": "A", "data": 2},
+        {"symbol": "B", "data": 3},
+        {"symbol": "C", "data": 4},
+    ]
+    queue.put(_updates("ABCD"))
+    assert [x["symbol"] for x in queue._items.values()] == ["B", "C", "D"]
+
+    queue = StreamQueue(2, "block")
+    for update in _updates("ABCDE"):
+        queue.put(update)
+    assert len(queue) == 5 and queue.dropped == 0
+
+    with pytest.raises(ValueError):
+        StreamQueue(overflow="drop_newest")
+
+
+def test_stream_queue_iteration():
+    closed = []
+
+    async def consume(queue):
+        received = []
+        async for update in queue:
+            received.append(update["data"])
+            await asyncio.sleep(0)
+        return received
+
+    async def main():
+        queue = StreamQueue(10)
+        queue.add_close_callback(lambda: closed.append(True))
+        task = asyncio.ensure_future(consume(queue))
+        for update in _updates("ABC"):
+            queue.put(update)
+            await asyncio.sleep(0)
+        queue.put({"symbol": "D", "data": 3})
+        queue.close()
+        queue.put({"symbol": "E", "data": 4})
+        return await task
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert closed == [True]
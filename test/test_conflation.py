@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+from uxs.base.socket.conflation import Conflator, ObChanges, merge_ob_changes
+
+
+def _ob_update(bids, asks, nonce):
+    return {
+        "_": "orderbook",
+        "symbol": "BTC/USDT",
+        "data": {"symbol": "BTC/USDT", "bids": bids, "asks": asks, "nonce": nonce},
+    }
+
+
+def _xs(conflate, loop=None):
+    return SimpleNamespace(
+        conflate=conflate,
+        orderbooks={"BTC/USDT": {"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]]}},
+        tickers={},
+        loop=loop,
+    )
+
+
+def test_merge_ob_changes():
+    merged = merge_ob_changes(
+        _ob_update([[1.0, 0.0, 1.0], [0.9, 2.0, 3.0]], [], (1, 2))["data"],
+        _ob_update([[1.0, 1.0, 0.0], [0.9, 3.0, 4.0]], [[2.0, 0.0, 1.0]], (2, 3))[
+            "data"
+        ],
+    )
+    # the level 1.0 was added and removed again
+    assert merged == {
+        "symbol": "BTC/USDT",
+        "bids": [[0.9, 2.0, 4.0]],
+        "asks": [[2.0, 0.0, 1.0]],
+        "nonce": (1, 3),
+    }
+
+
+def test_top_only():
+    emitted = []
+    xs = _xs({"orderbook": {-1: {"top_only": True}}})
+    conflator = Conflator(xs, lambda *args: emitted.append(args[2]["data"]))
+
+    conflator.push("orderbook", "BTC/USDT", _ob_update([[1.0, 0.0, 1.0]], [], (0, 1)))
+    assert len(emitted) == 1
+
+    # the top didn't change
+    conflator.push("orderbook", "BTC/USDT", _ob_update([[0.5, 0.0, 1.0]], [], (1, 2)))
+    conflator.push("orderbook", "BTC/USDT", _ob_update([[0.4, 0.0, 1.0]], [], (2, 3)))
+    assert len(emitted) == 1
+
+    xs.orderbooks["BTC/USDT"]["asks"] = [[1.5, 1.0]]
+    conflator.push("orderbook", "BTC/USDT", _ob_update([], [[1.5, 0.0, 1.0]], (3, 4)))
+    assert emitted[1] == {
+        "symbol": "BTC/USDT",
+        "bids": [[0.5, 0.0, 1.0], [0.4, 0.0, 1.0]],
+        "asks": [[1.5, 0.0, 1.0]],
+        "nonce": (1, 4),
+    }
+    assert not conflator.pending
+
+
+def test_merge_in_place():
+    emitted = []
+    xs = _xs({"orderbook": {-1: {"top_only": True}}})
+    conflator = Conflator(xs, lambda *args: emitted.append(args[2]["data"]))
+    conflator.push("orderbook", "BTC/USDT", _ob_update([[1.0, 0.0, 1.0]], [], (0, 1)))
+
+    for i in range(1, 101):
+        update = _ob_update([[1.0 - i / 1000, 0.0, float(i)]], [], (i, i + 1))
+        conflator.push("orderbook", "BTC/USDT", update)
+        changes = conflator.pending["orderbook", "BTC/USDT"]["data"]
+        if i == 1:
+            # nothing to merge yet
+            assert not isinstance(changes, ObChanges)
+        elif i == 2:
+            first = changes
+        else:
+            # the same (unsorted) accumulator is updated
+            assert changes is first
+    assert not emitted[1:]
+
+    conflator.flush("orderbook", "BTC/USDT")
+    bids = emitted[-1]["bids"]
+    assert len(bids) == 100
+    assert bids[0] == [0.999, 0.0, 1.0] and bids[-1] == [0.9, 0.0, 100.0]
+    assert emitted[-1]["nonce"] == (1, 101)
+
+
+def test_interval():
+    emitted = []
+
+    async def main():
+        xs = _xs({"ticker": {"BTC/USDT": {"interval": 0.05}}}, asyncio.get_running_loop())
+        conflator = Conflator(xs, lambda *args: emitted.append(args[2]["data"]))
+        assert not conflator.is_enabled("ticker", "ETH/USDT")
+        for i in range(10):
+            update = {"_": "ticker", "symbol": "BTC/USDT", "data": {"last": i}}
+            if i == 5:
+                update["data"]["bid"] = 1.0
+            conflator.push("ticker", "BTC/USDT", update)
+            await asyncio.sleep(0)
+        assert emitted == [{"last": 0}]
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert emitted == [{"last": 0}, {"last": 9, "bid": 1.0}]
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from uxs.base.ccxt import ccxtWrapper
+from uxs.fintls.basics import calc_price, create_cy_graph, find_optimal_paths
+from uxs.fintls.conversion import ConversionTable
+
+QUOTES = ["BTC", "USDT", "ETH", "BNB"]
+
+
+def _prices(seed=0):
+    rnd = random.Random(seed)
+    prices = {}
+    for i in range(100):
+        for q in rnd.sample(QUOTES, rnd.randint(1, 3)):
+            prices["C{}/{}".format(i, q)] = rnd.uniform(0.1, 10)
+    prices.update(
+        {
+            "BTC/USDT": 60000,
+            "ETH/BTC": 0.05,
+            "BNB/ETH": 0.2,
+            "ETH/USDT": 3000,
+            # not connected to the rest
+            "X/Y": 2.0,
+        }
+    )
+    return prices
+
+
+@pytest.mark.parametrize("target", ["BTC", "USDT", "BNB", "Y"])
+def test_calc_prices(target):
+    prices = _prices()
+    graph = create_cy_graph(prices)
+    table = ConversionTable(graph)
+    result = table.calc_prices(prices, target)
+    for cy in graph:
+        try:
+            expected = calc_price((cy, target), prices, graph)
+        except RuntimeError:
+            assert cy not in result
+            with pytest.raises(RuntimeError):
+                table.calc_price((cy, target), prices)
+        else:
+            assert result[cy] == pytest.approx(expected)
+            assert table.calc_price((cy, target), prices) == pytest.approx(expected)
+        if cy != target:
+            assert table.get_paths(cy, target) == find_optimal_paths(cy, target, graph)
+
+
+def test_max_len():
+    prices = {"A/B": 2.0, "B/C": 3.0, "C/D": 4.0}
+    assert ConversionTable(list(prices)).calc_prices(prices, "D") == {
+        "A": 24.0,
+        "B": 12.0,
+        "C": 4.0,
+        "D": 1.0,
+    }
+    assert "A" not in ConversionTable(list(prices), max_len=3).calc_prices(prices, "D")
+
+
+def test_incremental():
+    prices = _prices()
+    table = ConversionTable(list(prices))
+    result = table.calc_prices(prices, "BTC")
+
+    changed = {"ETH/BTC": 0.06, "C5/USDT": 99.0, "X/Y": 3.0}
+    prices.update(changed)
+    affected = table.get_affected(changed, "BTC")
+    assert "ETH" in affected and "BNB" in affected
+    # C5/BTC is used directly
+    assert "C5" not in affected and "X" not in affected
+    result.update(table.calc_prices(prices, "BTC", affected))
+    assert result == pytest.approx(table.calc_prices(prices, "BTC"))
+
+
+def test_convert_volumes():
+    prices = _prices(1)
+    tickers = {s: {"last": p, "baseVolume": 10.0} for s, p in prices.items()}
+    graph = create_cy_graph(prices)
+    volumes = ccxtWrapper.convert_volumes(tickers, "USDT", sort=True)
+    expected = {}
+    for s in prices:
+        try:
+            price = calc_price("{}/USDT".format(s.split("/")[0]), prices, graph)
+        except RuntimeError:
+            continue
+        expected[s] = price * 10.0
+    assert volumes == pytest.approx(expected)
+    assert list(volumes.values()) == sorted(volumes.values(), reverse=True)
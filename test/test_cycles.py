@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from uxs.fintls.cycles import CycleEvaluator
+from uxs.fintls.shapes import Shape, ShapeTable
+
+TRIANGLE = Shape(
+    (
+        ("a", "BTC/USDT", "BTC", "USDT"),
+        ("a", "ETH/BTC", "ETH", "BTC"),
+        ("a", "ETH/USDT", "ETH", "USDT"),
+    )
+)
+PAIR = Shape((("a", "BTC/USDT", "BTC", "USDT"), ("b", "BTC/USDT", "BTC", "USDT")))
+
+
+def _ob(bid, ask, amount=1.0, levels=3, step=0.01):
+    return {
+        "bids": [[bid * (1 - step * i), amount] for i in range(levels)],
+        "asks": [[ask * (1 + step * i), amount] for i in range(levels)],
+    }
+
+
+def _manual_return(path, obs, fee):
+    r = 1.0
+    for xc, symbol, direction in path.entities:
+        ob = obs[xc, symbol]
+        if direction:
+            r *= (1 - fee) / ob["asks"][0][0]
+        else:
+            r *= ob["bids"][0][0] * (1 - fee)
+    return r
+
+
+def test_returns():
+    ev = CycleEvaluator([TRIANGLE, PAIR], fees=0.001)
+    assert len(ev) == 4
+    assert len(ev.get_rows("a", "BTC/USDT")) == 4
+    assert len(ev.get_rows("b", "BTC/USDT")) == 2
+    assert np.isnan(ev.returns).all()
+
+    obs = {
+        ("a", "BTC/USDT"): _ob(100.0, 100.1),
+        ("a", "ETH/BTC"): _ob(0.05, 0.0501),
+        ("a", "ETH/USDT"): _ob(5.2, 5.21),
+        ("b", "BTC/USDT"): _ob(99.0, 99.1),
+    }
+    for (xc, symbol), ob in obs.items():
+        ev.update_orderbook(xc, symbol, ob)
+    for path, r in zip(ev.paths, ev.returns):
+        assert r == pytest.approx(_manual_return(path, obs, 0.001))
+
+    # only the rows of the market are recomputed
+    rows = ev.update_ticker("b", "BTC/USDT", {"bid": 101.0, "ask": 101.1})
+    assert sorted(rows) == sorted(ev.get_rows("b", "BTC/USDT"))
+
+    top = ev.top(10)
+    assert [r for _, r in top] == sorted((r for _, r in top), reverse=True)
+    assert all(r > 1 for _, r in top)
+    # buy BTC/USDT on a, sell on b
+    returns = {path.entities: r for path, r in top}
+    assert returns[("a", "BTC/USDT", 1), ("b", "BTC/USDT", 0)] == pytest.approx(
+        0.999 / 100.1 * 101.0 * 0.999
+    )
+    assert ev.top(1) == top[:1]
+    assert ev.top(min_return=top[0][1]) == []
+
+
+def test_size():
+    ev = CycleEvaluator([PAIR], depth=2)
+    ev.update_orderbook("a", "BTC/USDT", _ob(99.0, 100.0, levels=3, step=0.01))
+    ev.update_orderbook("b", "BTC/USDT", _ob(101.5, 102.0, levels=3, step=0.01))
+    (path, _), *_ = ev.top()
+    assert ev.vwap_returns[ev.get_row(path)] == pytest.approx(
+        (101.5 + 101.5 * 0.99) / (100.0 + 101.0)
+    )
+
+    sized = ev.size(path)
+    # buying at 100 and selling at 101.5 is profitable, 101 -> 100.485 is not
+    assert sized["amount"] == pytest.approx(100.0, rel=1e-6)
+    assert sized["amount_out"] == pytest.approx(101.5, rel=1e-6)
+    assert sized["profit"] > 0 and sized["return"] > 1
+
+    assert ev.size(path, max_amount=50)["amount"] == 50
+    assert ev.size(ev.get_row(path)) == sized
+    with pytest.raises(ValueError):
+        ev.get_row(TRIANGLE.get_path(0, 1))
+
+    # not profitable
+    ev.update_ticker("b", "BTC/USDT", {"bid": 99.0, "ask": 99.5})
+    ev.update_orderbook("b", "BTC/USDT", _ob(99.0, 99.5))
+    assert ev.top() == []
+    assert ev.size(path)["amount"] == 0
+
+
+def test_shape_table():
+    ev = CycleEvaluator([TRIANGLE, PAIR])
+    ev_table = CycleEvaluator(ShapeTable([TRIANGLE, PAIR]))
+    assert [p.entities for p in ev_table.paths] == [p.entities for p in ev.paths]
+    assert ev_table.markets == ev.markets
+    ev_table.update_orderbook("a", "BTC/USDT", _ob(99.0, 100.0))
+    ev_table.update_orderbook("b", "BTC/USDT", _ob(101.5, 102.0))
+    (path, r), *_ = ev_table.top()
+    assert path.entities == (("a", "BTC/USDT", 1), ("b", "BTC/USDT", 0))
+    assert ev_table.size(path)["amount"] == pytest.approx(100.0, rel=1e-6)
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+import uxs
+from uxs.base.socket import exchange
+
+
+class _Api:
+    has = {}
+    markets = None
+    exceptions = {}
+
+    def __init__(self, params):
+        self.params = params
+        self.synced = set()
+
+    def sync_with_other(self, other):
+        self.synced.add(other)
+        other.synced.add(self)
+
+    def _ensure_no_nulls(self):
+        pass
+
+    async def poll_load_markets(self, limit=None):
+        self.markets = {"BTC/USDT": {"symbol": "BTC/USDT"}}
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def _xs(monkeypatch, pro_supported=True):
+    created = []
+
+    def init_exchange(params):
+        if params.get("pro") and not pro_supported:
+            raise ImportError("ccxtpro")
+        api = _Api(params)
+        created.append(api)
+        return api
+
+    monkeypatch.setattr(exchange, "init_exchange", init_exchange)
+    return uxs.binance(), created
+
+
+def test_secondary_apis_created_on_access(loop, monkeypatch):
+    xs, created = _xs(monkeypatch)
+    # only the async api is created at init
+    assert created == [xs.api]
+    assert xs.api.params["async"] is True
+    assert xs._snapi is None and xs._pro is None
+
+    snapi = xs.snapi
+    assert created == [xs.api, snapi]
+    assert snapi.params["async"] is False and "pro" not in snapi.params
+    assert snapi.params["kwargs"]["load_cached_markets"] is False
+    assert snapi.synced == {xs.api}
+    assert xs.snapi is snapi
+
+    pro = xs.pro
+    assert created == [xs.api, snapi, pro]
+    assert pro.params["pro"] is True and pro.params["async"] is True
+    assert pro.synced == {xs.api, snapi}
+    assert xs.pro is pro
+    assert len(created) == 3
+
+
+@pytest.mark.parametrize("use_pro", [False, True])
+def test_pro_not_supported(loop, monkeypatch, use_pro):
+    xs, created = _xs(monkeypatch, pro_supported=False)
+    xs.use_pro = use_pro
+    if use_pro:
+        with pytest.raises(exchange.ccxt.NotSupported):
+            xs.pro
+    else:
+        assert xs.pro is None
+    # only attempted once
+    assert xs.pro is None
+    assert created == [xs.api]
+
+
+def test_start_does_not_create_snapi(loop, monkeypatch):
+    xs, created = _xs(monkeypatch)
+
+    async def idle():
+        pass
+
+    xs.poll_loop = xs.fetch_data_loop = idle
+    loop.run_until_complete(xs.on_start())
+    loop.run_until_complete(asyncio.gather(*xs._futures.values()))
+    assert xs.api.markets == {"BTC/USDT": {"symbol": "BTC/USDT"}}
+    # the markets are already loaded
+    assert xs.sn_load_markets() is xs.api.markets
+    assert xs._snapi is None
+    assert created == [xs.api]
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+import pytest
+
+from uxs.fintls.impact import BranchDepth, BookDepth
+from uxs.fintls.ob import get_to_matching_volume, get_to_matching_price
+
+rnd = random.Random(0)
+ASKS = [[100 + i * 0.5, rnd.randint(1, 10) / 2] for i in range(30)]
+BIDS = [[99.5 - i * 0.5, rnd.randint(1, 10) / 2] for i in range(30)]
+
+
+@pytest.mark.parametrize("side, branch", [("bids", BIDS), ("asks", ASKS)])
+@pytest.mark.parametrize("unit", ["base", "quote"])
+def test_by_volume(side, branch, unit):
+    depth = BranchDepth(branch, side)
+    cum = depth.cum_base if unit == "base" else depth.cum_quote
+    # incl. exactly the cumulative volume of a level
+    volumes = [rnd.uniform(0.01, cum[-1]) for _ in range(20)] + [float(cum[3])]
+    result = depth.by_volume(volumes, unit)
+    for j, volume in enumerate(volumes):
+        expected = get_to_matching_volume(branch, volume, unit=unit)
+        for key in ("price", "vwap", "remainder", "cumother", "i"):
+            assert result[key][j] == pytest.approx(expected[key])
+
+
+def test_by_volume_exhausted():
+    depth = BranchDepth(ASKS, "asks")
+    result = depth.by_volume(1000)
+    assert result["price"] == ASKS[-1][0]
+    assert result["i"] == len(ASKS)
+    assert result["remainder"] == pytest.approx(sum(x[1] for x in ASKS) - 1000)
+    assert result["vwap"] == pytest.approx(depth.cum_quote[-1] / depth.cum_base[-1])
+
+    result = BranchDepth([], "asks").by_volume([1, 2])
+    assert np.isnan(result["price"]).all()
+    assert result["remainder"].tolist() == [-1, -2]
+
+
+@pytest.mark.parametrize("side, branch", [("bids", BIDS), ("asks", ASKS)])
+@pytest.mark.parametrize("closed", [True, False])
+def test_by_price(side, branch, closed):
+    depth = BranchDepth(branch, side)
+    prices = [rnd.uniform(80, 120) for _ in range(20)] + [branch[5][0]]
+    result = depth.by_price(prices, closed)
+    for j, price in enumerate(prices):
+        expected = get_to_matching_price(branch, price, side, closed)
+        for key in ("volume", "cumother", "i"):
+            assert result[key][j] == pytest.approx(expected[key])
+        if expected["volume"]:
+            assert result["vwap"][j] == pytest.approx(expected["vwap"])
+        remainder = result["remainder"][j].tolist()
+        if expected["remainder"][0] is None:
+            assert np.isnan(remainder[0]) and remainder[1] == 0
+        else:
+            assert remainder == list(expected["remainder"])
+
+
+def test_book_depth():
+    ob = {"symbol": "BTC/USDT", "bids": BIDS, "asks": ASKS, "nonce": 5}
+    depth = BookDepth(ob)
+    assert depth["bids"] is depth.bids and len(depth.asks) == len(ASKS)
+    with pytest.raises(KeyError):
+        depth["buy"]
@@ -0,0 +1,85 @@
+"""
+Cold import time of uxs, and of uxs + a single streamer class.
+Each measurement runs in a fresh interpreter.
+
+    python -m test.test_import_time
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_UXS = "import uxs"
+GET_STREAMER = "import uxs; uxs.get_streamer_cls('binance')"
+
+REPORT = """
+import sys, time
+t0 = time.perf_counter()
+{code}
+t = time.perf_counter() - t0
+print(json.dumps({{
+    "seconds": t,
+    "streamers": sorted(m for m in uxs.STREAMERS.values() if m in sys.modules),
+}}))
+"""
+
+
+def measure(code):
+    out = subprocess.run(
+        [sys.executable, "-c", "import json\n" + REPORT.format(code=code)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def test_import_uxs():
+    result = measure(IMPORT_UXS)
+    print("import uxs: {:.3f}s".format(result["seconds"]))
+    assert result["streamers"] == []
+
+
+def test_get_streamer_cls():
+    result = measure(GET_STREAMER)
+    print("import uxs + binance: {:.3f}s".format(result["seconds"]))
+    assert result["streamers"] == ["uxs.binance"]
+
+
+def test_submodule_import():
+    # importing the submodules directly must not shadow the classes
+    code = (
+        "import uxs\n"
+        "from uxs.binancefutures import binancefutures\n"
+        "from uxs import kraken\n"
+        "import uxs.kucoin\n"
+        "for name in ('binance', 'binancefutures', 'kraken', 'kucoin'):\n"
+        "    cls = getattr(uxs, name)\n"
+        "    assert isinstance(cls, type) and cls.__name__ == name, cls\n"
+        "    assert uxs.get_streamer_cls(name) is cls\n"
+        "assert uxs.binancefutures is binancefutures\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_lazy_registry():
+    import uxs
+
+    assert uxs.list_streaming_exchanges() == sorted(uxs.STREAMERS)
+    cls = uxs.get_streamer_cls("Binance")
+    assert uxs.binance is cls
+    assert issubclass(cls, uxs.ExchangeSocket)
+    assert "kraken" in dir(uxs)
+    with pytest.raises(ValueError):
+        uxs.get_streamer_cls("nonexistent")
+
+
+def main():
+    for code in (IMPORT_UXS, GET_STREAMER):
+        print("{:<45} {:.3f}s".format(code, measure(code)["seconds"]))
+
+
+if __name__ == "__main__":
+    main()
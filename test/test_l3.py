@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from uxs.fintls.l3 import (
+    create_l3_branch,
+    update_l3_branch,
+    get_l3_loc_by_id,
+    assert_l3_integrity,
+    L3Branch,
+    L2Aggregator,
+    l3_to_l2,
+)
+
+
+def _random_l3_updates(n=3000, seed=0):
+    rnd = random.Random(seed)
+    updates = []
+    for _ in range(n):
+        side = rnd.choice(["bids", "asks"])
+        offset = rnd.randint(1, 30) / 10
+        price = round(100 - offset if side == "bids" else 100 + offset, 1)
+        id = rnd.randint(0, 400) * 2 + (side == "asks")
+        amount = rnd.choice([0, rnd.randint(1, 100) / 10, rnd.randint(1, 100) / 10])
+        updates.append((side, [price, amount, id]))
+    return updates
+
+
+def test_index_engine_matches_list():
+    ref = {"bids": [], "asks": []}
+    ob = {side: create_l3_branch("index", side) for side in ("bids", "asks")}
+
+    for side, item in _random_l3_updates():
+        r0 = update_l3_branch(item, ref[side], side)
+        r1 = update_l3_branch(item, ob[side], side)
+        assert r0 == r1
+        assert len(ob[side]) == len(ref[side])
+        assert ob[side][:1] == ref[side][:1]
+
+    assert ob["bids"] == ref["bids"]
+    assert ob["asks"] == ref["asks"]
+    assert_l3_integrity(ob)
+
+    for side in ("bids", "asks"):
+        for loc, x in enumerate(ref[side][:50]):
+            assert get_l3_loc_by_id(ob[side], x[2]) == loc
+
+
+def test_queue_position():
+    branch = create_l3_branch("index", "asks", [[1.0, 1.0, "a"], [2.0, 3.0, "b"]])
+    assert isinstance(branch, L3Branch)
+    update_l3_branch([2.0, 2.0, "c"], branch, "asks")
+    update_l3_branch([2.0, 4.0, "d"], branch, "asks")
+    assert branch.get_queue_position("d") == {
+        "price": 2.0,
+        "position": 2,
+        "amount_ahead": 5.0,
+    }
+    # amount change keeps the place in the queue
+    assert update_l3_branch([2.0, 1.0, "b"], branch, "asks") == (
+        2.0,
+        1.0,
+        "b",
+        2.0,
+        3.0,
+    )
+    assert branch.get_queue_position("d")["amount_ahead"] == 3.0
+    # moving the order to another price returns its previous price and amount
+    assert update_l3_branch([1.0, 1.0, "b"], branch, "asks") == (
+        1.0,
+        1.0,
+        "b",
+        2.0,
+        1.0,
+    )
+    assert [x[2] for x in branch] == ["a", "b", "c", "d"]
+    assert branch.get_queue_position("d")["position"] == 1
+    assert branch.get_queue_position("x") is None
+    with pytest.raises(ValueError):
+        create_l3_branch("bisect", "asks")
+
+
+def test_l2_aggregator_matches_l3_to_l2():
+    ob = {"symbol": "X", "bids": [], "asks": []}
+    aggregator = L2Aggregator(ob, round_to=8)
+    l2 = {"bids": {}, "asks": {}}
+
+    for side, item in _random_l3_updates(seed=4):
+        p, a, id, p0, a0 = update_l3_branch(item, ob[side], side)
+        deltas = [(p, a - a0)] if p == p0 else [(p0, -a0), (p, a)]
+        for price, total in aggregator.apply(side, deltas):
+            if total:
+                l2[side][price] = total
+            else:
+                l2[side].pop(price, None)
+
+    expected = l3_to_l2(ob, 8)
+    result = aggregator.to_l2(ob)
+    assert result["symbol"] == "X"
+    for side in ("bids", "asks"):
+        assert result[side] == [list(x) for x in expected[side]]
+        assert sorted(l2[side].items()) == sorted(expected[side])
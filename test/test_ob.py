@@ -0,0 +1,155 @@
+import copy
+import pickle
+import random
+import zlib
+
+import pytest
+
+from uxs.fintls.ob import (
+    update_branch,
+    update_branch_batch,
+    truncate_branch,
+    assert_integrity,
+)
+from uxs.fintls.ob_engines import create_branch, BisectBranch, SortedBranch
+from uxs.fintls.checksum import kraken_checksum, decimals_from_precision
+
+ENGINES = ["bisect", "sorted"]
+
+
+def _random_updates(n=2000, seed=0):
+    rnd = random.Random(seed)
+    updates = []
+    for _ in range(n):
+        side = rnd.choice(["bids", "asks"])
+        offset = rnd.randint(1, 60) / 10
+        price = round(100 - offset if side == "bids" else 100 + offset, 1)
+        amount = rnd.choice([0, 0, rnd.randint(1, 100) / 10])
+        updates.append((side, [price, amount]))
+    return updates
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("is_delta", [False, True])
+def test_engine_matches_list(engine, is_delta):
+    ref = {"bids": [], "asks": []}
+    ob = {side: create_branch(engine, side) for side in ("bids", "asks")}
+    rnd = random.Random(1)
+
+    for side, item in _random_updates():
+        if is_delta and item[1]:
+            item = [item[0], rnd.choice([-1, 1]) * item[1]]
+        r0 = update_branch(item, ref[side], side, is_delta=is_delta, round_to=8)
+        r1 = update_branch(item, ob[side], side, is_delta=is_delta, round_to=8)
+        assert r0 == r1
+        assert ob[side][:1] == ref[side][:1]
+        assert len(ob[side]) == len(ref[side])
+
+    assert ob["bids"] == ref["bids"]
+    assert ob["asks"] == ref["asks"]
+    assert_integrity(ob)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_list_interface(engine):
+    branch = create_branch(engine, "asks", [[1.0, 1.0], [2.0, 2.0]])
+    update_branch([1.5, 3.0], branch, "asks")
+    assert list(branch) == [[1.0, 1.0], [1.5, 3.0], [2.0, 2.0]]
+    assert branch[-1] == [2.0, 2.0]
+    assert branch[1:] == [[1.5, 3.0], [2.0, 2.0]]
+
+    # modifying via the list interface must keep the engine consistent
+    del branch[0]
+    assert update_branch([1.5, 0], branch, "asks") == (1.5, 3.0, 0.0)
+    assert branch == [[2.0, 2.0]]
+
+    branch.reverse()
+    assert update_branch([1.0, 1.0], branch, "asks") == (1.0, 0.0, 1.0)
+    assert branch == [[1.0, 1.0], [2.0, 2.0]]
+
+    branch.clear()
+    branch += [[3.0, 1.0]]
+    assert update_branch([2.5, 1.0], branch, "asks") == (2.5, 0.0, 1.0)
+    assert branch == [[2.5, 1.0], [3.0, 1.0]]
+
+    for copied in (copy.copy(branch), copy.deepcopy(branch)):
+        assert type(copied) is list
+        assert copied == [[2.5, 1.0], [3.0, 1.0]]
+    assert pickle.loads(pickle.dumps(branch)) == [[2.5, 1.0], [3.0, 1.0]]
+
+
+def test_new_level_prev_amount():
+    branch = [[3.0, 5.0]]
+    assert update_branch([1.0, 1.0], branch, "asks") == (1.0, 0.0, 1.0)
+    assert isinstance(create_branch("bisect", "bids"), BisectBranch)
+    assert isinstance(create_branch("sorted", "bids"), SortedBranch)
+    assert type(create_branch(None, "bids")) is list
+
+
+@pytest.mark.parametrize("engine", ["list"] + ENGINES)
+@pytest.mark.parametrize("is_delta", [False, True])
+def test_batch_matches_sequential(engine, is_delta):
+    ref = {"bids": [], "asks": []}
+    ob = {side: create_branch(engine, side) for side in ("bids", "asks")}
+    updates = _random_updates(4000, seed=2)
+    rnd = random.Random(3)
+
+    for start in range(0, len(updates), 200):
+        chunk = updates[start : start + 200]
+        for side in ("bids", "asks"):
+            items = [x for s, x in chunk if s == side]
+            if is_delta:
+                items = [[p, rnd.choice([-1, 1]) * a] for p, a in items]
+            uniq = {}
+            for item in items:
+                p, a0, a = update_branch(
+                    item, ref[side], side, is_delta=is_delta, round_to=8
+                )
+                uniq[p] = [p, uniq[p][1] if p in uniq else a0, a]
+            changes = update_branch_batch(
+                items, ob[side], side, is_delta=is_delta, round_to=8
+            )
+            assert ob[side] == ref[side]
+            assert changes == sorted(uniq.values(), reverse=(side == "bids"))
+
+    assert_integrity(ob)
+
+
+@pytest.mark.parametrize("engine", ["list"] + ENGINES)
+def test_kraken_checksum(engine):
+    ob = {
+        "bids": create_branch(engine, "bids", [[0.5666, 4.8318], [0.5665, 0.01]]),
+        "asks": create_branch(engine, "asks", [[0.5668, 4.0], [0.5669, 11.1]]),
+    }
+    calc = kraken_checksum(price_decimals=4, amount_decimals=8, depth=10)
+    expected = "5668" "400000000" "5669" "1110000000" "5666" "483180000" "5665" "1000000"
+    assert calc(ob) == zlib.crc32(expected.encode())
+
+    update_branch([0.5669, 0], ob["asks"], "asks")
+    expected = expected.replace("5669" "1110000000", "")
+    assert calc(ob) == zlib.crc32(expected.encode())
+
+    calc = kraken_checksum(4, 8, depth=1)
+    assert calc(ob) == zlib.crc32(b"5668" b"400000000" b"5666" b"483180000")
+    assert decimals_from_precision(0.0001) == decimals_from_precision(4) == 4
+
+
+@pytest.mark.parametrize("engine", ["list"] + ENGINES)
+def test_truncate_branch(engine):
+    branch = create_branch(engine, "bids", [[10.0, 1.0], [9.0, 1.0], [8.0, 1.0]])
+    changes = update_branch_batch([[9.5, 2.0], [8.0, 3.0], [7.0, 1.0]], branch, "bids")
+    changes = truncate_branch(branch, 2, changes, "bids")
+    assert list(branch) == [[10.0, 1.0], [9.5, 2.0]]
+    # 7.0 was added and cut off, 9.0 was pushed beyond the limit
+    assert changes == [[9.5, 0.0, 2.0], [9.0, 1.0, 0.0], [8.0, 1.0, 0.0]]
+    assert truncate_branch(branch, 2, changes, "bids") is changes
+
+    # engines keep their index
+    if engine == "bisect":
+        assert branch._keys == [-10.0, -9.5]
+    elif engine == "sorted":
+        assert list(branch._levels) == [10.0, 9.5]
+    update_branch([9.7, 1.0], branch, "bids")
+    truncate_branch(branch, 2, side="bids")
+    update_branch([9.8, 1.0], branch, "bids")
+    assert list(branch) == [[10.0, 1.0], [9.8, 1.0], [9.7, 1.0]]
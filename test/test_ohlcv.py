@@ -10,3 +10,30 @@ def test_yf_download():
         uxs.get_sn_exchange("binance"), currencies, since, until
     )
     print(df)
+
+
+def _trade(id, timestamp, price, amount=1.0):
+    return {"id": str(id), "timestamp": timestamp, "price": price, "amount": amount}
+
+
+def test_candle_builder():
+    builder = uxs.fintls.ohlcv.CandleBuilder(["1s", "1m", "1w"])
+    key = lambda x: int(x["id"])
+    changed = builder.add_trades(
+        [_trade(1, 60_500, 10.0), _trade(2, 60_900, 12.0), _trade(3, 61_000, 9.0)], key
+    )
+    assert changed["1s"] == [[60_000, 10.0, 12.0, 10.0, 12.0, 2.0], [61_000, 9.0, 9.0, 9.0, 9.0, 1.0]]
+    assert changed["1m"] == [[60_000, 10.0, 12.0, 9.0, 9.0, 3.0]]
+    # weeks start on Monday
+    assert changed["1w"][0][0] == -3 * 86400_000
+
+    # resent trades are skipped
+    assert builder.add_trades([_trade(3, 61_000, 9.0)], key) == {}
+
+    # late trade (by timestamp) updates the earlier candle, but not its close
+    builder.add_trades([_trade(4, 60_100, 13.0)], key)
+    assert list(builder.candles["1s"]) == [
+        [60_000, 10.0, 13.0, 10.0, 12.0, 3.0],
+        [61_000, 9.0, 9.0, 9.0, 9.0, 1.0],
+    ]
+    assert list(builder.candles["1m"]) == [[60_000, 10.0, 13.0, 9.0, 13.0, 4.0]]
@@ -0,0 +1,80 @@
+import random
+from types import SimpleNamespace
+
+from uxs.base.socket.orderbook import OrderbookMaintainer, UpdateCache
+
+
+def _update(id, nonce, hold_until=None):
+    u = {"symbol": "X", "__id__": id, "nonce": nonce}
+    if hold_until is not None:
+        u["__hold_until__"] = hold_until
+    return u
+
+
+def _start_after_nonce(updates, nonce):
+    return next(
+        (len(updates) - i for i, u in enumerate(reversed(updates)) if u["nonce"] <= nonce),
+        0,
+    )
+
+
+def test_update_cache_matches_list():
+    rnd = random.Random(0)
+    cache = UpdateCache(50)
+    ref = []
+    nonce = 0
+    for id in range(2000):
+        # nonces are increasing, occasionally out of order
+        nonce += rnd.choice([1, 1, 1, 2, -3])
+        cache.append(_update(id, nonce))
+        ref.append(_update(id, nonce))
+        ref = ref[-50:]
+        if rnd.random() < 0.05:
+            n = rnd.randint(0, 20)
+            cache.drop_before(n)
+            ref = ref[n:]
+
+        assert len(cache) == len(ref)
+        assert list(cache) == ref
+        assert list(reversed(cache)) == ref[::-1]
+        assert cache[3:10] == ref[3:10]
+        if ref:
+            assert cache[-1] == ref[-1]
+            assert cache.loc_by_id(ref[-1]["__id__"]) == len(ref) - 1
+            assert cache.loc_by_id(ref[0]["__id__"] - 1) is None
+        probe = nonce - rnd.randint(0, 30)
+        assert cache.start_after_nonce(probe) == _start_after_nonce(ref, probe)
+
+
+def test_update_cache_holds():
+    cache = UpdateCache()
+    for id, hold_until in enumerate([None, 10, None, 5, 20, None]):
+        cache.append(_update(id, id, hold_until))
+    assert cache.first_held(now=0) == 1
+    assert cache.first_held(now=0, start=2) == 3
+    cache.drop_before(2)
+    assert cache.first_held(now=0) == 1
+    assert cache.first_held(now=7) == 2
+    # expired holds are discarded
+    assert cache.first_held(now=30) is None
+    cache.clear()
+    assert not cache and cache.first_held(now=0) is None
+
+
+def test_verify_checksum_unsupported():
+    logged = []
+    xs = SimpleNamespace(name="x", log=logged.append, calc_ob_checksum=lambda ob: None)
+    maintainer = SimpleNamespace(
+        name="orderbook",
+        xs=xs,
+        data={"X": {"bids": [], "asks": []}},
+        cache={"X": {}},
+    )
+    # the exchange can't calculate it: skipped, with a warning logged once
+    assert OrderbookMaintainer.verify_checksum(maintainer, "X", 123)
+    assert OrderbookMaintainer.verify_checksum(maintainer, "X", 123)
+    assert len(logged) == 1
+
+    xs.calc_ob_checksum = lambda ob: 456
+    assert not OrderbookMaintainer.verify_checksum(maintainer, "X", 123)
+    assert OrderbookMaintainer.verify_checksum(maintainer, "X", 456)
@@ -0,0 +1,50 @@
+import pickle
+import random
+
+from uxs.base.socket.orders import OpenOrders, FillList
+
+
+def _order(id, symbol, side, price):
+    return {"id": id, "symbol": symbol, "side": side, "price": price}
+
+
+def test_open_orders_index():
+    rnd = random.Random(0)
+    open_orders = OpenOrders()
+    for i in range(500):
+        id = rnd.randint(0, 50)
+        if rnd.random() < 0.3:
+            open_orders.pop(id, None)
+            continue
+        open_orders[id] = _order(
+            id, rnd.choice(["A", "B"]), rnd.choice(["buy", "sell"]), rnd.randint(1, 20)
+        )
+        if rnd.random() < 0.1:
+            open_orders[id]["price"] = rnd.randint(1, 20)
+            open_orders.reindex(id)
+
+        for symbol in ("A", "B"):
+            for side, ob_side in (("buy", "bids"), ("sell", "asks")):
+                expected = {
+                    k: o
+                    for k, o in open_orders.items()
+                    if o["symbol"] == symbol and o["side"] == side
+                }
+                assert open_orders.get_orders(symbol, ob_side) == expected
+                prices = [o["price"] for o in expected.values()]
+                assert open_orders.get_price_range(symbol, ob_side) == (
+                    (min(prices), max(prices)) if prices else None
+                )
+
+    copied = pickle.loads(pickle.dumps(open_orders))
+    assert isinstance(copied, OpenOrders) and copied == open_orders
+    open_orders.clear()
+    assert open_orders.get_price_range("A", "bids") is None
+
+
+def test_fill_list():
+    fills = FillList([{"id": 1}])
+    fills.append({"id": 2})
+    assert fills.has_id(1) and fills.has_id(2) and not fills.has_id(3)
+    fills.remove({"id": 1})
+    assert not fills.has_id(1)
@@ -1,12 +1,29 @@
 import os
+import asyncio
+import datetime
+import pickle
+import threading
+import time
 import pytest
 
 from .conftest import _init
-from uxs import set_enable_caching
+from uxs import set_enable_caching, set_cache_backend
 from uxs.base.ccxt import get_sn_exchange
-from uxs.base.poll import save, create_new, load, clear_cache
+import uxs.base.poll as poll
+from uxs.base.poll import (
+    save,
+    create_new,
+    load,
+    probe,
+    retrieve,
+    globalise,
+    clear_cache,
+    encode_filename,
+    _MAXLENS,
+)
 
 test_dir, settings_test_path = _init()
+td = datetime.timedelta
 
 
 EXCHANGES = ["binance", "okx", "kucoin"]
@@ -106,15 +123,233 @@ def test_save_and_load(id, data, init):
     assert fnInf == fnInf2
 
 
+@pytest.mark.parametrize("id, data", DATA)
+def test_sqlite_backend(id, data, init):
+    exchange, type = id
+    set_cache_backend("sqlite")
+    try:
+        fnInfs = [create_new(exchange, type, data=data)]
+        for i in range(_MAXLENS[type if isinstance(type, str) else type[0]]):
+            fnInfs.append(fnInfs[-1]._replace(date=fnInfs[-1].date - td(seconds=1)))
+        fnInfs = [
+            x._replace(file=encode_filename(exchange, type, x.date)) for x in fnInfs
+        ]
+        save(fnInfs)
+
+        fnInf2 = load(exchange, type, limit=-1, max=1, globals=False)[0]
+        assert fnInf2 == fnInfs[0]
+        # the oldest one was trimmed
+        assert probe(exchange, type, -1, globals=False) == [
+            x._replace(data=None) for x in fnInfs[:-1]
+        ]
+        assert os.path.exists(os.path.join(test_dir, exchange, "cache.sqlite"))
+        assert not os.path.exists(os.path.join(test_dir, exchange, fnInfs[0].file))
+
+        clear_cache(exchange, [type if isinstance(type, str) else type[0]])
+        assert load(exchange, type, limit=-1, max=1, globals=False) == []
+    finally:
+        set_cache_backend("json")
+
+
+def test_sqlite_backend_not_pickled(init):
+    set_cache_backend("sqlite")
+    try:
+        item = create_new("binance", "tickers", data={"ETH/BTC": {"last": 0.013}})
+        save([item])
+        conn = poll.BACKENDS["sqlite"]._connect("binance")
+        assert conn.execute("SELECT typeof(data) FROM items").fetchall() == [("text",)]
+        # a pickle (e.g. written by an earlier version) is never loaded
+        conn.execute(
+            "INSERT INTO items (type, date, data) VALUES (?, ?, ?)",
+            ("tickers", poll.timestamp_ms(item.date) + 1000, pickle.dumps({})),
+        )
+        assert load("binance", "tickers", limit=-1, max=1, globals=False) == [item]
+        clear_cache("binance", ["tickers"])
+    finally:
+        set_cache_backend("json")
+
+
+def test_retrieve_shares_cached_data(init):
+    item = create_new("binance", "tickers", data={"ETH/BTC": {"last": 0.013}})
+    globalise([item])
+    # stored as a copy
+    item.data["ETH/BTC"]["last"] = 0
+
+    cached = retrieve("binance", "tickers", -1, 1)[0]
+    assert cached.data == {"ETH/BTC": {"last": 0.013}}
+    assert retrieve("binance", "tickers", -1, 1)[0].data is cached.data
+    assert load("binance", "tickers", -1, 1)[0].data is cached.data
+
+    copied = retrieve("binance", "tickers", -1, 1, copy=True)[0]
+    assert copied == cached and copied.data is not cached.data
+
+
+def test_update_single_flight(init, monkeypatch):
+    calls = []
+
+    class Api:
+        markets = {"BTC/USDT": {}}
+
+        async def fetch_ticker(self, symbol):
+            calls.append(symbol)
+            await asyncio.sleep(0.01)
+            return {"symbol": symbol, "last": 1.0}
+
+    monkeypatch.setattr(poll, "_get_appropriate_api", lambda *args: Api())
+
+    async def main():
+        type = ("ticker", "BTC/USDT")
+        return await asyncio.gather(
+            *[poll.update("binance", type, cache=False) for _ in range(3)]
+        )
+
+    results = asyncio.run(main())
+    assert calls == ["BTC/USDT"]
+    assert all(r[0].data == {"symbol": "BTC/USDT", "last": 1.0} for r in results)
+    assert results[0][0].data is not results[1][0].data
+
+
+def test_update_single_flight_failed(init, monkeypatch):
+    calls = []
+
+    class Api:
+        markets = {"BTC/USDT": {}}
+
+        async def fetch_ticker(self, symbol):
+            calls.append(symbol)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise KeyError(symbol)
+            return {"symbol": symbol, "last": 1.0}
+
+    monkeypatch.setattr(poll, "_get_appropriate_api", lambda *args: Api())
+    type = ("ticker", "BTC/USDT")
+
+    async def failed():
+        # the followers see the leader's error, rather than an empty result
+        updates = [
+            poll.update("binance", type, cache=False, attempts=1, raise_e=True)
+            for _ in range(2)
+        ]
+        return await asyncio.gather(*updates, return_exceptions=True)
+
+    results = asyncio.run(failed())
+    assert calls == ["BTC/USDT"]
+    assert all(isinstance(r, KeyError) for r in results)
+
+    async def cancelled():
+        leader = asyncio.ensure_future(poll.update("binance", type, cache=False))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(poll.update("binance", type, cache=False))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        # the follower updates by itself
+        return await follower
+
+    calls.clear()
+    calls.append(None)
+    result = asyncio.run(cancelled())
+    assert calls == [None, "BTC/USDT", "BTC/USDT"]
+    assert result[0].data == {"symbol": "BTC/USDT", "last": 1.0}
+
+
+@pytest.fixture
+def lock_files():
+    yield
+    # the lock files are kept after the release
+    clear_cache("binance", ["ticker"])
+
+
+def test_update_lock(init, lock_files):
+    type = ("ticker", "BTC/USDT")
+    assert not poll._is_blocked("binance", type)
+    poll._block("binance", type, 2)
+    assert poll._is_blocked("binance", type)
+    started = time.time()
+    poll._wait_till_released("binance", type, 0.05)
+    assert time.time() - started >= 0.05
+    poll._release("binance", [type])
+    assert not poll._is_blocked("binance", type)
+
+
+@pytest.mark.skipif(poll.fcntl is None, reason="requires fcntl")
+def test_update_lock_wake_up(init, lock_files):
+    type = ("ticker", "XRP/USDT")
+    for wait in (
+        lambda: poll._wait_till_released("binance", type, 5),
+        lambda: asyncio.run(poll._async_wait_till_released("binance", type, 5)),
+    ):
+        assert poll._block("binance", type, 2)
+        threading.Timer(0.05, poll._release, ("binance", [type])).start()
+        started = time.time()
+        wait()
+        # woken up by the release, not by the timeout
+        assert 0.04 <= time.time() - started < 1
+        assert not poll._is_blocked("binance", type)
+
+
+def test_update_lock_holders(init, lock_files):
+    type = ("ticker", "ETH/USDT")
+    # two updates of the process hold it; it's released by the last of them
+    assert poll._block("binance", type, 2)
+    assert poll._block("binance", type, 2)
+    poll._release("binance", [type])
+    assert poll._is_blocked("binance", type)
+    poll._release("binance", [type])
+    assert not poll._is_blocked("binance", type)
+
+
+@pytest.mark.skipif(poll.fcntl is None, reason="requires fcntl")
+def test_update_releases_own_lock(init, lock_files, monkeypatch):
+    fetching = []
+
+    class Api:
+        markets = {"ETH/USDT": {}}
+
+        async def fetch_ticker(self, symbol):
+            fetching.append(symbol)
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(poll, "_get_appropriate_api", lambda *args: Api())
+    type = ("ticker", "ETH/USDT")
+
+    # held by "another process"
+    fd = poll._try_lock(poll._lock_path("binance", poll._resolve_type(type)))
+    try:
+        result = asyncio.run(poll.update("binance", type, blocked="return"))
+        assert result == [] and not fetching
+        assert poll._is_blocked("binance", type)
+    finally:
+        os.close(fd)
+    assert not poll._is_blocked("binance", type)
+
+    async def main():
+        task = asyncio.ensure_future(poll.update("binance", type))
+        while not fetching:
+            await asyncio.sleep(0.01)
+        assert poll._is_blocked("binance", type)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert not poll._is_blocked("binance", type)
+    assert not poll._held_locks
+
+
 def test_load_markets():
     set_enable_caching({"markets": True})
     exchange = "kucoin"
     api = get_sn_exchange({"exchange": exchange})
-    markets = api.poll_load_markets(-1)
+    try:
+        markets = api.poll_load_markets(-1)
 
-    # Now fetch them from storage
-    fnInf = load(exchange, "markets", limit=-1, max=1, globals=False)[0]
-    assert fnInf.data == markets
+        # Now fetch them from storage
+        fnInf = load(exchange, "markets", limit=-1, max=1, globals=False)[0]
+        assert fnInf.data == markets
+    finally:
+        # (the update lock files are kept after the update)
+        clear_cache(exchange, ["markets", "currencies"])
 
 
 def test_clear_cache(init):
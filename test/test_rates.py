@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+import pytest
+
+from uxs.base.socket.rates import CrossRateEngine
+from uxs.fintls.basics import calc_price
+
+SYMBOLS = ["BTC/USDT", "ETH/BTC", "ETH/USDT", "XRP/ETH", "XRP/BTC", "DOGE/USDT"]
+
+
+class _XS:
+    def __init__(self):
+        self.markets = dict.fromkeys(SYMBOLS, {})
+        self.tickers = {}
+        self.orderbooks = {}
+        self.callbacks = defaultdict(list)
+
+    def add_callback(self, cb, stream, id=-1, delivery="deep"):
+        self.callbacks[(stream, id)].append(cb)
+
+    def remove_callback(self, cb, stream, id=-1):
+        self.callbacks[(stream, id)].remove(cb)
+
+    def update_tickers(self, tickers):
+        for t in tickers:
+            self.tickers.setdefault(t["symbol"], {}).update(t)
+        updates = [{"_": "ticker", "symbol": t["symbol"], "data": t} for t in tickers]
+        for cb in self.callbacks[("ticker", -1)]:
+            cb(updates)
+
+    def update_orderbook(self, symbol, bids, asks):
+        self.orderbooks[symbol] = {"symbol": symbol, "bids": bids, "asks": asks}
+        for cb in self.callbacks[("orderbook", symbol)]:
+            cb({"_": "orderbook", "symbol": symbol, "data": {}})
+
+
+def _ticker(symbol, bid, ask):
+    return {"symbol": symbol, "bid": bid, "ask": ask, "last": None}
+
+
+def test_ticker_rates():
+    xs = _XS()
+    xs.update_tickers(
+        [
+            _ticker("BTC/USDT", 59990, 60010),
+            _ticker("ETH/BTC", 0.05, 0.05),
+            _ticker("ETH/USDT", 3000, 3000),
+            _ticker("XRP/ETH", 0.0002, 0.0002),
+        ]
+    )
+    engine = CrossRateEngine(xs, ["USDT", "BTC"])
+    changes = []
+    engine.add_callback(changes.append)
+    engine.start()
+    assert engine.get_rate("BTC", "USDT") == 60000
+    assert engine.get_rate("XRP", "USDT") == pytest.approx(0.6)
+    assert engine.get_rate("USDT", "USDT") == 1.0
+    assert engine.get_price("ETH/USDT") == 3000
+    assert len(changes) == 1
+
+    # unchanged mid price
+    xs.update_tickers([_ticker("BTC/USDT", 59980, 60020)])
+    assert len(changes) == 1
+
+    xs.update_tickers([_ticker("ETH/BTC", 0.06, 0.06)])
+    # (XRP/BTC, the shortest path of XRP, has no price)
+    assert changes[-1] == {"BTC": {"ETH": 0.06}}
+    assert engine.get_rate("XRP", "BTC") is None
+
+    xs.update_tickers([_ticker("DOGE/USDT", None, None)])
+    assert len(changes) == 2
+
+    prices = engine.prices
+    for cy, rate in engine.rates["USDT"].items():
+        assert rate == pytest.approx(calc_price((cy, "USDT"), prices))
+
+    engine.stop()
+    xs.update_tickers([_ticker("ETH/BTC", 0.07, 0.07)])
+    assert len(changes) == 2
+
+
+def test_orderbook_rates():
+    xs = _XS()
+    engine = CrossRateEngine(
+        xs, ["USDT"], source="orderbook", symbols=["BTC/USDT", "ETH/BTC"]
+    )
+    changes = []
+    engine.add_callback(changes.append)
+    engine.start()
+    assert engine.rates == {"USDT": {}}
+
+    xs.update_orderbook("BTC/USDT", [[100.0, 1.0]], [[102.0, 1.0]])
+    xs.update_orderbook("ETH/BTC", [[0.1, 1.0]], [])
+    assert engine.get_rate("ETH", "USDT") == pytest.approx(10.1)
+    assert changes == [{"USDT": {"BTC": 101.0}}, {"USDT": {"ETH": pytest.approx(10.1)}}]
+
+    xs.update_orderbook("BTC/USDT", [], [])
+    assert changes[-1] == {"USDT": {"BTC": None, "ETH": None}}
+    assert engine.get_rate("BTC", "USDT") is None
+
+    with pytest.raises(ValueError):
+        CrossRateEngine(xs, ["USDT"], source="orderbook")
@@ -3,9 +3,13 @@ from uxs.fintls import shapes_old, shapes
 from uxs.fintls.shapes import Shape
 from fons.log import quick_logging
 import itertools
+import json
+import os
 import sys
 import time
 import logging
+import pickle
+import pytest
 
 logging.getLogger("uxs.shapes").setLevel(logging.DEBUG)
 logging.getLogger("uxs.shapes").addHandler(logging.StreamHandler())
@@ -111,6 +115,67 @@ def test_get_shapes():
         # print(retrieved_shapes)
 
 
+def _load_markets_coll():
+    path = os.path.join(os.path.dirname(__file__), "data", "shapes_markets.json")
+    with open(path) as f:
+        return {xc: dict.fromkeys(symbols, {}) for xc, symbols in json.load(f).items()}
+
+
+def _canonical(shape_tuples):
+    return sorted(tuple(sorted(x)) for x in shape_tuples)
+
+
+def test_iter_shape_tuples():
+    markets_coll = _load_markets_coll()
+    expected = shapes.get_shape_tuples([2, 3], markets_coll, use_cython=False)
+    iterator = shapes.iter_shape_tuples([2, 3], markets_coll)
+    assert not isinstance(iterator, list)
+    streamed = list(iterator)
+    assert len(streamed) == len(expected)
+    assert _canonical(streamed) == _canonical(expected)
+
+    expected = shapes.get_shape_tuples(3, markets_coll, max_unique_exchanges=1)
+    streamed = shapes.iter_shape_tuples(
+        3, markets_coll, max_unique_exchanges=1, processes=2
+    )
+    assert _canonical(streamed) == _canonical(expected)
+
+    tickers_coll = {"a": {"BTC/USDT": {}}, "b": {"BTC/USDT": {}}}
+    (shape,) = shapes.iter_shapes(2, {}, tickers_coll)
+    assert shape.n == 2 and shape.cys[0] == shape.cys[-1]
+
+
+def test_shape_table():
+    markets_coll = _load_markets_coll()
+    shape_tuples = list(shapes.iter_shape_tuples([2, 3], markets_coll))[::7]
+    table = shapes.ShapeTable(shape_tuples)
+    assert len(table) == len(shape_tuples)
+    assert table.legs.shape == (len(table), 3)
+
+    for view in (table, pickle.loads(pickle.dumps(table))):
+        for shape_tuple, shape_view in zip(shape_tuples, view):
+            shape = Shape(shape_tuple)
+            assert shape_view.xc_symbol_base_quotes == shape.xc_symbol_base_quotes
+            assert shape_view.directions == shape.directions
+            assert shape_view.cys == shape.cys
+            assert shape_view.to_shape().xcsyms == shape.xcsyms
+            for path, path_view in zip(shape.paths, shape_view.paths):
+                assert path_view.entities == path.entities
+                assert path_view.cys == path.cys
+                assert path_view.id == path.id
+
+    shape_objects = [Shape(x) for x in shape_tuples[:100]]
+    assert shapes.ShapeTable(shape_objects).legs.tolist() == table.legs[:100].tolist()
+    assert table[-1] == table[len(table) - 1]
+    assert table.get_path(0, 1, -1) == table[0].get_path(1, -1)
+
+    with pytest.raises(ValueError):
+        # not circular
+        shapes.ShapeTable(
+            [(("a", "BTC/USDT", "BTC", "USDT"), ("a", "ETH/BTC", "ETH", "BTC"))]
+        )
+
+
 def test_memalloc():
     shape = Shape(
         (("binance", "BTC/USDT", "BTC", "USDT"), ("kucoin", "BTC/USDT", "BTC", "USDT"))
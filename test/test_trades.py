@@ -0,0 +1,98 @@
+import numpy as np
+
+from uxs.fintls.trades import TradeStore
+
+
+def _trade(id, timestamp, price=1.0, amount=1.0, side="buy"):
+    return {
+        "id": str(id),
+        "timestamp": timestamp,
+        "price": price,
+        "amount": amount,
+        "side": side,
+    }
+
+
+def _key(x):
+    return int(x["id"])
+
+
+def test_ring_buffer():
+    store = TradeStore(3, key=_key)
+    store.extend([_trade(i, 1000 * i, price=float(i)) for i in range(5)])
+    assert len(store) == 3
+    assert [t["id"] for t in store] == ["2", "3", "4"]
+    assert store[-1] == {
+        "id": "4",
+        "timestamp": 4000,
+        "price": 4.0,
+        "amount": 1.0,
+        "side": "buy",
+    }
+    cols = store.columns()
+    assert cols["price"].tolist() == [2.0, 3.0, 4.0]
+    # contiguous views of the underlying arrays
+    assert cols["price"].base is store.price
+    # evicted ids can be re-added
+    assert store.extend([_trade(0, 0)]) != []
+
+
+def test_dedupe_and_out_of_order():
+    store = TradeStore(10, key=_key)
+    store.extend([_trade(1, 1000), _trade(3, 3000), _trade(3, 3000)])
+    assert store.extend([_trade(1, 1000), _trade(3, 3000)]) == []
+    assert store.extend([_trade(2, 2000, side="sell"), _trade(4, 4000)])
+    assert [t["id"] for t in store] == ["1", "2", "3", "4"]
+    assert store.side[store._slice()].tolist() == [1, -1, 1, 1]
+
+
+def test_trades_since_between():
+    store = TradeStore(5, key=_key)
+    store.extend([_trade(i, 1000 * i, amount=float(i)) for i in range(8)])
+    assert store.trades_since(6000)["amount"].tolist() == [6.0, 7.0]
+    assert store.trades_between(4000, 6000)["id"].tolist() == ["4", "5"]
+    assert store.trades_between(0, 1000)["id"].tolist() == []
+
+    # timestamps out of order (key is the id)
+    store = TradeStore(5, key=_key)
+    store.extend([_trade(1, 3000), _trade(2, 1000), _trade(3, 2000)])
+    assert store.trades_since(2000)["id"].tolist() == ["1", "3"]
+
+
+def test_export():
+    store = TradeStore(5)
+    store.extend([_trade(i, 1000 * i, price=10.0 + i) for i in range(3)])
+    arr = store.to_numpy()
+    assert arr["price"].tolist() == [10.0, 11.0, 12.0]
+    assert arr.dtype["timestamp"] == np.int64
+    df = store.to_pandas()
+    assert df.index.tolist() == [0, 1000, 2000]
+    assert df["id"].tolist() == ["0", "1", "2"]
+    assert df["side"].tolist() == [1, 1, 1]
+
+
+def test_all_fields_kept():
+    store = TradeStore(5, key=_key)
+    trade = dict(
+        _trade(2, 2000),
+        symbol="BTC/USDT",
+        datetime="1970-01-01T00:00:02.000Z",
+        order="o2",
+        type="limit",
+        takerOrMaker="taker",
+        cost=1.0,
+        fee={"cost": 0.001, "currency": "USDT"},
+        info={"raw": 1},
+    )
+    store.extend([trade, dict(_trade(3, None), side=None)])
+    assert store[0] == trade
+    assert store[1] == {
+        "id": "3",
+        "timestamp": None,
+        "price": 1.0,
+        "amount": 1.0,
+        "side": None,
+    }
+    # the out of order (slow) path rebuilds the store from the trade dicts
+    store.extend([_trade(1, 1000)])
+    assert list(store)[1] == trade
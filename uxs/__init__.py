@@ -2,9 +2,12 @@ __version__ = "0.7.0"
 __author__ = "binares"
 
 import os
+import sys
+import importlib
+import types
 import yaml
 
-from uxs.base.socket import ExchangeSocket, ExchangeSocketError
+from uxs.base.socket import ExchangeSocket, ExchangeSocketError, CrossRateEngine
 
 from uxs.base.ccxt import (
     get_name,
@@ -36,33 +39,66 @@ from uxs.base.poll import fetch, sn_fetch, clear_cache
 import uxs.fintls as fintls
 
 
-from uxs.binance import binance
-from uxs.binancefutures import binancefutures
-from uxs.bitmex import bitmex
-from uxs.hitbtc import hitbtc
-from uxs.kraken import kraken
-from uxs.krakenfutures import krakenfutures
-from uxs.kucoin import kucoin
-from uxs.poloniex import poloniex
+# The streamer classes (uxs.binance, ...) are imported on first access
+STREAMERS = {
+    "binance": "uxs.binance",
+    "binancefutures": "uxs.binancefutures",
+    "bitmex": "uxs.bitmex",
+    "hitbtc": "uxs.hitbtc",
+    "kraken": "uxs.kraken",
+    "krakenfutures": "uxs.krakenfutures",
+    "kucoin": "uxs.kucoin",
+    "poloniex": "uxs.poloniex",
+}
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing a submodule sets it as the package's attribute (also for the
+        # submodules it imports itself, e.g. binancefutures -> binance);
+        # bind the streamer class in its place
+        if (
+            name in STREAMERS
+            and isinstance(value, types.ModuleType)
+            and value.__name__ == STREAMERS[name]
+        ):
+            value = getattr(value, name, value)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def _load_streamer_cls(exchange):
+    importlib.import_module(STREAMERS[exchange])
+    return globals()[exchange]
+
+
+def __getattr__(name):
+    if name in STREAMERS:
+        return _load_streamer_cls(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    # (`set` is shadowed by uxs.base._settings.set)
+    return sorted({*globals(), *STREAMERS})
 
 
 def list_streaming_exchanges():
-    return sorted(
-        k
-        for k, v in globals().items()
-        if isinstance(v, type)
-        and issubclass(v, ExchangeSocket)
-        and v is not ExchangeSocket
-    )
+    return sorted(STREAMERS)
 
 
 def get_streamer_cls(exchange):
-    streamer_cls = globals().get(exchange.lower(), None)
+    exchange = exchange.lower()
+    if exchange not in STREAMERS:
+        raise ValueError("Unknown exchange: {}".format(exchange))
 
+    streamer_cls = globals().get(exchange)
     if not isinstance(streamer_cls, type) or not issubclass(
         streamer_cls, ExchangeSocket
     ):
-        raise ValueError("Unknown exchange: {}".format(exchange))
+        streamer_cls = _load_streamer_cls(exchange)
 
     return streamer_cls
 
@@ -31,6 +31,8 @@ SETTINGS = {
     "ENABLE_CACHING_FOR_EXCHANGES": {},
     "CACHE_EXPIRY": deepcopy(_DEFAULT_CACHE_EXPIRY),
     "CACHE_EXPIRY_FOR_EXCHANGES": {},
+    # "json" (a file per cached item) or "sqlite" (a database per exchange)
+    "CACHE_BACKEND": "json",
 }
 _SETTINGS_INITIAL = deepcopy(SETTINGS)
 
@@ -142,11 +144,25 @@ def _prepare_cache_expiry_for_exchanges(mapping):
     return _prepare_for_exchanges(mapping, _prepare_cache_expiry)
 
 
+CACHE_BACKENDS = ("json", "sqlite")
+
+
+def _prepare_cache_backend(value):
+    if DEL(value):
+        return value
+    if value not in CACHE_BACKENDS:
+        raise ValueError(
+            "Unknown cache backend: {}; choose one of {}".format(value, CACHE_BACKENDS)
+        )
+    return value
+
+
 APPLY = {
     "ENABLE_CACHING": _prepare_enable_caching,
     "ENABLE_CACHING_FOR_EXCHANGES": _prepare_enable_caching_for_exchanges,
     "CACHE_EXPIRY": _prepare_cache_expiry,
     "CACHE_EXPIRY_FOR_EXCHANGES": _prepare_cache_expiry_for_exchanges,
+    "CACHE_BACKEND": _prepare_cache_backend,
 }
 
 
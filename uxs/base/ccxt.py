@@ -20,6 +20,7 @@ from uxs.fintls.basics import (
     convert_quotation,
     create_cy_graph,
 )
+from uxs.fintls.conversion import ConversionTable
 from uxs.fintls.ob import create_orderbook
 from uxs.fintls.utils import resolve_times
 from uxs.fintls.margin import Position
@@ -146,7 +147,9 @@ class ccxtWrapper:
 
         if load_cached_markets is not False:
             try:
-                currencies = poll.load(xc, "currencies", load_cached_markets, 1)[0].data
+                currencies = poll.load(
+                    xc, "currencies", load_cached_markets, 1, copy=True
+                )[0].data
                 tlogger.debug("{} - loaded cached currencies".format(xc))
             except (IndexError, json.JSONDecodeError) as e:
                 which_logger.debug(
@@ -155,7 +158,9 @@ class ccxtWrapper:
 
         if load_cached_markets is not False:
             try:
-                markets = poll.load(xc, "markets", load_cached_markets, 1)[0].data
+                markets = poll.load(
+                    xc, "markets", load_cached_markets, 1, copy=True
+                )[0].data
                 tlogger.debug("{} - loaded cached markets".format(xc))
             except (IndexError, json.JSONDecodeError) as e:
                 which_logger.debug(
@@ -1427,6 +1432,15 @@ class ccxtWrapper:
 
         return self.cy_graph
 
+    def load_conversion_table(self, reload=False):
+        """:rtype: ConversionTable (over the markets' currency graph)"""
+        graph = self.load_cy_graph(reload)
+        table = getattr(self, "conversion_table", None)
+        if table is None or table.graph is not graph:
+            self.conversion_table = table = ConversionTable(graph)
+
+        return table
+
     @staticmethod
     def convert_volumes(
         tickers,
@@ -1437,6 +1451,10 @@ class ccxtWrapper:
         sort=False,
         graph=None,
     ):
+        """
+        :param graph: currency graph (by default created from the tickers),
+                      or ConversionTable (e.g. `.load_conversion_table()`)
+        """
         if isinstance(method, str):
             method = [method]
         if isinstance(fallback, str):
@@ -1455,15 +1473,19 @@ class ccxtWrapper:
 
         if graph is None:
             graph = create_cy_graph(prices)
+        table = graph if isinstance(graph, ConversionTable) else ConversionTable(graph)
+        # the paths of each base currency are evaluated only once
+        bases = {s: s.split("/")[0] for s in prices}
+        base_prices = table.calc_prices(prices, quote, set(bases.values()))
 
         prices_in_quote = {}
-        for s in prices:
-            try:
-                prices_in_quote[s] = calc_price(
-                    "{}/{}".format(s.split("/")[0], quote), prices, graph
+        for s, base in bases.items():
+            if base in base_prices:
+                prices_in_quote[s] = base_prices[base]
+            else:
+                logger2.error(
+                    "Could not resolve price for market '{}/{}'".format(base, quote)
                 )
-            except RuntimeError as e:
-                logger2.error(e)
 
         volumes_in_quote = {
             s: (p * tickers[s]["baseVolume"])
@@ -1547,7 +1569,7 @@ class ccxtWrapper:
             lowest_ask = tickers[symbol]["ask"]
             price = lowest_ask / (1 + max_spread)
 
-        cy_graph = self.load_cy_graph()
+        conversion_table = self.load_conversion_table()
         prices = {x: y["last"] for x, y in tickers.items()}
         base, quote = symbol.split("/")
 
@@ -1557,7 +1579,7 @@ class ccxtWrapper:
 
         elif quotation in self.currencies:
             quotation_cy_0 = quotation
-            ref_price = calc_price((base, quotation_cy_0), prices, cy_graph)
+            ref_price = conversion_table.calc_price((base, quotation_cy_0), prices)
             amount = self.quoteToBase(amount, ref_price)
             quotation_cy = base
             quotation = "base"
@@ -1637,7 +1659,7 @@ class ccxtWrapper:
         balances = await poll.fetch(self, "balances", 0)
         tickers = await poll.fetch(self, "tickers", "2T")
         prices = {x: y["last"] for x, y in tickers.items()}
-        cy_graph = self.load_cy_graph()
+        conversion_table = self.load_conversion_table()
 
         sold = {}
 
@@ -1671,7 +1693,7 @@ class ccxtWrapper:
                     continue
                 elif quote not in self.currencies:
                     continue
-                price = calc_price((cy, quote), prices, cy_graph)
+                price = conversion_table.calc_price((cy, quote), prices)
                 cy_balance_in_quote = self.baseToQuote(free, price)
                 is_dust = cy_balance_in_quote < dust_definition
                 # print(cy_balance_in_quote,is_dust)
@@ -4,14 +4,21 @@ import os
 from collections import namedtuple, deque
 import itertools as it
 import json
+import sqlite3
 import yaml
 import asyncio
+import threading
 from copy import deepcopy
 import ccxt.async_support
 import ccxt
 import time
 import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 dt = datetime.datetime
 td = datetime.timedelta
 
@@ -86,11 +93,19 @@ _LOADS_MARKETS = (
     "ohlcv",
 )
 
+# Polling interval of waiting for a parallel update to finish
+# (marker file fallback only, the flock locks are waited for by the OS)
 ITERATION_SLEEP = 0.02
 ASYNC_ITERATION_SLEEP = 0.02
 
 storage = {}
 
+# {(loop, exchange, type, args_repr): future} of the updates in progress
+_in_flight = {}
+# {(exchange, type): [file descriptor, number of holders]} of the update locks
+# held by this process
+_held_locks = {}
+
 
 def _assign_storage_deque(exchange, type, *args):
     t_type = _type_tuple(type)
@@ -204,7 +219,7 @@ async def load_markets(api, limit=None):
             markets = m0.data
 
             if not api.currencies:
-                currencies = load(exchange, "currencies", limit, 1)[0].data
+                currencies = load(exchange, "currencies", limit, 1, copy=True)[0].data
     except Exception as e:
         logger.exception(e)
     finally:
@@ -247,7 +262,7 @@ def sn_load_markets(api, limit=None):
             markets = m0.data
 
             if not api.currencies:
-                currencies = load(exchange, "currencies", limit, 1)[0].data
+                currencies = load(exchange, "currencies", limit, 1, copy=True)[0].data
     except Exception as e:
         logger.exception(e)
     finally:
@@ -279,7 +294,8 @@ async def get(
     loop=None,
     cache=True,
     attempts=2,
-    raise_e=False
+    raise_e=False,
+    copy=False
 ):
     """
     Tries to retrieve the latest data, by either
@@ -291,6 +307,7 @@ async def get(
                     'sleep','ignore' or 'return'
                     ('return' returns empty list)
     :param cache: if B was performed (update()), whether or not to cache the new data
+    :param copy: if A was performed, return deep copies instead of the cached (shared) data
     For other params see fetch() docstring
     """
     exchange0 = exchange
@@ -315,9 +332,9 @@ async def get(
     items = []
 
     if file:
-        items = load(exchange, type, limit, max, globals=globals)
+        items = load(exchange, type, limit, max, globals=globals, copy=copy)
     elif globals:
-        items = retrieve(exchange, type, limit, max)
+        items = retrieve(exchange, type, limit, max, copy=copy)
 
     if not items and empty_update:
         items = await update(
@@ -352,7 +369,8 @@ def sn_get(
     loop=None,
     cache=True,
     attempts=2,
-    raise_e=False
+    raise_e=False,
+    copy=False
 ):
     """
     Tries to retrieve the latest data, by either
@@ -364,6 +382,7 @@ def sn_get(
                     'sleep','ignore' or 'return'
                     ('return' returns empty list)
     :param cache: if B was performed (update()), whether or not to cache the new data
+    :param copy: if A was performed, return deep copies instead of the cached (shared) data
     For other params see fetch() docstring
     """
     exchange0 = exchange
@@ -388,9 +407,9 @@ def sn_get(
     items = []
 
     if file:
-        items = load(exchange, type, limit, max, globals=globals)
+        items = load(exchange, type, limit, max, globals=globals, copy=copy)
     elif globals:
-        items = retrieve(exchange, type, limit, max)
+        items = retrieve(exchange, type, limit, max, copy=copy)
 
     if not items and empty_update:
         items = sn_update(
@@ -422,7 +441,8 @@ async def fetch(
     kwargs=None,
     loop=None,
     strip=True,
-    attempts=1
+    attempts=1,
+    copy=True
 ):
     """
     Checks whether reading from storage if enabled for the method of the exchange,
@@ -436,6 +456,8 @@ async def fetch(
     :param args: args passed to ccxt api fetch
     :param kwargs: kwargs passed to ccxt api fetch
     :param attempts: retries for ccxt api fetch, should an error occur
+    :param copy: if False, cached data is returned without copying; it is shared
+                 with the global cache and must not be modified
 
     Only applies if caching is enabled:
     :type limit: dt or timedelta-like (timedelta, seconds, freqstr)
@@ -477,6 +499,7 @@ async def fetch(
             loop=loop,
             attempts=attempts,
             raise_e=True,
+            copy=copy,
         )
 
     if strip:
@@ -497,7 +520,8 @@ def sn_fetch(
     kwargs=None,
     loop=None,
     strip=True,
-    attempts=1
+    attempts=1,
+    copy=True
 ):
     """
     Checks whether reading from storage if enabled for the method of the exchange,
@@ -511,6 +535,8 @@ def sn_fetch(
     :param args: args passed to ccxt api fetch
     :param kwargs: kwargs passed to ccxt api fetch
     :param attempts: retries for ccxt api fetch, should an error occur
+    :param copy: if False, cached data is returned without copying; it is shared
+                 with the global cache and must not be modified
 
     Only applies if caching is enabled:
     :type limit: dt or timedelta-like (timedelta, seconds, freqstr)
@@ -552,6 +578,7 @@ def sn_fetch(
             loop=loop,
             attempts=attempts,
             raise_e=True,
+            copy=copy,
         )
 
     if strip:
@@ -582,8 +609,83 @@ async def update(
           and blocked is not set to 'ignore']
          loading unexpired cache
       B) ccxt api fetch if no unexpired cache was found
+    Within the process, concurrent update()-s of identical (exchange, type, args,
+    kwargs) are single-flighted: unless `blocked` is 'ignore', the callers await
+    the update that is already in progress and receive (a copy of) its result,
+    or the exception it raised. If it was cancelled, they update by themselves.
     Param explanations can be found in fetch() and get() docstrings
     """
+    key = None
+    if blocked != "ignore":
+        key = (asyncio.get_running_loop(),) + _flight_key(exchange, type, args, kwargs)
+        while key in _in_flight:
+            if blocked == "return":
+                return []
+            inf, exc = await asyncio.shield(_in_flight[key])
+            if isinstance(exc, asyncio.CancelledError):
+                continue
+            if exc is not None:
+                raise exc
+            return deepcopy(inf)
+        flight = _in_flight[key] = key[0].create_future()
+
+    inf, exc = [], None
+    try:
+        inf = await _update(
+            exchange,
+            type,
+            args,
+            kwargs,
+            file=file,
+            globals=globals,
+            loop=loop,
+            limit=limit,
+            cache=cache,
+            blocked=blocked,
+            attempts=attempts,
+            raise_e=raise_e,
+            verbose=verbose,
+        )
+    except BaseException as e:
+        exc = e
+        raise
+    finally:
+        if key is not None:
+            del _in_flight[key]
+            flight.set_result((inf, exc))
+
+    return inf
+
+
+def _flight_key(exchange, type, args, kwargs):
+    name, _ = _exchange_and_type_to_str(exchange, type)
+    type = _resolve_type(type)
+    # private data is fetched per api (account)
+    api_id = (
+        id(exchange)
+        if _type0(type) in _PRIVATE_METHODS and not isinstance(exchange, str)
+        else None
+    )
+    args_repr = repr((tuple(args or ()), sorted((kwargs or {}).items())))
+    return (name, type, api_id, args_repr)
+
+
+async def _update(
+    exchange,
+    type,
+    args=None,
+    kwargs=None,
+    *,
+    file=True,
+    globals=True,
+    loop=None,
+    limit=None,
+    cache=True,
+    blocked="sleep",
+    attempts=2,
+    raise_e=False,
+    verbose=False
+):
     exchange0 = exchange
     exchange, _ = _exchange_and_type_to_str(exchange, type)
     type = _resolve_type(type)
@@ -608,9 +710,9 @@ async def update(
         elif blocked == "sleep":
             await _async_wait_till_released(exchange, type, wait_for, loop=loop)
             if file:
-                return load(exchange, type, limit, 1, globals=globals)
+                return load(exchange, type, limit, 1, globals=globals, copy=True)
             elif globals:
-                return retrieve(exchange, type, limit, 1)
+                return retrieve(exchange, type, limit, 1, copy=True)
             # else:
             #   return []
         else:
@@ -634,46 +736,54 @@ async def update(
     if type0 in _LOADS_MARKETS and not api.markets:
         await load_markets(api)
 
-    exc, i = None, 0
-    while i < attempts:
-        # Only block if we later cache the results
-        # (we don't want parallel update() -s to wait for nothing)
-        if cache:
-            _block(exchange, type, _BLOCK[type0])
-        try:
-            data = await method(*args, **kwargs)
-            # await api.close()
-            now = dt_round_to_digit(dt.utcnow(), 6)
-            inf.append(create_new(exchange, type, now, data=data))
-            if is_market:
-                inf.append(create_new(exchange, "currencies", now, data=api.currencies))
-        except Exception as e:
-            exc = e
-            if isinstance(e, ccxt.NotSupported):
-                i = attempts - 1
-            elif isinstance(e, KeyError) and type == "tickers" and not i:
-                logger.debug(
-                    "{} - fetch_tickers caused KeyError. Re-loading markets.".format(
-                        exchange
+    # whether this call holds the update lock (and must release it)
+    holds_lock = False
+    try:
+        exc, i = None, 0
+        while i < attempts:
+            # Only block if we later cache the results
+            # (we don't want parallel update() -s to wait for nothing)
+            if cache:
+                holds_lock = _block(exchange, type, _BLOCK[type0], holds_lock)
+            try:
+                data = await method(*args, **kwargs)
+                # await api.close()
+                now = dt_round_to_digit(dt.utcnow(), 6)
+                inf.append(create_new(exchange, type, now, data=data))
+                if is_market:
+                    inf.append(
+                        create_new(exchange, "currencies", now, data=api.currencies)
                     )
-                )
-                await load_markets(api)
-            if i == attempts - 1:
-                logger2.error("{} - error fetching {}: {}".format(exchange, type, e))
-                logger.exception(e)
-        else:
-            break
-        i += 1
+            except Exception as e:
+                exc = e
+                if isinstance(e, ccxt.NotSupported):
+                    i = attempts - 1
+                elif isinstance(e, KeyError) and type == "tickers" and not i:
+                    logger.debug(
+                        "{} - fetch_tickers caused KeyError. Re-loading markets.".format(
+                            exchange
+                        )
+                    )
+                    await load_markets(api)
+                if i == attempts - 1:
+                    logger2.error(
+                        "{} - error fetching {}: {}".format(exchange, type, e)
+                    )
+                    logger.exception(e)
+            else:
+                break
+            i += 1
+
+        if exc is not None and i >= attempts - 1 and raise_e:
+            raise exc
 
-    if exc is not None and i >= attempts - 1 and raise_e:
         if cache:
+            globalise(inf)
+            save(inf)
+    finally:
+        if holds_lock:
+            # also in case the update was cancelled while holding the lock
             _release(exchange, [type])
-        raise exc
-
-    if cache:
-        globalise(inf)
-        save(inf)
-        _release(exchange, [type])
 
     if is_market and inf:
         inf = inf[:1]
@@ -729,9 +839,9 @@ def sn_update(
         elif blocked == "sleep":
             _wait_till_released(exchange, type, wait_for)
             if file:
-                return load(exchange, type, limit, 1, globals=globals)
+                return load(exchange, type, limit, 1, globals=globals, copy=True)
             elif globals:
-                return retrieve(exchange, type, limit, 1)
+                return retrieve(exchange, type, limit, 1, copy=True)
             # else:
             #   return []
         else:
@@ -755,46 +865,54 @@ def sn_update(
     if type0 in _LOADS_MARKETS and not api.markets:
         sn_load_markets(api)
 
-    exc, i = None, 0
-    while i < attempts:
-        # Only block if we later cache the results
-        # (we don't want parallel update() -s to wait for nothing)
-        if cache:
-            _block(exchange, type, _BLOCK[type0])
-        try:
-            data = method(*args, **kwargs)
-            # await api.close()
-            now = dt_round_to_digit(dt.utcnow(), 6)
-            inf.append(create_new(exchange, type, now, data=data))
-            if is_market:
-                inf.append(create_new(exchange, "currencies", now, data=api.currencies))
-        except Exception as e:
-            exc = e
-            if isinstance(e, ccxt.NotSupported):
-                i = attempts - 1
-            elif isinstance(e, KeyError) and type == "tickers" and not i:
-                logger.debug(
-                    "{} - fetch_tickers caused KeyError. Re-loading markets.".format(
-                        exchange
+    # whether this call holds the update lock (and must release it)
+    holds_lock = False
+    try:
+        exc, i = None, 0
+        while i < attempts:
+            # Only block if we later cache the results
+            # (we don't want parallel update() -s to wait for nothing)
+            if cache:
+                holds_lock = _block(exchange, type, _BLOCK[type0], holds_lock)
+            try:
+                data = method(*args, **kwargs)
+                # await api.close()
+                now = dt_round_to_digit(dt.utcnow(), 6)
+                inf.append(create_new(exchange, type, now, data=data))
+                if is_market:
+                    inf.append(
+                        create_new(exchange, "currencies", now, data=api.currencies)
                     )
-                )
-                sn_load_markets(api)
-            if i == attempts - 1:
-                logger2.error("{} - error fetching {}: {}".format(exchange, type, e))
-                logger.exception(e)
-        else:
-            break
-        i += 1
+            except Exception as e:
+                exc = e
+                if isinstance(e, ccxt.NotSupported):
+                    i = attempts - 1
+                elif isinstance(e, KeyError) and type == "tickers" and not i:
+                    logger.debug(
+                        "{} - fetch_tickers caused KeyError. Re-loading markets.".format(
+                            exchange
+                        )
+                    )
+                    sn_load_markets(api)
+                if i == attempts - 1:
+                    logger2.error(
+                        "{} - error fetching {}: {}".format(exchange, type, e)
+                    )
+                    logger.exception(e)
+            else:
+                break
+            i += 1
+
+        if exc is not None and i >= attempts - 1 and raise_e:
+            raise exc
 
-    if exc is not None and i >= attempts - 1 and raise_e:
         if cache:
+            globalise(inf)
+            save(inf)
+    finally:
+        if holds_lock:
+            # also in case the update was cancelled while holding the lock
             _release(exchange, [type])
-        raise exc
-
-    if cache:
-        globalise(inf)
-        save(inf)
-        _release(exchange, [type])
 
     if is_market and inf:
         inf = inf[:1]
@@ -802,7 +920,12 @@ def sn_update(
     return inf
 
 
-def globalise(items):
+def globalise(items, copy=True):
+    """
+    Stores the items in the global (in-memory) cache.
+    :param copy: store deep copies of the items; only set to False if the items'
+                 data isn't used (modified) elsewhere
+    """
     for item in sorted(items, key=lambda x: x.date):
         seq = _get_storage_deque(item.exchange, item.type)
         pos = next((i for i, x in enumerate(seq) if item.date >= x.date), None)
@@ -813,7 +936,8 @@ def globalise(items):
             else:
                 pos = 0
 
-        item = deepcopy(item)
+        if copy:
+            item = deepcopy(item)
 
         try:
             if seq[pos].date == item.date:
@@ -838,27 +962,18 @@ def save(items):
             else encode_filename(item.exchange, item.type, item.date)
         )
 
-        _dir = os.path.join(get_cache_dir(), item.exchange)
-        if not os.path.exists(_dir):
-            make_dirpath(_dir)
-
-        path = os.path.join(_dir, fn)
+        backend = get_backend()
+        backend.write(item._replace(file=fn))
+        backend.trim(item.exchange, item.type, _MAXLENS[_type0(item.type)])
 
-        with SafeFileLock(path, 0.01):
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(item.data, f, cls=DateTimeEncoder)
 
-        p = probe(item.exchange, item.type, -1, globals=False)
-        maxlen = _MAXLENS[_type0(item.type)]
-        with_file = (x for x in reversed(p[maxlen:]) if x.file)
-        for wf in with_file:
-            try:
-                os.remove(os.path.join(_dir, wf.file))
-            except OSError:
-                pass
-
-
-def retrieve(exchange, type, limit=None, max=5):
+def retrieve(exchange, type, limit=None, max=5, *, copy=False):
+    """
+    Retrieves the items from the global cache, latest first.
+    :param copy: if False, the items' data is shared with the cache (and other
+                 callers) and must be treated as read-only; if True, deep copies
+                 are returned
+    """
     limit = _resolve_limit(exchange, type, limit)
     d = storage
     for key in it.chain([exchange], _type_tuple(type)):
@@ -876,16 +991,22 @@ def retrieve(exchange, type, limit=None, max=5):
     if max is not None:
         items = items[:max]
 
-    items = deepcopy(items)
+    if copy:
+        items = deepcopy(items)
 
     return items
 
 
-def retrieve_latest(exchange, type, limit=None):
-    return retrieve(exchange, type, limit, 1)
+def retrieve_latest(exchange, type, limit=None, *, copy=False):
+    return retrieve(exchange, type, limit, 1, copy=copy)
 
 
-def load(exchange, type, limit=None, max=5, globals=True):
+def load(exchange, type, limit=None, max=5, globals=True, *, copy=False):
+    """
+    Loads the items from the global cache and/or from the cache backend, latest first.
+    :param copy: see `retrieve`; the items read from the backend are stored into the
+                 global cache as they are, and are thus shared as well
+    """
     limit = _resolve_limit(exchange, type, limit)
     inf = probe(exchange, type, limit, max, globals=globals)
     items = []
@@ -893,43 +1014,23 @@ def load(exchange, type, limit=None, max=5, globals=True):
         if tpl.data is not None:
             items.append(tpl)
             continue
-        path = os.path.join(get_cache_dir(), exchange, tpl.file)
-        wait_filelock(path)
-        logger.debug("Reading: {}".format(path))
-        with open(path, encoding="utf-8") as f:
-            item = fnInf(*tpl[:-1], json.load(f))
-        globalise([item])
+        item = tpl._replace(data=get_backend().read(exchange, tpl))
+        globalise([item], copy=False)
         items.append(item)
 
+    if copy:
+        items = deepcopy(items)
+
     return items
 
 
-def load_latest(exchange, type, limit=None, globals=True):
-    return load(exchange, type, limit, 1, globals)
+def load_latest(exchange, type, limit=None, globals=True, *, copy=False):
+    return load(exchange, type, limit, 1, globals, copy=copy)
 
 
 def probe(exchange, type, limit=None, max=None, globals=True):
     limit = _resolve_limit(exchange, type, limit)
-    type_str = _type_str(type)
-    begins = "[{}]_{}_".format(exchange.lower(), type_str)
-    ends = ".json"
-    _len = len(begins)
-    _len_ends = len(ends)
-
-    _dir = os.path.join(get_cache_dir(), exchange)
-    try:
-        files = (
-            x
-            for x in reversed(os.listdir(_dir))
-            if x[:_len] == begins and x[_len:].isdigit()
-        )
-    except FileNotFoundError:
-        files = []
-
-    _decoded = (decode_filename(x) for x in files)
-    decoded = (
-        list(x for x in _decoded if x.date >= limit) if limit != -1 else list(_decoded)
-    )
+    decoded = get_backend().probe(exchange, type, limit, max)
 
     if globals:
         items = retrieve(exchange, type, limit, max)
@@ -968,6 +1069,194 @@ def decode_filename(fn):
     return fnInf(e, type, date, fn)
 
 
+class JSONBackend:
+    """
+    An item per file <CACHE_DIR>/<exchange>/[<exchange>]_<type>_<timestamp_ms>,
+    containing the data as JSON. Probing lists the exchange's directory.
+    """
+
+    name = "json"
+
+    def probe(self, exchange, type, limit=-1, max=None):
+        """:returns: [fnInf without data, ...] latest first"""
+        begins = "[{}]_{}_".format(exchange.lower(), _type_str(type))
+        _len = len(begins)
+        _dir = os.path.join(get_cache_dir(), exchange)
+        try:
+            files = [
+                x
+                for x in os.listdir(_dir)
+                if x[:_len] == begins and x[_len:].isdigit()
+            ]
+        except FileNotFoundError:
+            files = []
+
+        decoded = (decode_filename(x) for x in files)
+        if limit != -1:
+            decoded = (x for x in decoded if x.date >= limit)
+        decoded = sorted(decoded, key=lambda x: x.date, reverse=True)
+        return decoded[:max] if max is not None else decoded
+
+    def read(self, exchange, tpl):
+        path = os.path.join(get_cache_dir(), exchange, tpl.file)
+        wait_filelock(path)
+        logger.debug("Reading: {}".format(path))
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def write(self, item):
+        _dir = os.path.join(get_cache_dir(), item.exchange)
+        if not os.path.exists(_dir):
+            make_dirpath(_dir)
+        path = os.path.join(_dir, item.file)
+        with SafeFileLock(path, 0.01):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(item.data, f, cls=DateTimeEncoder)
+
+    def trim(self, exchange, type, maxlen):
+        _dir = os.path.join(get_cache_dir(), exchange)
+        for x in reversed(self.probe(exchange, type)[maxlen:]):
+            try:
+                os.remove(os.path.join(_dir, x.file))
+            except OSError:
+                pass
+
+    def clear(self, exchange, types):
+        _dir = os.path.join(get_cache_dir(), exchange)
+        for f in os.listdir(_dir):
+            if any(f.startswith("[{}]_{}".format(exchange, t)) for t in types):
+                try:
+                    os.remove(os.path.join(_dir, f))
+                except OSError:
+                    pass
+
+
+class SQLiteBackend:
+    """
+    A database per exchange (<CACHE_DIR>/<exchange>/cache.sqlite), the items
+    stored as JSON text in a table keyed by (type, timestamp_ms). The latest item(s)
+    are found by an index lookup rather than listing and decoding filenames.
+    The data is never unpickled, as whoever can write into the cache dir could run
+    code in the reading processes; rows that aren't text (pickles written by
+    earlier versions) are ignored.
+    The databases are opened in WAL mode (readers don't block the writer)
+    and memory-mapped.
+    """
+
+    name = "sqlite"
+    filename = "cache.sqlite"
+    mmap_size = 256 * 1024**2
+
+    def __init__(self):
+        # {(path, pid): connection}
+        self._connections = {}
+
+    def _path(self, exchange):
+        return os.path.join(get_cache_dir(), exchange, self.filename)
+
+    def _connect(self, exchange, create=True):
+        path = self._path(exchange)
+        key = (path, os.getpid())
+        conn = self._connections.get(key)
+        if conn is not None:
+            return conn
+        if not os.path.exists(path):
+            if not create:
+                return None
+            make_dirpath(os.path.dirname(path))
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA mmap_size={}".format(self.mmap_size))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS items (type TEXT NOT NULL,"
+            " date INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (type, date))"
+        )
+        self._connections[key] = conn
+        return conn
+
+    def probe(self, exchange, type, limit=-1, max=None):
+        """:returns: [fnInf without data, ...] latest first"""
+        conn = self._connect(exchange, create=False)
+        if conn is None:
+            return []
+        since = timestamp_ms(limit) if limit != -1 else -(2**63)
+        rows = conn.execute(
+            "SELECT date FROM items WHERE type = ? AND date >= ?"
+            " AND typeof(data) = 'text' ORDER BY date DESC LIMIT ?",
+            (_type_str(type), since, max if max is not None else -1),
+        )
+        items = []
+        for (date,) in rows:
+            date = pydt_from_ms(date)
+            items.append(
+                fnInf(exchange, type, date, encode_filename(exchange, type, date))
+            )
+        return items
+
+    def read(self, exchange, tpl):
+        conn = self._connect(exchange, create=False)
+        row = None
+        if conn is not None:
+            row = conn.execute(
+                "SELECT data FROM items WHERE type = ? AND date = ?"
+                " AND typeof(data) = 'text'",
+                (_type_str(tpl.type), timestamp_ms(tpl.date)),
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(
+                "{} not found in {}".format(tpl.file, self._path(exchange))
+            )
+        return json.loads(row[0])
+
+    def write(self, item):
+        conn = self._connect(item.exchange)
+        conn.execute(
+            "INSERT OR REPLACE INTO items (type, date, data) VALUES (?, ?, ?)",
+            (
+                _type_str(item.type),
+                timestamp_ms(item.date),
+                json.dumps(item.data, cls=DateTimeEncoder),
+            ),
+        )
+
+    def trim(self, exchange, type, maxlen):
+        conn = self._connect(exchange)
+        type_str = _type_str(type)
+        conn.execute(
+            "DELETE FROM items WHERE type = ? AND date NOT IN"
+            " (SELECT date FROM items WHERE type = ? ORDER BY date DESC LIMIT ?)",
+            (type_str, type_str, maxlen),
+        )
+
+    def clear(self, exchange, types):
+        conn = self._connect(exchange, create=False)
+        if conn is None:
+            return
+        for t in types:
+            conn.execute(
+                "DELETE FROM items WHERE type = ? OR type LIKE ? ESCAPE '\\'",
+                (t, t.replace("_", "\\_") + "\\_%"),
+            )
+        if conn.execute("SELECT 1 FROM items LIMIT 1").fetchone() is None:
+            conn.close()
+            del self._connections[(self._path(exchange), os.getpid())]
+            for sfx in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self._path(exchange) + sfx)
+                except OSError:
+                    pass
+
+
+BACKENDS = {
+    "json": JSONBackend(),
+    "sqlite": SQLiteBackend(),
+}
+
+
+def get_backend():
+    return BACKENDS[get_setting("cache_backend")]
+
+
 def _get_blocks(exchange, type=None):
     _dir = make_dirpath(get_cache_dir(), exchange, "__block__")
     blocks = []
@@ -1003,7 +1292,173 @@ def create_new(exchange, type, date=None, file=None, data=None):
     return fnInf(exchange, type, date, file, data)
 
 
+def _lock_path(exchange, type):
+    _dir = make_dirpath(get_cache_dir(), exchange, "__block__")
+    fn = "__[{}]_{}.lock".format(exchange.lower(), _type_str(type))
+    return os.path.join(_dir, fn)
+
+
+def _try_lock(path):
+    """
+    :returns: file descriptor holding the exclusive lock, or None if it is taken.
+    The lock files are never removed: a process waiting on the lock of a removed
+    file could acquire it while another one locks a new file at the same path.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _open_if_locked(path):
+    """:returns: file descriptor of the lock file if its exclusive lock is held"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return fd
+    os.close(fd)
+    return None
+
+
+def _wait_in_thread(fd, on_released):
+    """
+    Blocks on the shared lock of `fd` in a daemon thread (the OS wakes it up when
+    the exclusive lock is released), then closes `fd` and calls `on_released`.
+    A waiter that times out leaves the thread behind, it ends with the update.
+    """
+
+    def wait():
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        finally:
+            os.close(fd)
+            on_released()
+
+    threading.Thread(target=wait, daemon=True).start()
+
+
+def _acquire_and_release(path, timeout=None):
+    """Waits (at most `timeout` seconds) until no exclusive (update) lock is held"""
+    fd = _open_if_locked(path)
+    if fd is None:
+        return
+    if timeout is None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        finally:
+            os.close(fd)
+        return
+    released = threading.Event()
+    _wait_in_thread(fd, released.set)
+    released.wait(timeout)
+
+
 def _is_blocked(exchange, type):
+    """:returns: max seconds to wait for the update in progress (0 if there's none)"""
+    if fcntl is None:
+        return _marker_is_blocked(exchange, type)
+    type = _resolve_type(type)
+    try:
+        fd = os.open(_lock_path(exchange, type), os.O_RDONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return _BLOCK[_type0(type)]
+    finally:
+        os.close(fd)
+    return 0
+
+
+def _block(exchange, type, until, holds=False):
+    """
+    Takes the exclusive update lock of (exchange, type). Every call that returns
+    True must be paired with one `_release`; within the process the lock is
+    shared by its holders and released by the last of them.
+    The OS releases the lock if the process dies, so `until` only applies
+    to the marker file fallback.
+    :param holds: the caller already holds the lock (renews the marker only)
+    :returns: True if the caller holds the lock
+    """
+    if fcntl is None:
+        _marker_block(exchange, type, until)
+        return True
+    if holds:
+        return True
+    type = _resolve_type(type)
+    held = _held_locks.get((exchange, type))
+    if held is not None:
+        held[1] += 1
+        return True
+    fd = _try_lock(_lock_path(exchange, type))
+    if fd is None:
+        return False
+    _held_locks[(exchange, type)] = [fd, 1]
+    return True
+
+
+def _release(exchange, types):
+    """Releases the locks taken with `_block` (only to be called by their holders)"""
+    if fcntl is None:
+        return _marker_release(exchange, types)
+    if isinstance(types, str):
+        types = (types,)
+    for t in types:
+        key = (exchange, _resolve_type(t))
+        held = _held_locks.get(key)
+        if held is None:
+            continue
+        held[1] -= 1
+        if held[1] <= 0:
+            del _held_locks[key]
+            # closing the descriptor releases the lock
+            os.close(held[0])
+
+
+def _wait_till_released(exchange, type, timeout=None):
+    if fcntl is None:
+        return _marker_wait_till_released(exchange, type, timeout)
+    _acquire_and_release(_lock_path(exchange, _resolve_type(type)), timeout)
+
+
+async def _async_wait_till_released(exchange, type, timeout=None, *, loop=None):
+    if fcntl is None:
+        return await _marker_async_wait_till_released(exchange, type, timeout)
+    fd = _open_if_locked(_lock_path(exchange, _resolve_type(type)))
+    if fd is None:
+        return
+    loop = asyncio.get_running_loop()
+    released = loop.create_future()
+
+    def set_released():
+        if not released.done():
+            released.set_result(None)
+
+    def on_released():
+        try:
+            loop.call_soon_threadsafe(set_released)
+        except RuntimeError:  # the loop has been closed
+            pass
+
+    _wait_in_thread(fd, on_released)
+    try:
+        await asyncio.wait_for(released, timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+# Marker file based blocking, used where fcntl is not available
+
+
+def _marker_is_blocked(exchange, type):
     blocks = _get_blocks(exchange, type)
 
     if len(blocks):
@@ -1014,7 +1469,7 @@ def _is_blocked(exchange, type):
     return 0
 
 
-def _block(exchange, type, until):
+def _marker_block(exchange, type, until):
     if not isinstance(until, dt):
         until = dt.utcnow() + freq_to_td(until)
     # round to millisecond
@@ -1035,7 +1490,7 @@ def _block(exchange, type, until):
             pass
 
 
-def _release(exchange, types):
+def _marker_release(exchange, types):
     if isinstance(types, str):
         types = (types,)
 
@@ -1051,21 +1506,21 @@ def _release(exchange, types):
             pass
 
 
-def _wait_till_released(exchange, type, timeout=None):
+def _marker_wait_till_released(exchange, type, timeout=None):
     iterations = max(0, int(timeout / ITERATION_SLEEP)) if timeout is not None else None
     i = 0
-    while (iterations is None or i < iterations) and _is_blocked(exchange, type):
+    while (iterations is None or i < iterations) and _marker_is_blocked(exchange, type):
         time.sleep(ITERATION_SLEEP)
         i += 1
 
 
-async def _async_wait_till_released(exchange, type, timeout=None, *, loop=None):
+async def _marker_async_wait_till_released(exchange, type, timeout=None):
     iterations = (
         max(0, int(timeout / ASYNC_ITERATION_SLEEP)) if timeout is not None else None
     )
     i = 0
-    while (iterations is None or i < iterations) and _is_blocked(exchange, type):
-        await asyncio.sleep(ASYNC_ITERATION_SLEEP, loop=loop)
+    while (iterations is None or i < iterations) and _marker_is_blocked(exchange, type):
+        await asyncio.sleep(ASYNC_ITERATION_SLEEP)
         i += 1
 
 
@@ -1133,13 +1588,10 @@ def clear_cache(exchanges=None, types=None):
         types = list(_METHODS)
 
     for xc, xc_dir in xc_dirs.items():
-        xc_contents = os.listdir(xc_dir)
-        pths = [
-            os.path.join(xc_dir, f)
-            for f in xc_contents
-            if any(f.startswith("[{}]_{}".format(xc, method)) for method in types)
-        ]
+        for backend in BACKENDS.values():
+            backend.clear(xc, types)
 
+        pths = []
         block_dir = os.path.join(xc_dir, "__block__")
 
         if os.path.isdir(block_dir):
@@ -1,3 +1,4 @@
 from .exchange import ExchangeSocket
 from .errors import ExchangeSocketError, ConnectionLimit
 from .orderbook import OrderbookMaintainer
+from .rates import CrossRateEngine
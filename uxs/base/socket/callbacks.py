@@ -0,0 +1,266 @@
+"""
+Delivery of stream updates to the callbacks registered via `ExchangeSocket.add_callback`.
+
+Delivery modes:
+    "deep"    - every callback receives its own deep copy of the update (default)
+    "shallow" - every callback receives its own shallow copy of the update
+    "shared"  - all "shared" callbacks receive the same read-only view of the update;
+                no copying is done. The view must not be stored for later use
+                (instead store `view.copy()`), as the underlying data
+                may be modified by the following updates.
+
+`StreamQueue` is a bounded queue of stream updates, consumed as an async iterator
+(see `ExchangeSocket.stream`).
+"""
+
+import asyncio
+import copy as _copy
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+import itertools
+
+import fons.log
+
+logger, logger2, tlogger, tloggers, tlogger0 = fons.log.get_standard_5(__name__)
+
+DELIVERY_MODES = ("deep", "shallow", "shared")
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "block")
+
+
+class FrozenDict(Mapping):
+    """Read-only view of a dict. Nested dicts and lists are returned as views as well."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return freeze(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenDict, FrozenList)):
+            other = other._data
+        return self._data == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def copy(self):
+        """:returns: a (mutable) deep copy of the underlying dict"""
+        return _copy.deepcopy(self._data)
+
+
+class FrozenList(Sequence):
+    """Read-only view of a list (or tuple). Nested dicts and lists are returned as views."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return FrozenList(self._data[i])
+        return freeze(self._data[i])
+
+    def __iter__(self):
+        return map(freeze, self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenDict, FrozenList)):
+            other = other._data
+        return self._data == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def copy(self):
+        """:returns: a (mutable) deep copy of the underlying list"""
+        return _copy.deepcopy(self._data)
+
+
+def freeze(data):
+    """:returns: read-only view of `data` (immutable values are returned as they are)"""
+    if isinstance(data, dict):
+        return FrozenDict(data)
+    if isinstance(data, (list, tuple)):
+        return FrozenList(data)
+    return data
+
+
+def verify_delivery(delivery):
+    if delivery not in DELIVERY_MODES:
+        raise ValueError(
+            "Unknown callback delivery mode: {}; expected one of {}".format(
+                delivery, DELIVERY_MODES
+            )
+        )
+    return delivery
+
+
+def deliver(callbacks, data, copy=True):
+    """
+    :param callbacks: [(cb, delivery), ...]
+    :param copy: if False, every callback receives the original `data`,
+                 regardless of its delivery mode
+    """
+    shared = None
+    for cb, delivery in callbacks:
+        if not copy:
+            _data = data
+        elif delivery == "shared":
+            if shared is None:
+                shared = freeze(data)
+            _data = shared
+        elif delivery == "shallow":
+            _data = _copy.copy(data)
+        else:
+            _data = _copy.deepcopy(data)
+        cb(_data)
+
+
+def _symbol_key(update):
+    return update.get("symbol") if isinstance(update, dict) else None
+
+
+class StreamQueue:
+    """
+    Bounded queue of stream updates, consumed with `async for update in queue`.
+    `.put` is registered as a callback, so it is called synchronously by the
+    websocket handler and never waits for the consumer.
+
+    Overflow policies:
+        "drop_oldest" - if `maxsize` updates are pending, the oldest one is discarded
+        "coalesce"    - a new update replaces the pending update with the same key
+                        (symbol by default), keeping its place in the queue; if there is
+                        none and the queue is full, the oldest pending update is discarded.
+                        Meant for consumers that only need to know *that* a symbol changed
+                        (the state is read from e.g. `xs.orderbooks[symbol]`)
+        "block"       - nothing is discarded. As the updates are put from within the event
+                        loop, the websocket handler can't be blocked; the updates are
+                        buffered beyond `maxsize` and a warning is logged
+    """
+
+    def __init__(self, maxsize=1000, overflow="drop_oldest", key=None, flatten=False):
+        """
+        :param key: function(update) -> coalescing key; defaults to update["symbol"]
+        :param flatten: if True, `.put` receives a list of updates, which are queued
+                        one by one
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "Unknown overflow policy: {}; expected one of {}".format(
+                    overflow, OVERFLOW_POLICIES
+                )
+            )
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be >= 1, got: {}".format(maxsize))
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.key = key if key is not None else _symbol_key
+        self.flatten = flatten
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._items = OrderedDict()
+        self._ids = itertools.count()
+        self._event = None
+        self._warned = False
+        self._on_close = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, data):
+        if self.closed:
+            return
+        for update in data if self.flatten else [data]:
+            self._put(update)
+        if self._event is not None:
+            self._event.set()
+
+    def _put(self, update):
+        items = self._items
+        if self.overflow == "coalesce":
+            key = ("key", self.key(update))
+            if key in items:
+                items[key] = update
+                self.coalesced += 1
+                return
+        else:
+            key = next(self._ids)
+        if self.maxsize is not None and len(items) >= self.maxsize:
+            if self.overflow == "block":
+                if not self._warned:
+                    logger.warning(
+                        "Stream queue consumer lags behind: {} updates pending".format(
+                            len(items)
+                        )
+                    )
+                    self._warned = True
+            else:
+                items.popitem(last=False)
+                self.dropped += 1
+        items[key] = update
+
+    def get_nowait(self):
+        """:raises: IndexError if the queue is empty"""
+        if not self._items:
+            raise IndexError("Stream queue is empty")
+        update = self._items.popitem(last=False)[1]
+        if self._warned and len(self._items) < (self.maxsize or 0):
+            self._warned = False
+        return update
+
+    async def get(self):
+        """:raises: StopAsyncIteration if the queue is closed and empty"""
+        while not self._items:
+            if self.closed:
+                raise StopAsyncIteration
+            if self._event is None:
+                self._event = asyncio.Event()
+            await self._event.wait()
+            self._event.clear()
+        return self.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def add_close_callback(self, cb):
+        self._on_close.append(cb)
+
+    def close(self):
+        """Stops receiving updates. The iteration ends once the pending updates are consumed."""
+        if self.closed:
+            return
+        self.closed = True
+        for cb in self._on_close:
+            cb()
+        if self._event is not None:
+            self._event.set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
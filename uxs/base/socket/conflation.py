@@ -0,0 +1,174 @@
+"""
+Conflation of ticker / orderbook updates. Instead of setting the events and executing
+the callbacks on every update, the changes of a symbol are merged and emitted as
+one combined update, at most every `interval` seconds and/or only when the
+best bid/ask has changed.
+"""
+
+import time
+
+CONFLATED_STREAMS = ("ticker", "orderbook")
+
+
+class ObChanges:
+    """
+    Orderbook changes merged in place, by price. The levels are sorted only once,
+    when the merged callback data is created (`.to_data`).
+    """
+
+    __slots__ = ("symbol", "nonce", "levels")
+
+    def __init__(self, data):
+        self.symbol = data["symbol"]
+        self.nonce = data["nonce"]
+        self.levels = {"bids": {}, "asks": {}}
+        self.add(data)
+
+    def add(self, data):
+        self.nonce = (self.nonce[0], data["nonce"][1])
+        for side in ("bids", "asks"):
+            levels = self.levels[side]
+            for p, a0, a in data[side]:
+                level = levels.get(p)
+                if level is None:
+                    levels[p] = [p, a0, a]
+                else:
+                    level[2] = a
+
+    def to_data(self):
+        """Levels that end up unchanged are left out"""
+        data = {"symbol": self.symbol, "nonce": self.nonce}
+        for side in ("bids", "asks"):
+            data[side] = sorted(
+                (x for x in self.levels[side].values() if x[1] != x[2]),
+                key=lambda x: x[0],
+                reverse=(side == "bids"),
+            )
+        return data
+
+
+def merge_ob_changes(prev, new):
+    """
+    Merges two orderbook callback datas {'symbol', 'bids': [[price, prev_amount, amount], ...],
+    'asks', 'nonce': (prev_nonce, nonce)}. Levels that end up unchanged are left out.
+    """
+    changes = ObChanges(prev)
+    changes.add(new)
+    return changes.to_data()
+
+
+def merge_ticker_changes(prev, new):
+    return dict(prev, **new)
+
+
+class Conflator:
+    """
+    Settings are read from `xs.conflate`:
+        {stream: {symbol or -1: {'interval': <float>, 'top_only': <bool>}}}
+    where -1 applies to all symbols of the stream (that have no settings of their own).
+        interval - min seconds between two emitted updates of a symbol
+        top_only - emit only if the best bid/ask (price or amount) has changed
+    """
+
+    def __init__(self, xs, emit):
+        """
+        :type xs: ExchangeSocket
+        :param emit: function(stream, symbol, cb_input, set_event) that sets
+                     the events and executes the callbacks
+        """
+        self.xs = xs
+        self.emit = emit
+        self.pending = {}
+        self.set_event = {}
+        self.last_emitted = {}
+        self.last_top = {}
+        self.handles = {}
+
+    def get_settings(self, stream, symbol):
+        by_id = self.xs.conflate.get(stream)
+        if not by_id:
+            return None
+        settings = by_id.get(symbol, by_id.get(-1))
+        if not settings or not (settings.get("interval") or settings.get("top_only")):
+            return None
+        return settings
+
+    def is_enabled(self, stream, symbol):
+        return self.get_settings(stream, symbol) is not None
+
+    def get_top(self, stream, symbol):
+        if stream == "orderbook":
+            ob = self.xs.orderbooks.get(symbol) or {}
+            return tuple(
+                tuple(ob[side][0][:2]) if ob.get(side) else None
+                for side in ("bids", "asks")
+            )
+        ticker = self.xs.tickers.get(symbol) or {}
+        return tuple(ticker.get(x) for x in ("bid", "bidVolume", "ask", "askVolume"))
+
+    def push(self, stream, symbol, cb_input, set_event=True):
+        """Merges the update into the pending update of the symbol, and emits it if due"""
+        key = (stream, symbol)
+        prev = self.pending.get(key)
+        if prev is not None and stream == "orderbook":
+            # merged in place (the callback data is created at emit time)
+            changes = prev["data"]
+            if not isinstance(changes, ObChanges):
+                changes = ObChanges(changes)
+            changes.add(cb_input["data"])
+            cb_input = dict(cb_input, data=changes)
+        elif prev is not None:
+            data = merge_ticker_changes(prev["data"], cb_input["data"])
+            cb_input = dict(cb_input, data=data)
+        self.pending[key] = cb_input
+        self.set_event[key] = self.set_event.get(key, False) or set_event
+        self._emit_if_due(key)
+
+    def _on_timer(self, key):
+        self.handles.pop(key, None)
+        self._emit_if_due(key)
+
+    def _emit_if_due(self, key):
+        if key not in self.pending or key in self.handles:
+            return
+        stream, symbol = key
+        settings = self.get_settings(stream, symbol)
+        if settings is not None and settings.get("top_only"):
+            top = self.get_top(stream, symbol)
+            if top == self.last_top.get(key):
+                return
+        interval = settings.get("interval") if settings is not None else None
+        if interval:
+            elapsed = time.monotonic() - self.last_emitted.get(key, float("-inf"))
+            if elapsed < interval:
+                self.handles[key] = self.xs.loop.call_later(
+                    interval - elapsed, self._on_timer, key
+                )
+                return
+        self.flush(stream, symbol)
+
+    def flush(self, stream, symbol):
+        """Emits the pending update of the symbol (if any) regardless of the settings"""
+        key = (stream, symbol)
+        handle = self.handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        cb_input = self.pending.pop(key, None)
+        set_event = self.set_event.pop(key, True)
+        if cb_input is None:
+            return
+        if isinstance(cb_input["data"], ObChanges):
+            cb_input["data"] = cb_input["data"].to_data()
+        self.last_emitted[key] = time.monotonic()
+        self.last_top[key] = self.get_top(stream, symbol)
+        self.emit(stream, symbol, cb_input, set_event)
+
+    def discard(self, stream, symbol):
+        """Drops the pending update of the symbol (e.g. when its orderbook is recreated)"""
+        key = (stream, symbol)
+        handle = self.handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        self.pending.pop(key, None)
+        self.set_event.pop(key, None)
+        self.last_top.pop(key, None)
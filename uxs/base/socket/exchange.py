@@ -15,12 +15,16 @@ from ..ccxt import init_exchange, _ccxtWrapper
 from .. import poll
 from .orderbook import OrderbookMaintainer
 from .l3 import L3Maintainer
+from .callbacks import deliver, verify_delivery, StreamQueue
+from .conflation import Conflator, CONFLATED_STREAMS
+from .orders import OpenOrders, FillList
 from .errors import ExchangeSocketError, ConnectionLimit
 from uxs.fintls.basics import as_ob_fill_side, as_direction
 from uxs.fintls.ob import (
     get_stop_condition,
     create_orderbook,
-    update_branch,
+    update_branch_batch,
+    truncate_branch,
     assert_integrity,
     get_bidask,
 )
@@ -31,6 +35,9 @@ from uxs.fintls.l3 import (
     l3_to_l2,
 )
 from uxs.fintls.utils import resolve_times
+from uxs.fintls.trades import TradeStore
+from uxs.fintls.impact import BookDepth
+from uxs.fintls.ohlcv import CandleBuilder
 from wsclient import WSClient
 from wsclient.sub import Subscription
 
@@ -58,8 +65,12 @@ class ExchangeSocket(WSClient):
     test = False
 
     api = None  # ccxt.async_support.Exchange instance
-    snapi = None  # ccxt.Exchange instance
-    pro = None  # ccxtpro.Exchange instance (if ccxtpro installed and present in its library)
+    # .snapi: ccxt.Exchange instance
+    # .pro: ccxtpro.Exchange instance (if ccxtpro installed and present in its library)
+    #  (both are created on first access)
+    _snapi = None
+    _pro = None
+    _pro_initiated = False
     use_pro = False  # TODO
 
     # Used on .subscribe_to_{x} , raises ValueError when doesn't have
@@ -392,12 +403,26 @@ class ExchangeSocket(WSClient):
         "on_unassign": None,  # reload / restart
         "purge_cache_on_create": False,
         "assert_integrity": False,
+        # verify the orderbook against the "checksum" of updates that contain it
+        # (skipped with a warning if the exchange has no .calc_ob_checksum)
+        "checksum": False,
+        # what to do when the checksum doesn't match
+        "on_checksum_mismatch": "reload",  # reload / restart
+        # truncate bids/asks to the subscription's limit after each update
+        # (if the exchange doesn't send deletions of levels falling beyond it)
+        "truncate_to_limit": False,
         # whether or not bid and ask of ticker if modified on orderbook update
         "sends_bidAsk": False,
         "has_3rd_item": False,  # whether id/timestamp is in [price, amount, id/timestamp]
+        # the engine used for storing bids/asks and locating the price levels:
+        # "list" (linear scan), "bisect" or "sorted" (requires `sortedcontainers`),
+        # or a custom `uxs.fintls.ob_engines.EngineBranch` subclass
+        "engine": "list",
     }
 
     l3 = dict(ob)
+    # l3 engines: "list" (linear scan) or "index" (order id index + per-price FIFO queues)
+    l3["engine"] = "list"
 
     order = {
         # these two don't matter if the websocket itself
@@ -422,6 +447,17 @@ class ExchangeSocket(WSClient):
     store = {
         "trades": 1000,
         "ohlcv": 1000,
+        # store trades in NumPy arrays (uxs.fintls.trades.TradeStore) instead of deques
+        "trades_columnar": False,
+    }
+    # conflation of ticker / orderbook events and callbacks:
+    #   {stream: {symbol or -1 (all symbols): {"interval": <sec>, "top_only": <bool>}}}
+    # "interval": at most one (combined) update per symbol every `interval` seconds
+    # "top_only": emit only if the best bid / ask (price or amount) has changed
+    # See also .set_conflation
+    conflate = {
+        "ticker": {},
+        "orderbook": {},
     }
 
     # since socket interpreter may clog due to high CPU usage,
@@ -518,6 +554,7 @@ class ExchangeSocket(WSClient):
         "fetch_limits",
         "channel_ids",
         "intervals",
+        "conflate",
         "l3",
         "max_missed_intervals",
         "ob",
@@ -570,21 +607,12 @@ class ExchangeSocket(WSClient):
         self.api = init_exchange(
             dict(_params, kwargs=dict(_kwargs, load_cached_markets=load_cached_markets))
         )
-
-        # synchronous ccxt Exchange instance
-        self.snapi = init_exchange({**_params, "async": False})
+        # for .snapi and .pro
+        self._api_params = _params
 
         if self.use_pro:
             raise NotImplementedError("uxs library does not support ccxt pro yet.")
 
-        try:
-            self.pro = init_exchange({**_params, "pro": True})
-        except (ImportError, AttributeError) as e:
-            if self.use_pro:
-                raise ccxt.NotSupported(
-                    self.exchange + " is not supported by ccxt pro yet."
-                )
-
         self._init_has()
         self._init_exceptions()
 
@@ -592,11 +620,6 @@ class ExchangeSocket(WSClient):
         # can be `None`. Replace with empty dicts / lists instead.
         self.api._ensure_no_nulls()
 
-        self.api.sync_with_other(self.snapi)
-        if self.pro:
-            self.api.sync_with_other(self.pro)
-            self.snapi.sync_with_other(self.pro)
-
         names = [
             "ticker",
             "orderbook",
@@ -637,12 +660,18 @@ class ExchangeSocket(WSClient):
         self.tickers = {}
         self.balances = {"free": {}, "used": {}, "total": {}}
         self.orderbooks = {}
+        # {symbol: BookDepth} (see .get_ob_depth)
+        self._ob_depths = {}
         self.trades = {}
         self.ohlcv = {}
+        # {symbol: CandleBuilder} of ohlcv built from trades (see .build_ohlcv)
+        self.ohlcv_builders = {}
         self.l3_books = {}
         self.unprocessed_fills = defaultdict(list)
         self.orders = {}
-        self.open_orders = {}
+        # indexed by (symbol, side) for .is_order_conflicting
+        self.open_orders = OpenOrders()
+        # {order_id: FillList}
         self.fills = {}
         self.positions = {}
 
@@ -657,11 +686,41 @@ class ExchangeSocket(WSClient):
 
         self.orderbook_maintainer = self.OrderbookMaintainer_cls(self)
         self.l3_maintainer = L3Maintainer(self)
+        self.conflator = Conflator(self, self._emit_conflated)
         self._last_fetches = defaultdict(float)
         self._last_markets_loaded_ts = 0
         self._cancel_scheduled = set()
         self._futures = {}
 
+    @property
+    def snapi(self):
+        """Synchronous ccxt Exchange instance (created on first access)"""
+        if self._snapi is None:
+            self._snapi = self._init_secondary_api({**self._api_params, "async": False})
+        return self._snapi
+
+    @property
+    def pro(self):
+        """ccxtpro Exchange instance (created on first access), or None"""
+        if not self._pro_initiated:
+            self._pro_initiated = True
+            try:
+                self._pro = self._init_secondary_api({**self._api_params, "pro": True})
+            except (ImportError, AttributeError):
+                if self.use_pro:
+                    raise ccxt.NotSupported(
+                        self.exchange + " is not supported by ccxt pro yet."
+                    )
+        return self._pro
+
+    def _init_secondary_api(self, params):
+        api = init_exchange(params)
+        # markets, currencies etc are shared by reference
+        for other in (self.api, self._snapi, self._pro):
+            if other is not None:
+                other.sync_with_other(api)
+        return api
+
     def _init_events(self):
         markets = self.api.markets if self.api.markets is not None else {}
         currencies = self.api.markets if self.api.markets is not None else {}
@@ -985,8 +1044,9 @@ class ExchangeSocket(WSClient):
         return self.api.markets
 
     def sn_load_markets(self, reload=False, limit=None):
-        if not reload and self.snapi.markets:
-            return self.snapi.markets
+        # (markets are shared by reference, .snapi is only created for loading them)
+        if not reload and self.api.markets:
+            return self.api.markets
         if limit is None:
             limit = self.fetch_limits["markets"]
         self.snapi.poll_load_markets(limit)
@@ -995,10 +1055,9 @@ class ExchangeSocket(WSClient):
         return self.snapi.markets
 
     async def on_start(self):
-        # use synchronous function to block any simultaneous loading
-        # (e.g. when a subscription is created the first time),
-        # which would result in double fetch
-        self.sn_load_markets()
+        # simultaneous loading (e.g. when a subscription is created the first time)
+        # is joined to the same fetch by poll.update
+        await self.load_markets()
         for method in ["poll_loop", "fetch_data_loop"]:
             f = self._futures.get(method)
             if f is None or f.done():
@@ -1092,10 +1151,14 @@ class ExchangeSocket(WSClient):
             if enable_individual and self.is_subscribed_to(("ticker", symbol)):
                 self.change_subscription_state(("ticker", symbol), 1, True)
 
+            cb_input = {"_": "ticker", "symbol": symbol, "data": changes}
+            if self.conflator.is_enabled("ticker", symbol):
+                self.conflator.push("ticker", symbol, cb_input, set_event)
+                continue
+
             if set_event:
                 self.safe_set_event("ticker", symbol, {"_": "ticker", "symbol": symbol})
 
-            cb_input = {"_": "ticker", "symbol": symbol, "data": changes}
             self.exec_callbacks(cb_input, "ticker", symbol)
             cb_data.append(cb_input)
 
@@ -1122,8 +1185,11 @@ class ExchangeSocket(WSClient):
         """
         for ob in data:
             symbol = ob["symbol"]
+            # the pending conflated changes refer to the previous orderbook
+            self.conflator.discard("orderbook", symbol)
+            self._ob_depths.pop(symbol, None)
             self.orderbooks[symbol] = new = self.orderbook_maintainer._deep_overwrite(
-                create_orderbook(ob)
+                self.orderbook_maintainer.build_ob(ob)
             )
             if enable_sub and self.is_subscribed_to(("orderbook", symbol)):
                 self.change_subscription_state(("orderbook", symbol), 1, True)
@@ -1156,31 +1222,45 @@ class ExchangeSocket(WSClient):
                  'symbol': <str>,
                  'bids': [[bprice0,bqnt0],...],
                  'asks': [[aprice0,aqnt0],...],
-                 'nonce': <int> or None]}
+                 'nonce': <int> or None]},
+                 'limit': <int> (optional; the levels beyond it are cut off)
                 },
                 ...
             ]
         """
         cb_data = []
+        # symbols whose best bid / ask (price or amount) changed
+        top_changed = []
 
         for d in data:
             symbol = d["symbol"]
+            self._ob_depths.pop(symbol, None)
             amount_pcn = self.markets.get(symbol, {}).get("precision", {}).get("amount")
-            uniq_bid_changes, uniq_ask_changes = {}, {}
-
-            for side, uniq_changes in zip(
-                ("bids", "asks"), (uniq_bid_changes, uniq_ask_changes)
-            ):
-                branch = self.orderbooks[symbol][side]
-                for item in d[side]:
-                    p, a0, a = update_branch(
-                        item, branch, side, is_delta=is_delta, round_to=amount_pcn
+            prev_top = get_bidask(self.orderbooks[symbol], as_dict=True)
+            # [[price, prev_amount, new_amount], ...] (one entry per price level)
+            uniq_bid_changes, uniq_ask_changes = [
+                update_branch_batch(
+                    d[side],
+                    self.orderbooks[symbol][side],
+                    side,
+                    is_delta=is_delta,
+                    round_to=amount_pcn,
+                )
+                for side in ("bids", "asks")
+            ]
+            limit = d.get("limit")
+            if limit is not None:
+                # cut before the changes are emitted
+                uniq_bid_changes, uniq_ask_changes = [
+                    truncate_branch(self.orderbooks[symbol][side], limit, changes, side)
+                    for side, changes in zip(
+                        ("bids", "asks"), (uniq_bid_changes, uniq_ask_changes)
                     )
-                    try:
-                        a0 = uniq_changes.pop(p)[1]
-                    except KeyError:
-                        pass
-                    uniq_changes[p] = [p, a0, a]
+                ]
+            # an empty update is sent by the maintainer after (re)creating the orderbook
+            is_empty = not d["bids"] and not d["asks"]
+            if is_empty or get_bidask(self.orderbooks[symbol], as_dict=True) != prev_top:
+                top_changed.append(symbol)
 
             prev_nonce = self.orderbooks[symbol].get("nonce")
             if "nonce" in d:
@@ -1189,6 +1269,23 @@ class ExchangeSocket(WSClient):
             if enable_sub and self.is_subscribed_to(("orderbook", symbol)):
                 self.change_subscription_state(("orderbook", symbol), 1, True)
 
+            if self.ob["assert_integrity"]:
+                assert_integrity(self.orderbooks[symbol])
+
+            cb_input = {
+                "_": "orderbook",
+                "symbol": symbol,
+                "data": {
+                    "symbol": symbol,
+                    "bids": uniq_bid_changes,
+                    "asks": uniq_ask_changes,
+                    "nonce": (prev_nonce, d.get("nonce")),
+                },
+            }
+            if self.conflator.is_enabled("orderbook", symbol):
+                self.conflator.push("orderbook", symbol, cb_input, set_event)
+                continue
+
             if set_event:
                 self.safe_set_event(
                     "orderbook",
@@ -1201,30 +1298,81 @@ class ExchangeSocket(WSClient):
                     },
                 )
 
-            cb_input = {
-                "_": "orderbook",
-                "symbol": symbol,
-                "data": {
-                    "symbol": symbol,
-                    "bids": list(uniq_bid_changes.values()),
-                    "asks": list(uniq_ask_changes.values()),
-                    "nonce": (prev_nonce, d.get("nonce")),
-                },
-            }
             self.exec_callbacks(cb_input, "orderbook", symbol)
             cb_data.append(cb_input)
 
-            if self.ob["assert_integrity"]:
-                assert_integrity(self.orderbooks[symbol])
-
         if cb_data:
             if set_event:
                 self.safe_set_event("orderbook", -1)
             self.exec_callbacks(cb_data, "orderbook", -1)
 
-        self._update_tickers_from_ob([d["symbol"] for d in data])
+        # the ticker is not synced (nor its events / callbacks fired)
+        # if the update didn't reach the best bid / ask
+        self._update_tickers_from_ob(top_changed)
+
+    def get_ob_depth(self, symbol):
+        """
+        Cumulative depth of the orderbook, for market impact queries over many sizes
+        or price limits at once (see uxs.fintls.impact). Cached until the next
+        update of the orderbook.
+        :rtype: BookDepth
+        """
+        ob = self.orderbooks[symbol]
+        depth = self._ob_depths.get(symbol)
+        if depth is None or depth.ob is not ob:
+            depth = self._ob_depths[symbol] = BookDepth(ob)
+        return depth
+
+    def calc_ob_checksum(self, ob):
+        """
+        Calculate the exchange-specific checksum of the orderbook, as sent
+        under "checksum" key of the updates (`.ob["checksum"]` must be enabled).
+        Returns None if the exchange has no checksum support (the verification
+        is then skipped).
+        """
+        return None
+
+    def _emit_conflated(self, stream, symbol, cb_input, set_event=True):
+        if set_event:
+            broadcast = {"_": stream, "symbol": symbol}
+            if stream == "orderbook":
+                broadcast["bids_count"] = len(cb_input["data"]["bids"])
+                broadcast["aks_count"] = len(cb_input["data"]["asks"])
+            self.safe_set_event(stream, symbol, broadcast)
+        self.exec_callbacks(cb_input, stream, symbol)
+        if set_event:
+            self.safe_set_event(stream, -1)
+        self.exec_callbacks([cb_input], stream, -1)
+
+    def set_conflation(self, stream, id=-1, interval=None, top_only=False):
+        """
+        Conflate the events and callbacks of a stream: the changes are merged and
+        emitted as one combined update.
+        :param stream: "ticker" or "orderbook"
+        :param id: symbol, or -1 for all symbols (that have no settings of their own)
+        :param interval: at most one update per symbol every `interval` seconds
+        :param top_only: emit only when the best bid/ask (price or amount) has changed
+        If neither `interval` nor `top_only` is given, conflation is disabled
+        (and the pending changes are emitted).
+        """
+        if stream not in CONFLATED_STREAMS:
+            raise ValueError(
+                "Conflation is supported for streams {}, got: {}".format(
+                    CONFLATED_STREAMS, stream
+                )
+            )
+        if interval or top_only:
+            self.conflate[stream][id] = {"interval": interval, "top_only": top_only}
+            return
+        self.conflate[stream].pop(id, None)
+        for _stream, symbol in list(self.conflator.pending):
+            if _stream == stream and (id == -1 or symbol == id):
+                if not self.conflator.is_enabled(stream, symbol):
+                    self.conflator.flush(stream, symbol)
 
     def _update_tickers_from_ob(self, symbols):
+        if not symbols:
+            return
         sends = self.ob["sends_bidAsk"]
         does_send = sends and (
             not isinstance(sends, dict) or "_" not in sends or sends["_"]
@@ -1246,19 +1394,13 @@ class ExchangeSocket(WSClient):
         for symbol in symbols:
             if only_if_not_subbed and is_subbed(symbol):
                 continue
+            ob = self.orderbooks.get(symbol)
+            if ob is None:
+                continue
             d = {"symbol": symbol}
-            for side in ("bid", "ask"):
-                try:
-                    d.update(
-                        dict(
-                            zip(
-                                [side, side + "Volume"],
-                                self.orderbooks[symbol][side + "s"][0],
-                            )
-                        )
-                    )
-                except (IndexError, KeyError):
-                    pass
+            d.update(
+                (k, v) for k, v in get_bidask(ob, as_dict=True).items() if v is not None
+            )
             if len(d) > 1:
                 data.append(d)
 
@@ -1280,7 +1422,6 @@ class ExchangeSocket(WSClient):
         """
         for l3 in data:
             symbol = l3["symbol"]
-            amount_pcn = self.markets.get(symbol, {}).get("precision", {}).get("amount")
             self.l3_books[symbol] = new = self.l3_maintainer._deep_overwrite(
                 create_l3_orderbook(l3)
             )
@@ -1301,8 +1442,7 @@ class ExchangeSocket(WSClient):
                 assert_l3_integrity(self.l3_books[symbol])
 
             if self.l3_maintainer.is_subbed_to_l2_ob(symbol):
-                l2_ob = l3_to_l2(self.l3_books[symbol], amount_pcn)
-                self.create_orderbooks([l2_ob], enable_sub=True)
+                self.l3_maintainer.create_l2(symbol)
 
         if data and set_event:
             self.safe_set_event("l3", -1)
@@ -1324,7 +1464,7 @@ class ExchangeSocket(WSClient):
         """
         cb_data = []
         create_l2 = set()
-        push_to_l2 = set()
+        push_to_l2 = []
 
         for d in data:
             symbol = d["symbol"]
@@ -1338,8 +1478,11 @@ class ExchangeSocket(WSClient):
                     if p0 == p:
                         deltas[p] += a - a0
                     else:
-                        deltas[p0] -= a0
-                        deltas[p] += a
+                        # p0 is 0.0 for a new order, p may be 0.0 for a deleted one
+                        if p0:
+                            deltas[p0] -= a0
+                        if p:
+                            deltas[p] += a
                 if amount_pcn is not None:
                     for p, a in deltas.items():
                         deltas[p] = round(a, amount_pcn)
@@ -1377,23 +1520,30 @@ class ExchangeSocket(WSClient):
             cb_data.append(cb_input)
 
             if self.l3["assert_integrity"]:
-                assert_l3_integrity(self.orderbooks[symbol])
+                assert_l3_integrity(self.l3_books[symbol])
 
             if self.l3_maintainer.is_subbed_to_l2_ob(symbol):
-                if self.orderbooks.get(symbol) is None:
+                if not self.l3_maintainer.has_l2(symbol):
                     create_l2.add(symbol)
-                push_to_l2.add(symbol)
+                else:
+                    l2_update = self.l3_maintainer.update_l2(
+                        symbol, bid_deltas, ask_deltas
+                    )
+                    if "nonce" in d:
+                        l2_update["nonce"] = d["nonce"]
+                    push_to_l2.append(l2_update)
 
         if cb_data:
             if set_event:
                 self.safe_set_event("l3", -1)
             self.exec_callbacks(cb_data, "l3", -1)
 
-        push_data = [x["data"] for x in cb_data if x["symbol"] in push_to_l2]
+        # the (re)created l2 obs already contain the changes; for the rest
+        # only the new totals of the changed levels are pushed
         for symbol in create_l2:
             self.l3_maintainer.assign_l2(symbol)
-        if push_data:
-            self.update_orderbooks(push_data, is_delta=True, enable_sub=True)
+        if push_to_l2:
+            self.update_orderbooks(push_to_l2, is_delta=False, enable_sub=True)
 
         # self._update_tickers_from_ob([d['symbol'] for d in data])
 
@@ -1407,6 +1557,7 @@ class ExchangeSocket(WSClient):
                       ... increasing timestamp]
         """
         cb_data = []
+        ohlcv_data = []
         if key is None:
             key = self.trade["sort_by"]
         if not hasattr(key, "__call__") and key is not None:
@@ -1419,10 +1570,17 @@ class ExchangeSocket(WSClient):
             try:
                 add_to = self.trades[symbol]
             except KeyError:
-                add_to = self.trades[symbol] = deque(maxlen=self.store["trades"])
+                if self.store.get("trades_columnar"):
+                    add_to = TradeStore(self.store["trades"], key=key)
+                else:
+                    add_to = deque(maxlen=self.store["trades"])
+                self.trades[symbol] = add_to
 
             trades = sorted(trades, key=key)
-            sequence_insert(trades, add_to, key=key, duplicates="drop")
+            if isinstance(add_to, TradeStore):
+                add_to.extend(trades)
+            else:
+                sequence_insert(trades, add_to, key=key, duplicates="drop")
 
             if enable_sub and self.is_subscribed_to(("trades", symbol)):
                 self.change_subscription_state(("trades", symbol), 1, True)
@@ -1441,11 +1599,21 @@ class ExchangeSocket(WSClient):
             for t in trades:
                 self.add_fill_from_trade(t, enable_sub=enable_sub)
 
+            builder = self.ohlcv_builders.get(symbol)
+            if builder is not None:
+                for timeframe, ohlcv in builder.add_trades(trades, key).items():
+                    ohlcv_data.append(
+                        {"symbol": symbol, "timeframe": timeframe, "ohlcv": ohlcv}
+                    )
+
         if cb_data:
             if set_event:
                 self.safe_set_event("trades", -1)
             self.exec_callbacks(cb_data, "trades", -1)
 
+        if ohlcv_data:
+            self.update_ohlcv(ohlcv_data, set_event=set_event)
+
     def update_ohlcv(self, data, *, set_event=True, enable_sub=False):
         """
         :param data: [{'symbol': symbol, 'timeframe': timeframe, 'ohlcv': ohlcv}, ...]
@@ -1465,7 +1633,12 @@ class ExchangeSocket(WSClient):
             try:
                 add_to = by_timeframes[timeframe]
             except KeyError:
-                add_to = by_timeframes[timeframe] = deque(maxlen=self.store["ohlcv"])
+                builder = self.ohlcv_builders.get(symbol)
+                if builder is not None and timeframe in builder.candles:
+                    add_to = builder.candles[timeframe]
+                else:
+                    add_to = deque(maxlen=self.store["ohlcv"])
+                by_timeframes[timeframe] = add_to
 
             ohlcv = sorted(ohlcv, key=key)
             sequence_insert(ohlcv, add_to, key=key, duplicates="drop")
@@ -1859,6 +2032,10 @@ class ExchangeSocket(WSClient):
             amount_difference = params["amount"] - o["amount"]
 
         self.dict_update(params, o)
+        if not was_dict:
+            # the price (or symbol / side) may have changed
+            for _id in [id] + o["previousIds"]:
+                self.open_orders.reindex(_id)
 
         # Should it be forced that average can only decrease or increase (depending on order side),
         # assuming that the price hasn't been edited in the meanwhile?
@@ -2004,7 +2181,7 @@ class ExchangeSocket(WSClient):
         try:
             o_fills = self.fills[order]
         except KeyError:
-            o_fills = self.fills[order] = []
+            o_fills = self.fills[order] = FillList()
 
         if (symbol is None or side is None) and order is None:
             raise ValueError(
@@ -2012,11 +2189,9 @@ class ExchangeSocket(WSClient):
                 "defined if order is None.".format(self.name, id)
             )
 
-        loc = next((i for i, x in enumerate(o_fills) if x["id"] == id), None)
-
         # Overwriting a fill is not preferable, as it can mess up
         # "filled", "remaining" and "payout" of the fill's order
-        if loc is not None:
+        if o_fills.has_id(id):
             if warn:
                 self.log2(
                     "fill {} already registered.".format(
@@ -2235,33 +2410,38 @@ class ExchangeSocket(WSClient):
             d[id] = []
         return d[id]
 
-    def add_callback(self, cb, stream, id=-1):
+    def add_callback(self, cb, stream, id=-1, delivery="deep"):
         """
         :param cb: A function accepting one argument.
         :param stream: stream name
         :param id: symbol, currency, (symbol, timeframe), order_id, -1
+        :param delivery: how the update is passed to the callback:
+            "deep": a deep copy of the update (default)
+            "shallow": a shallow copy of the update
+            "shared": a read-only view of the update, shared by all "shared" callbacks
+                      of the stream + id. Nothing is copied; the view is valid only
+                      during the callback (use `view.copy()` to keep it)
         List of stream names:
             ticker, orderbook, ohlcv, trades, order, fill, balance, position
         Id -1 receives all updates of the stream in list form: [update1, ..., updateN]
         See method .wait_on docstring for stream + id combination examples.
         """
+        verify_delivery(delivery)
         l = self._fetch_callback_list(stream, id)
-        l.append(cb)
+        l.append((cb, delivery))
 
     def remove_callback(self, cb, stream, id=-1):
         l = self._fetch_callback_list(stream, id)
-        try:
-            l.remove(cb)
-        except ValueError:
+        loc = next((i for i, (_cb, _) in enumerate(l) if _cb == cb), None)
+        if loc is None:
             return None
-        else:
-            return True
+        del l[loc]
+        return True
 
     def exec_callbacks(self, data, stream, id=-1, copy=True):
         callbacks = self._fetch_callback_list(stream, id)
-        for cb in callbacks:
-            _data = data if not copy else _copy.deepcopy(data)
-            cb(_data)
+        if callbacks:
+            deliver(callbacks, data, copy)
 
     def fetch_data(self, s, prev_state):
         # If subsciption has been enabled, fetch all data
@@ -2804,6 +2984,46 @@ class ExchangeSocket(WSClient):
             }
         )
 
+    async def build_ohlcv(self, symbol, timeframes=("1m",), *, backfill=True):
+        """
+        Builds ohlcv of the symbol locally from its trades (which must be subscribed
+        to separately), for any fixed length timeframes ('1s' ... '1w'), including
+        those not streamed or supported by the exchange. The candles are stored in
+        `.ohlcv[symbol][timeframe]` and the ohlcv events / callbacks are triggered
+        as with streamed ohlcv.
+        :param backfill: fetch the previous candles of the timeframes that
+                         the exchange supports via `.fetch_ohlcv`
+        :returns: CandleBuilder
+        """
+        if isinstance(timeframes, str):
+            timeframes = [timeframes]
+        by_timeframes = self.ohlcv.setdefault(symbol, {})
+        prev = self.ohlcv_builders.get(symbol)
+        if prev is not None:
+            timeframes = prev.timeframes + list(timeframes)
+        builder = CandleBuilder(timeframes, by_timeframes, self.store["ohlcv"])
+        if prev is not None:
+            builder.last_key = prev.last_key
+        by_timeframes.update(builder.candles)
+        self.ohlcv_builders[symbol] = builder
+
+        if backfill:
+            supported = self.api.timeframes or {}
+            for timeframe in timeframes:
+                if timeframe not in supported or prev and timeframe in prev.timeframes:
+                    continue
+                try:
+                    # overwrites the overlapping candles that were built
+                    await self.fetch_ohlcv(symbol, timeframe)
+                except Exception as e:
+                    self.log_error(
+                        "could not backfill {} {} ohlcv".format(symbol, timeframe), e
+                    )
+        return builder
+
+    def stop_building_ohlcv(self, symbol):
+        self.ohlcv_builders.pop(symbol, None)
+
     def subscribe_to_account(self, params={}):
         return self.subscribe_to(
             self.ip.extend(
@@ -3273,7 +3493,7 @@ class ExchangeSocket(WSClient):
                 if id in self.fills:
                     self.fills[r["id"]] = self.fills[id]
                 else:
-                    self.fills[r["id"]] = self.fills[id] = []
+                    self.fills[r["id"]] = self.fills[id] = FillList()
             prev_amount = (
                 o_prev["remaining"]
                 if r.get("id") != id and o_prev.get("remaining") is not None
@@ -3547,13 +3767,12 @@ class ExchangeSocket(WSClient):
         return is_immediate_fill
 
     def is_order_conflicting(self, symbol, side, price):
+        """Whether the price would cross (or touch) own open orders of the opposite side"""
         fill_side = as_ob_fill_side(side)
-        sc = get_stop_condition(as_ob_fill_side(side), closed=False)
-        return any(
-            sc(price, o["price"])
-            for o in self.open_orders.values()
-            if o["symbol"] == symbol and o["side"] == fill_side
-        )
+        sc = get_stop_condition(fill_side, closed=False)
+        price_range = self.open_orders.get_price_range(symbol, fill_side)
+        # the condition is monotonic in price, so checking the extremes suffices
+        return price_range is not None and any(sc(price, p) for p in price_range)
 
     def is_order_balance_updating_enabled(self, order=None):
         # This needs some more thinking. lastTradeTimestamp is not sufficient.
@@ -3602,6 +3821,40 @@ class ExchangeSocket(WSClient):
         await event.wait()
         event.clear()
 
+    def stream(
+        self,
+        stream,
+        id=-1,
+        maxsize=1000,
+        overflow="drop_oldest",
+        key=None,
+        delivery="deep",
+    ):
+        """
+        Receive every update of a stream through a bounded queue, without stalling
+        the websocket handler:
+            async with xs.stream('orderbook', 'BTC/USDT') as updates:
+                async for update in updates:
+                    ...
+        :param stream: the stream name (see `.wait_on`)
+        :param id: symbol, currency, (symbol, timeframe), order_id, -1
+                   Unlike callbacks, id -1 yields the updates one by one.
+        :param maxsize: max number of pending updates; None for unbounded
+        :param overflow: "drop_oldest", "coalesce" (by symbol, or by `key(update)`)
+                         or "block" (nothing is dropped); see `StreamQueue`
+        :param delivery: "deep" or "shallow" copy of the update
+        :returns: StreamQueue; `.close()` it (or exit the `async with` block)
+                  to stop receiving
+        """
+        if delivery == "shared":
+            raise ValueError(
+                "Queued updates outlive the callback, use 'deep' or 'shallow' delivery"
+            )
+        queue = StreamQueue(maxsize, overflow, key, flatten=(id == -1))
+        self.add_callback(queue.put, stream, id, delivery)
+        queue.add_close_callback(lambda: self.remove_callback(queue.put, stream, id))
+        return queue
+
     async def wait_on_order(self, id, cb=None, stream_deltas=[], defaults={}):
         """
         :param cb: a callback function accepting args: (order, changes); called on every update
@@ -1,5 +1,5 @@
 from .orderbook import OrderbookMaintainer
-from uxs.fintls.l3 import create_l3_orderbook, l3_to_l2
+from uxs.fintls.l3 import create_l3_orderbook, create_l3_branch, L2Aggregator
 import fons.log
 
 logger, logger2, tlogger, tloggers, tlogger0 = fons.log.get_standard_5(__name__)
@@ -13,9 +13,22 @@ class L3Maintainer(OrderbookMaintainer):
     update_method = "update_l3_orderbooks"
     name = "l3 ob"
 
+    def __init__(self, xs):
+        super().__init__(xs)
+        # {symbol: L2Aggregator}, for emulating l2 orderbooks
+        self.l2_aggregators = {}
+
     def build_ob(self, ob):
         return create_l3_orderbook(ob)
 
+    def create_branch(self, side):
+        return create_l3_branch(self.cfg.get("engine"), side)
+
+    def _deep_overwrite(self, new_ob):
+        # the l2 totals are recalculated when the emulated l2 ob is (re)created
+        self.l2_aggregators.pop(new_ob["symbol"], None)
+        return super()._deep_overwrite(new_ob)
+
     def _push_cache(self, symbol, force_till_id=None):
         is_synced, performed_update = super()._push_cache(symbol, force_till_id)
         if not is_synced and self.is_subbed_to_l2_ob(symbol):
@@ -34,9 +47,32 @@ class L3Maintainer(OrderbookMaintainer):
 
     def assign_l2(self, symbol):
         if self.is_subbed_to_l2_ob(symbol) and self.is_synced[symbol]:
-            amount_pcn = (
-                self.xs.markets.get(symbol, {}).get("precision", {}).get("amount")
-            )
-            l2_ob = l3_to_l2(self.xs.l3_books[symbol], amount_pcn)
-            # self.xs.ob_maintainer.send_orderbook(l2_ob)
-            self.xs.create_orderbooks([l2_ob], enable_sub=True)
+            self.create_l2(symbol)
+
+    def create_l2(self, symbol):
+        """(Re)creates the emulated l2 orderbook from the l3 orderbook"""
+        amount_pcn = self.xs.markets.get(symbol, {}).get("precision", {}).get("amount")
+        l3_ob = self.xs.l3_books[symbol]
+        self.l2_aggregators[symbol] = aggregator = L2Aggregator(l3_ob, amount_pcn)
+        l2_ob = aggregator.to_l2(l3_ob)
+        # self.xs.ob_maintainer.send_orderbook(l2_ob)
+        self.xs.create_orderbooks([l2_ob], enable_sub=True)
+
+    def has_l2(self, symbol):
+        """Whether the emulated l2 orderbook can be updated incrementally"""
+        return (
+            symbol in self.l2_aggregators and self.xs.orderbooks.get(symbol) is not None
+        )
+
+    def update_l2(self, symbol, bid_deltas, ask_deltas):
+        """
+        :param bid_deltas: {price: amount_delta}, as applied to the l3 orderbook
+        :param ask_deltas: {price: amount_delta}
+        :returns: the l2 update with the new total amounts of changed levels
+        """
+        aggregator = self.l2_aggregators[symbol]
+        return {
+            "symbol": symbol,
+            "bids": aggregator.apply("bids", bid_deltas),
+            "asks": aggregator.apply("asks", ask_deltas),
+        }
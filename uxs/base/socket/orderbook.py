@@ -1,15 +1,145 @@
 import asyncio
+from bisect import bisect_right
 from collections import defaultdict
+import heapq
 import time
 import math
 
 from fons.aio import call_via_loop_afut
-from uxs.fintls.ob import update_branch, infer_side, create_orderbook
+from uxs.fintls.ob import update_branch_batch, infer_side, create_orderbook
+from uxs.fintls.ob_engines import create_branch
 import fons.log
 
 logger, logger2, tlogger, tloggers, tlogger0 = fons.log.get_standard_5(__name__)
 
 
+def _resolve_nonce(nonce):
+    if not hasattr(nonce, "__iter__"):
+        return (nonce, nonce)
+    return nonce
+
+
+class UpdateCache:
+    """
+    Bounded cache of a symbol's updates, in the order they were added.
+    The updates are stored in a list with a moving head (trimmed in bulk), the
+    end nonces of the updates are kept in a parallel list for bisect lookup, and the
+    held updates (with "__hold_until__") in a heap ordered by their expiry.
+    An update's position is derived from its "__id__", as the ids of cached
+    updates are consecutive (updates are only removed from the front).
+    """
+
+    def __init__(self, maxlen=None):
+        self.maxlen = maxlen
+        self._items = []
+        self._nonces = []
+        self._head = 0
+        # whether the end nonces are non-decreasing (required for bisect lookup)
+        self._sorted = True
+        self._holds = []
+
+    def __len__(self):
+        return len(self._items) - self._head
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return iter(self._items[self._head :])
+
+    def __reversed__(self):
+        items = self._items
+        return (items[i] for i in range(len(items) - 1, self._head - 1, -1))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            r = range(self._head, len(self._items))[i]
+            if r.step == 1:
+                return self._items[r.start : r.stop]
+            return [self._items[j] for j in r]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("update cache index out of range")
+        return self._items[self._head + i]
+
+    def append(self, update):
+        n1 = _resolve_nonce(update.get("nonce"))[1]
+        if n1 is None or len(self) and (self._nonces[-1] is None or n1 < self._nonces[-1]):
+            self._sorted = False
+        self._items.append(update)
+        self._nonces.append(n1)
+        if "__hold_until__" in update:
+            self.add_hold(update)
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self.drop_before(len(self) - self.maxlen)
+
+    def add_hold(self, update):
+        heapq.heappush(self._holds, (update["__hold_until__"], update["__id__"]))
+
+    def clear(self):
+        self._items.clear()
+        self._nonces.clear()
+        self._holds.clear()
+        self._head = 0
+        self._sorted = True
+
+    def drop_before(self, pos):
+        """Removes the first `pos` updates"""
+        if pos >= len(self):
+            return self.clear()
+        self._head += max(0, pos)
+        # the list is compacted once the dropped part outgrows the rest
+        if self._head > len(self._items) // 2:
+            del self._items[: self._head]
+            del self._nonces[: self._head]
+            self._head = 0
+            if not self._sorted:
+                nonces = self._nonces
+                self._sorted = None not in nonces and all(
+                    nonces[i] <= nonces[i + 1] for i in range(len(nonces) - 1)
+                )
+
+    def loc_by_id(self, id):
+        """:returns: position of the update with the "__id__", or None"""
+        if not len(self):
+            return None
+        pos = id - self._items[self._head]["__id__"]
+        return pos if 0 <= pos < len(self) else None
+
+    def start_after_nonce(self, nonce):
+        """
+        :returns: the position following the last update whose end nonce <= `nonce`
+                  (0 if there is none)
+        """
+        if self._sorted:
+            return bisect_right(self._nonces, nonce, self._head) - self._head
+        nonces = self._nonces
+        return next(
+            (
+                i - self._head + 1
+                for i in range(len(nonces) - 1, self._head - 1, -1)
+                if nonces[i] is not None and nonces[i] <= nonce
+            ),
+            0,
+        )
+
+    def first_held(self, now, start=0):
+        """
+        :returns: position of the first update at/after `start` that is held
+                  (its "__hold_until__" is later than `now`), or None
+        """
+        holds = self._holds
+        first_id = self._items[self._head]["__id__"] if len(self) else math.inf
+        while holds and (holds[0][0] <= now or holds[0][1] < first_id):
+            heapq.heappop(holds)
+        positions = (self.loc_by_id(id) for _, id in holds)
+        return min(
+            (pos for pos in positions if pos is not None and pos >= start),
+            default=None,
+        )
+
+
 class OrderbookMaintainer:
     """Maintains orderbooks of ExchangeSocket"""
 
@@ -26,7 +156,7 @@ class OrderbookMaintainer:
 
         def cache_item():
             return {
-                "updates": [],
+                "updates": UpdateCache(self.cfg["cache_size"]),
                 "last_reload_execution": None,
                 "last_restart_execution": None,
                 "last_warned": None,
@@ -198,11 +328,15 @@ class OrderbookMaintainer:
             if prev.get(k) is not None:
                 prev[k].clear()
             else:
-                prev[k] = []
+                prev[k] = self.create_branch(k)
             prev[k] += new_ob[k]
 
         return prev
 
+    def create_branch(self, side):
+        """Creates an empty bids/asks branch using the engine set in config"""
+        return create_branch(self.cfg.get("engine"), side)
+
     def _change_status(self, symbol, status):
         if self.xs.sh.is_subscribed_to(self.id_tuple(symbol)):
             # This will also delete the orderbook (assuming delete_data_on_unsub=True)
@@ -216,6 +350,7 @@ class OrderbookMaintainer:
         hold = update["__hold__"]
         id = update["__id__"]
         update["__hold_until__"] = time.time() + hold
+        self.cache[symbol]["updates"].add_hold(update)
         hs = holds[symbol]
         to = next((x for i, x in enumerate(hs) if hold <= x[0]), None)
         if to is None:
@@ -239,16 +374,11 @@ class OrderbookMaintainer:
     @staticmethod
     def _play_out(ob, to_push, side):
         """Predicts the resulting outermost bid/ask after pushing the updates"""
-        nullified = set()
         new_branch = []
         extremum = 0 if side == "bids" else math.inf
         op = max if side == "bids" else min
-        for item in to_push[side]:
-            price, _, amount = update_branch(item, new_branch, side)
-            if not amount:
-                nullified.add(price)
-            elif price in nullified:
-                nullified.remove(price)
+        changes = update_branch_batch(to_push[side], new_branch, side)
+        nullified = set(price for price, _, amount in changes if not amount)
         if new_branch:
             extremum = op(extremum, new_branch[0][0])
         ob_extremum = next(
@@ -269,16 +399,12 @@ class OrderbookMaintainer:
         for x in keys:
             if update.get(x) is None:
                 update[x] = []
-        cache_size = self.cfg["cache_size"]
         cache = self.cache[update["symbol"]]["updates"]
         update["time_added"] = time.time()
         # update = dict(update, nonce=self.resolve_nonce(update['nonce']))
+        # the cache drops the oldest updates beyond "cache_size"
         cache.append(update)
 
-        if cache_size is not None:
-            while len(cache) > cache_size:
-                cache.pop(0)
-
     def _push_cache(self, symbol, force_till_id=None):
         """
         :param force_till_id: -1: pushes everything
@@ -303,44 +429,24 @@ class OrderbookMaintainer:
         cur_nonce = ob["nonce"]
         updates = self.cache[symbol]["updates"]
         to_push = {"symbol": symbol, "bids": [], "asks": []}
-        eligible = eligible_nonce = updates
-
-        if uses_nonce:
-            start_from = next(
-                (
-                    len(updates) - i
-                    for i, u in enumerate(reversed(updates))
-                    if self.resolve_nonce(u["nonce"])[1] <= cur_nonce
-                ),
-                0,
-            )
-            eligible = eligible_nonce = updates[start_from:]
-
+        # positions in the cache
+        start_from = updates.start_after_nonce(cur_nonce) if uses_nonce else 0
         up_to = None
         id_loc = -1
 
         if force_till_id not in (None, -1):
-            id_loc = next(
-                (i for i, u in enumerate(eligible) if u["__id__"] == force_till_id), -1
-            )
+            loc = updates.loc_by_id(force_till_id)
+            if loc is not None and loc >= start_from:
+                id_loc = loc - start_from
 
         if force_till_id != -1:
             # Include all that come after the id and are not held / are expired
-            include = next(
-                (
-                    i
-                    for i, u in enumerate(eligible[id_loc + 1 :])
-                    if "__hold_until__" in u and u["__hold_until__"] > now
-                ),
-                None,
-            )
-            up_to = include
-
-        if up_to is not None:
-            up_to += id_loc + 1
+            held_loc = updates.first_held(now, start_from + id_loc + 1)
+            if held_loc is not None:
+                up_to = held_loc - start_from
 
-        if up_to is not None:
-            eligible = eligible[:up_to]
+        end = start_from + up_to if up_to is not None else len(updates)
+        eligible = updates[start_from:end]
 
         def _reset(method, reason):
             if self._is_time(symbol, method):
@@ -362,6 +468,7 @@ class OrderbookMaintainer:
         else:
             _is_synced = _is_increasing
 
+        checksum = None
         for u in eligible:
             n0, n1 = self.resolve_nonce(u.get("nonce"))
             if uses_nonce and n1 <= cur_nonce:
@@ -390,8 +497,12 @@ class OrderbookMaintainer:
                 else:
                     to_push[inferred_side] += [item]
             cur_nonce = n1
+            # only the state after the last update can be verified
+            checksum = u.get("checksum")
 
         to_push["nonce"] = cur_nonce
+        if self.cfg["truncate_to_limit"]:
+            to_push["limit"] = self.get_limit(symbol)
         performed_update = False
 
         # If not synced should the orderbook be updated?
@@ -403,13 +514,43 @@ class OrderbookMaintainer:
         # print(ob['nonce'])
 
         if not uses_nonce:
-            # Not dropping them would result in them being re-counted as "eligible_nonce" afterwards
-            self.cache[symbol]["updates"] = (
-                eligible_nonce[up_to:] if up_to is not None else []
-            )
+            # Not dropping them would result in them being re-counted as eligible afterwards
+            updates.drop_before(end)
+
+        if checksum is not None and self.cfg["checksum"]:
+            if not self.verify_checksum(symbol, checksum):
+                self.is_synced[symbol] = False
+                self._change_status(symbol, 0)
+                method = self.cfg["on_checksum_mismatch"] or "reload"
+                _reset(method, "checksum mismatch")
+                return False, performed_update
 
         return is_synced, performed_update
 
+    def verify_checksum(self, symbol, checksum):
+        ob = self.data.get(symbol)
+        if ob is None:
+            return True
+        calculated = self.xs.calc_ob_checksum(ob)
+        if calculated is None:
+            if not self.cache[symbol].get("checksum_warned"):
+                self.cache[symbol]["checksum_warned"] = True
+                self.xs.log(
+                    "{} {} checksum can't be calculated (not supported by {}); "
+                    "skipping the verification".format(
+                        self.name, symbol, self.xs.name
+                    )
+                )
+            return True
+        if calculated != checksum:
+            self.xs.log(
+                "{} {} checksum mismatch: {} (calculated) != {} (received)".format(
+                    self.name, symbol, calculated, checksum
+                )
+            )
+            return False
+        return True
+
     async def _push_cache_after(self, symbol, hold, force_till_id=None):
         if hold != 0:
             await asyncio.sleep(hold)
@@ -517,6 +658,13 @@ class OrderbookMaintainer:
             if s.merger is not None:
                 s.merger.params["limit"] = limit
 
+    def get_limit(self, symbol):
+        try:
+            s = self.xs.get_subscription(self.id_tuple(symbol))
+        except ValueError:
+            return None
+        return s.params.get("limit")
+
     def get_last_cached_nonce(self, symbol, default=None):
         cache = self.cache[symbol]["updates"]
         if len(cache):
@@ -525,9 +673,7 @@ class OrderbookMaintainer:
 
     @staticmethod
     def resolve_nonce(nonce):
-        if not hasattr(nonce, "__iter__"):
-            return (nonce, nonce)
-        return nonce
+        return _resolve_nonce(nonce)
 
     def id_tuple(self, symbol):
         return (self.channel, symbol)
@@ -0,0 +1,127 @@
+"""
+Indexed containers of the order/fill store of ExchangeSocket.
+"""
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from uxs.fintls.basics import as_ob_side
+
+
+class OpenOrders(dict):
+    """
+    {id: order} of open orders, additionally indexed by (symbol, ob side)
+    where the order rests ("bids" for buy orders, "asks" for sell orders),
+    with the prices of each (symbol, side) kept sorted.
+    An order's entry must be re-indexed (`.reindex(id)`) after its symbol,
+    side or price has been modified in place.
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__()
+        # {(symbol, side): {id: order}}
+        self._by_market = defaultdict(dict)
+        # {(symbol, side): [price0, price1, ...]} (sorted)
+        self._prices = defaultdict(list)
+        # {id: (symbol, side, price)} as indexed
+        self._indexed = {}
+        self.update(*args, **kw)
+
+    def _add(self, id, order):
+        side = order.get("side")
+        key = (order.get("symbol"), as_ob_side(side) if side else None)
+        price = order.get("price")
+        self._by_market[key][id] = order
+        if price is not None:
+            insort(self._prices[key], price)
+        self._indexed[id] = key + (price,)
+
+    def _remove(self, id):
+        symbol, side, price = self._indexed.pop(id)
+        key = (symbol, side)
+        orders = self._by_market[key]
+        del orders[id]
+        if price is not None:
+            prices = self._prices[key]
+            del prices[bisect_left(prices, price)]
+        if not orders:
+            del self._by_market[key]
+            self._prices.pop(key, None)
+
+    def __setitem__(self, id, order):
+        if id in self._indexed:
+            self._remove(id)
+        super().__setitem__(id, order)
+        self._add(id, order)
+
+    def __delitem__(self, id):
+        super().__delitem__(id)
+        self._remove(id)
+
+    def pop(self, id, *default):
+        if id not in self:
+            return super().pop(id, *default)
+        self._remove(id)
+        return super().pop(id)
+
+    def popitem(self):
+        id, order = super().popitem()
+        self._remove(id)
+        return id, order
+
+    def setdefault(self, id, default=None):
+        if id not in self:
+            self[id] = default
+        return self[id]
+
+    def update(self, *args, **kw):
+        for id, order in dict(*args, **kw).items():
+            self[id] = order
+
+    def clear(self):
+        super().clear()
+        self._by_market.clear()
+        self._prices.clear()
+        self._indexed.clear()
+
+    def reindex(self, id):
+        if id in self:
+            self[id] = self[id]
+
+    def get_orders(self, symbol, side):
+        """
+        :param side: ob side where the orders rest ("bids" / "asks")
+        :returns: {id: order}
+        """
+        return self._by_market.get((symbol, side), {})
+
+    def get_price_range(self, symbol, side):
+        """:returns: (lowest, highest) price of the orders, or None"""
+        prices = self._prices.get((symbol, side))
+        if not prices:
+            return None
+        return prices[0], prices[-1]
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def copy(self):
+        return self.__class__(self)
+
+
+class FillList(list):
+    """List of an order's fills, with a set of the fill ids for duplicate checks"""
+
+    def __init__(self, fills=()):
+        super().__init__(fills)
+        self.ids = set(f["id"] for f in self)
+
+    def append(self, fill):
+        super().append(fill)
+        self.ids.add(fill["id"])
+
+    def has_id(self, id):
+        if len(self.ids) != len(self):
+            # modified via other list methods (or contains duplicate ids)
+            self.ids = set(f["id"] for f in self)
+        return id in self.ids
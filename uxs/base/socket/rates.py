@@ -0,0 +1,148 @@
+"""
+Cross rates of currencies, kept up to date from the ticker / orderbook updates of an
+ExchangeSocket. Only the rates that depend on the updated markets are re-evaluated
+(see `uxs.fintls.conversion.ConversionTable.get_affected`).
+"""
+
+from uxs.fintls.conversion import ConversionTable
+from uxs.fintls.ob import calc_mid_price, calc_ob_mid_price
+
+SOURCES = ("ticker", "orderbook")
+
+
+class CrossRateEngine:
+    """
+    Rates of all currencies in the `targets` currencies, calculated from the
+    mid prices of the markets (as `calc_price` does). Read them with `.get_rate`,
+    or register a change callback with `.add_callback`.
+    """
+
+    def __init__(self, xs, targets, *, source="ticker", symbols=None, max_len=4):
+        """
+        :type xs: ExchangeSocket
+        :param targets: currencies that the rates are quoted in
+        :param source: "ticker" (updates of all tickers are used) or "orderbook"
+                       (updates of the `symbols` orderbooks)
+        :param symbols: the markets to be used (by default all of xs.markets)
+        :param max_len: max number of currencies in a conversion path
+        """
+        if source not in SOURCES:
+            raise ValueError(
+                "`source` must be one of {}, got: {}".format(SOURCES, source)
+            )
+        if source == "orderbook" and symbols is None:
+            raise ValueError("`symbols` must be given with source='orderbook'")
+        self.xs = xs
+        self.targets = list(targets)
+        self.source = source
+        self.symbols = list(symbols) if symbols is not None else list(xs.markets)
+        self.table = ConversionTable(self.symbols, max_len)
+        # {symbol: mid price}
+        self.prices = {}
+        # {target: {cy: rate}}
+        self.rates = {target: {} for target in self.targets}
+        self.callbacks = []
+        self.started = False
+
+    def start(self):
+        """Registers the xs callbacks and evaluates the current rates"""
+        if self.started:
+            return
+        if self.source == "ticker":
+            self.xs.add_callback(self._on_tickers, "ticker", -1, delivery="shared")
+        else:
+            for symbol in self.symbols:
+                self.xs.add_callback(
+                    self._on_orderbook, "orderbook", symbol, delivery="shared"
+                )
+        self.started = True
+        self.update(self.symbols)
+
+    def stop(self):
+        if not self.started:
+            return
+        if self.source == "ticker":
+            self.xs.remove_callback(self._on_tickers, "ticker", -1)
+        else:
+            for symbol in self.symbols:
+                self.xs.remove_callback(self._on_orderbook, "orderbook", symbol)
+        self.started = False
+
+    def add_callback(self, cb):
+        """
+        :param cb: function accepting one argument, the changed rates
+                   {target: {cy: rate or None (no longer resolvable)}}
+        """
+        self.callbacks.append(cb)
+
+    def remove_callback(self, cb):
+        if cb in self.callbacks:
+            self.callbacks.remove(cb)
+
+    def get_rate(self, cy, target):
+        """:returns: the price of `cy` in `target`, or None"""
+        if cy == target:
+            return 1.0
+        return self.rates[target].get(cy)
+
+    def get_price(self, symbol):
+        """:returns: the price of `symbol` ("base/quote"), or None"""
+        base, quote = symbol.split("/")
+        if quote in self.rates:
+            return self.get_rate(base, quote)
+        return self.prices.get(symbol)
+
+    def _on_tickers(self, updates):
+        self.update([u["symbol"] for u in updates])
+
+    def _on_orderbook(self, update):
+        self.update([update["symbol"]])
+
+    def _get_mid_price(self, symbol):
+        if self.source == "orderbook":
+            ob = self.xs.orderbooks.get(symbol)
+            return calc_ob_mid_price(ob) if ob is not None else None
+        t = self.xs.tickers.get(symbol)
+        if t is None:
+            return None
+        mid = calc_mid_price(t.get("bid"), t.get("ask"))
+        return mid if mid is not None else t.get("last")
+
+    def update(self, symbols):
+        """
+        Re-evaluates the rates that depend on the markets.
+        :returns: the changed rates (as passed to the callbacks)
+        """
+        changed_symbols = []
+        for symbol in symbols:
+            price = self._get_mid_price(symbol)
+            if price == self.prices.get(symbol):
+                continue
+            if price is None:
+                del self.prices[symbol]
+            else:
+                self.prices[symbol] = price
+            changed_symbols.append(symbol)
+        if not changed_symbols:
+            return {}
+
+        changes = {}
+        for target, rates in self.rates.items():
+            affected = self.table.get_affected(changed_symbols, target)
+            new_rates = self.table.calc_prices(self.prices, target, affected)
+            target_changes = {}
+            for cy in affected:
+                rate = new_rates.get(cy)
+                if rate != rates.get(cy):
+                    target_changes[cy] = rate
+                    if rate is None:
+                        del rates[cy]
+                    else:
+                        rates[cy] = rate
+            if target_changes:
+                changes[target] = target_changes
+
+        if changes:
+            for cb in self.callbacks:
+                cb(changes)
+        return changes
@@ -3,6 +3,7 @@ from . import charting
 from . import l3
 from . import margin
 from . import ob
+from . import ob_engines
 from . import ohlcv
 from . import shapes
 from . import utils
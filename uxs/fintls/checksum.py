@@ -0,0 +1,66 @@
+"""
+Orderbook checksums, as published by some exchanges (e.g. kraken) alongside
+the orderbook updates. Only the top N levels are formatted and hashed.
+"""
+
+import math
+import zlib
+
+
+def decimals_from_precision(precision, is_tick_size=False):
+    """Number of decimals from ccxt market precision (decimal places or tick size)"""
+    if precision is None:
+        return None
+    if is_tick_size or isinstance(precision, float) and precision < 1:
+        return max(0, round(-math.log10(precision)))
+    return int(precision)
+
+
+def strip_decimal(x, decimals):
+    """Formats `x` with the given decimals, removes the decimal point and leading zeros"""
+    return "{:.{}f}".format(x, decimals).replace(".", "").lstrip("0")
+
+
+class CRC32Checksum:
+    """
+    CRC32 over the top `depth` levels of the orderbook sides (in `sides` order),
+    each level formatted by `format_level(price, amount) -> str`.
+    The formatted levels are cached, so that only the levels
+    that changed since the previous calculation are (re)formatted.
+    """
+
+    def __init__(self, format_level, depth=10, sides=("asks", "bids")):
+        self.format_level = format_level
+        self.depth = depth
+        self.sides = sides
+        self._formatted = {}
+
+    def __call__(self, ob):
+        formatted = self._formatted
+        new_formatted = {}
+        crc = 0
+        for side in self.sides:
+            for item in ob[side][: self.depth]:
+                level = (item[0], item[1])
+                data = formatted.get(level)
+                if data is None:
+                    data = self.format_level(*level).encode()
+                new_formatted[level] = data
+                crc = zlib.crc32(data, crc)
+        self._formatted = new_formatted
+        return crc
+
+
+def kraken_checksum(price_decimals, amount_decimals, depth=10):
+    """
+    Kraken: for asks (low to high) then bids (high to low), price and volume
+    formatted with the pair's decimals, decimal point and leading zeros removed,
+    concatenated over the top 10 levels and CRC32 hashed.
+    """
+
+    def format_level(price, amount):
+        return strip_decimal(price, price_decimals) + strip_decimal(
+            amount, amount_decimals
+        )
+
+    return CRC32Checksum(format_level, depth, ("asks", "bids"))
@@ -0,0 +1,192 @@
+"""
+Currency conversion over a market set, with precomputed paths.
+
+`ConversionTable` finds the shortest conversion paths of all currencies into a
+target currency with a single breadth-first search (per target), and caches
+them. The prices of any number of currencies are then evaluated in one pass
+over the cached paths, giving the same result as `uxs.fintls.basics.calc_price`
+(the average over the shortest paths whose prices are known).
+"""
+
+from collections import defaultdict
+
+from .basics import create_cy_graph
+
+
+class ConversionTable:
+    def __init__(self, markets_or_graph, max_len=4):
+        """
+        :param markets_or_graph: list of symbols, or graph resulting from
+                                 `create_cy_graph`
+        :param max_len: max number of currencies in a path (incl. source and target)
+        """
+        self.graph = (
+            markets_or_graph
+            if isinstance(markets_or_graph, dict)
+            else create_cy_graph(markets_or_graph)
+        )
+        self.max_len = max_len
+        # {target: {cy: [(next_cy, direction), ...]}}
+        self._hops = {}
+        # {target: {cy: number of conversions to target}}
+        self._dist = {}
+        # {target: {cy: {prev_cy, ...}}}
+        self._parents = {}
+        # {target: {symbol: [cy, ...]}} (currencies whose hops use the market)
+        self._users = {}
+
+    def get_hops(self, target):
+        """
+        :returns: {cy: [(next_cy, direction), ...]} where next_cy is one conversion
+                  closer to `target` (on a shortest path); `direction` as in the graph
+        """
+        hops = self._hops.get(target)
+        if hops is None:
+            hops = self._hops[target] = self._build_hops(target)
+        return hops
+
+    def get_distance(self, cy, target):
+        """:returns: the number of conversions from `cy` to `target`, or None"""
+        self.get_hops(target)
+        return self._dist[target].get(cy)
+
+    def _build_hops(self, target):
+        graph = self.graph
+        dist = {target: 0}
+        hops = {target: []}
+        frontier = [target]
+        d = 0
+        while frontier and d + 1 < self.max_len:
+            d += 1
+            next_frontier = []
+            for cy in frontier:
+                for other in graph.get(cy, ()):
+                    if other not in dist:
+                        dist[other] = d
+                        next_frontier.append(other)
+            frontier = next_frontier
+        for cy, d in dist.items():
+            if d:
+                # (in graph order, as enumerated by `find_optimal_paths`)
+                hops[cy] = [
+                    (nxt, direction)
+                    for nxt, direction in graph[cy].items()
+                    if dist.get(nxt) == d - 1
+                ]
+        self._dist[target] = dist
+        return hops
+
+    def _get_index(self, target):
+        if target not in self._parents:
+            parents = defaultdict(set)
+            users = defaultdict(list)
+            for cy, hops in self.get_hops(target).items():
+                for nxt, direction in hops:
+                    parents[nxt].add(cy)
+                    users[_symbol(cy, nxt, direction)].append(cy)
+            self._parents[target] = dict(parents)
+            self._users[target] = dict(users)
+        return self._parents[target], self._users[target]
+
+    def get_paths(self, source, target):
+        """
+        :returns: the shortest paths from `source` to `target`, in the format of
+                  `find_optimal_paths`: [[(source, None), (cy, direction), ...], ...]
+        """
+        hops = self.get_hops(target)
+        if source not in hops:
+            return []
+        paths = [[(source, None)]]
+        while paths[0][-1][0] != target:
+            paths = [pth + [hop] for pth in paths for hop in hops[pth[-1][0]]]
+        return paths
+
+    def get_affected(self, symbols, target):
+        """
+        :param symbols: markets whose prices changed
+        :returns: set of the currencies whose price in `target` depends on the markets
+        """
+        parents, users = self._get_index(target)
+        affected = set()
+        stack = []
+        for symbol in symbols:
+            stack += users.get(symbol, ())
+            base, _, quote = symbol.partition("/")
+            if quote == target:
+                # used directly if in prices
+                stack.append(base)
+        while stack:
+            cy = stack.pop()
+            if cy not in affected:
+                affected.add(cy)
+                stack += parents.get(cy, ())
+        return affected
+
+    def calc_price(self, market, prices):
+        """`calc_price` of uxs.fintls.basics, over the cached paths"""
+        if not isinstance(market, str):
+            market = "/".join(market)
+        base, quote = market.split("/")
+        result = self.calc_prices(prices, quote, [base])
+        if base not in result:
+            raise RuntimeError("Could not resolve price for market '{}'".format(market))
+        return result[base]
+
+    def calc_prices(self, prices, target, currencies=None):
+        """
+        :param prices: {symbol: price}
+        :param currencies: the currencies to be priced; by default all that have a
+                           path to `target`. For re-evaluation after some of the
+                           prices changed pass `.get_affected(changed_symbols, target)`.
+        :returns: {cy: price in target}, excluding the ones that couldn't be resolved
+        """
+        hops = self.get_hops(target)
+        if currencies is None:
+            currencies = list(hops)
+
+        # the currencies to be evaluated (incl. the ones on their paths)
+        needed = {target}
+        stack = [cy for cy in currencies if cy in hops]
+        while stack:
+            cy = stack.pop()
+            if cy not in needed:
+                needed.add(cy)
+                stack += (nxt for nxt, _ in hops[cy])
+        needed.discard(target)
+
+        # the sum of the prices along the paths (whose prices are known),
+        # and the number of such paths, starting from the currencies closest to target
+        sums = {target: 1.0}
+        counts = {target: 1}
+        for cy in sorted(needed, key=self._dist[target].get):
+            total = n = 0
+            for nxt, direction in hops[cy]:
+                nxt_count = counts[nxt]
+                if not nxt_count:
+                    continue
+                price = prices.get(_symbol(cy, nxt, direction))
+                if not price:
+                    continue
+                if direction:
+                    total += sums[nxt] / price
+                else:
+                    total += sums[nxt] * price
+                n += nxt_count
+            sums[cy] = total
+            counts[cy] = n
+
+        result = {}
+        for cy in currencies:
+            market = "{}/{}".format(cy, target)
+            if market in prices:
+                result[cy] = prices[market]
+            elif cy == target:
+                result[cy] = 1.0
+            elif counts.get(cy):
+                result[cy] = sums[cy] / counts[cy]
+        return result
+
+
+def _symbol(cy, nxt, direction):
+    """The market converting cy to nxt (direction as in the graph)"""
+    return "{}/{}".format(nxt, cy) if direction else "{}/{}".format(cy, nxt)
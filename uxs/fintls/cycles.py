@@ -0,0 +1,256 @@
+"""
+Live evaluation of arbitrage cycles (shapes of `uxs.fintls.shapes`).
+
+`CycleEvaluator` evaluates both orientations of every shape, i.e. the paths
+`shape.get_path(0, 1)` and `shape.get_path(0, -1)`, one row each. The legs of all
+rows are stored as NumPy arrays of market indexes and directions, and the markets
+are indexed to the rows that use them. When a market's prices change only
+the rows touching it are recomputed.
+
+The return of a row is the product of its legs' rates (after fees):
+    buy leg (direction 1):  1 / ask
+    sell leg (direction 0): bid
+A return > 1 is a profitable cycle (at the top of the books).
+"""
+
+import numpy as np
+
+from .ob import exec_step
+
+# rates of the padding market (of rows shorter than the longest one)
+_PAD = 1.0
+
+
+class CycleEvaluator:
+    def __init__(self, shapes, fees=0, depth=None):
+        """
+        :param shapes: [Shape, ...] or a ShapeTable
+        :param fees: taker fee (e.g. 0.001), or {exchange: fee}
+        :param depth: number of orderbook levels for the depth-limited vwap rates
+                      (`.vwap_returns`), calculated from `.update_orderbook` books;
+                      by default not calculated
+        """
+        self.depth = depth
+        self.paths = []
+        # {path: row index}
+        self._path_rows = {}
+        # {(exchange, symbol): market index}
+        self.markets = {}
+        rows = []
+        for shape in shapes:
+            for polarity in (1, -1):
+                path = shape.get_path(0, polarity)
+                self._path_rows.setdefault(path, len(self.paths))
+                self.paths.append(path)
+                rows.append(
+                    [
+                        (self.markets.setdefault((xc, symbol), len(self.markets)), d)
+                        for xc, symbol, d in path.entities
+                    ]
+                )
+
+        n_markets = len(self.markets)
+        width = max((len(r) for r in rows), default=0)
+        # the padding market has index n_markets
+        self.legs = np.full((len(rows), width), n_markets, dtype=np.intp)
+        self.directions = np.zeros((len(rows), width), dtype=np.intp)
+        for i, row in enumerate(rows):
+            self.legs[i, : len(row)] = [m for m, _ in row]
+            self.directions[i, : len(row)] = [d for _, d in row]
+
+        exchanges = [xc for xc, _ in self.markets]
+        if isinstance(fees, dict):
+            fee_factors = [1 - fees.get(xc, 0) for xc in exchanges]
+        else:
+            fee_factors = [1 - fees] * n_markets
+        self.fee_factors = np.array(fee_factors + [1.0])
+
+        # [sell rates, buy rates] by market (after fees)
+        self.rates = np.full((2, n_markets + 1), np.nan)
+        self.rates[:, n_markets] = _PAD
+        self.returns = np.full(len(rows), np.nan)
+        if depth is not None:
+            self.vwap_rates = self.rates.copy()
+            self.vwap_returns = self.returns.copy()
+
+        # rows by market
+        flat = self.legs.ravel()
+        order = np.argsort(flat, kind="stable")
+        row_indices = order // max(width, 1)
+        indptr = np.searchsorted(flat[order], np.arange(n_markets + 1))
+        self._rows = [
+            np.unique(row_indices[indptr[m] : indptr[m + 1]]) for m in range(n_markets)
+        ]
+
+        self.orderbooks = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_rows(self, exchange, symbol):
+        """:returns: indexes of the rows (paths) that trade the market"""
+        m = self.markets.get((exchange, symbol))
+        if m is None:
+            return np.empty(0, dtype=np.intp)
+        return self._rows[m]
+
+    def get_row(self, path):
+        """:returns: row index of the path (ValueError if it isn't evaluated)"""
+        try:
+            return self._path_rows[path]
+        except KeyError:
+            raise ValueError("{!r} is not evaluated".format(path)) from None
+
+    def _set_rates(self, rates, m, bid, ask):
+        fee_factor = self.fee_factors[m]
+        rates[0, m] = bid * fee_factor if bid else np.nan
+        rates[1, m] = fee_factor / ask if ask else np.nan
+
+    def _recompute(self, market_indexes):
+        if not market_indexes:
+            return np.empty(0, dtype=np.intp)
+        if len(market_indexes) == 1:
+            rows = self._rows[market_indexes[0]]
+        else:
+            rows = np.unique(np.concatenate([self._rows[m] for m in market_indexes]))
+        legs = self.legs[rows]
+        directions = self.directions[rows]
+        self.returns[rows] = self.rates[directions, legs].prod(axis=1)
+        if self.depth is not None:
+            self.vwap_returns[rows] = self.vwap_rates[directions, legs].prod(axis=1)
+        return rows
+
+    def update_prices(self, prices):
+        """
+        :param prices: {(exchange, symbol): (bid, ask)}
+        :returns: indexes of the recomputed rows
+        """
+        changed = []
+        for xcsym, (bid, ask) in prices.items():
+            m = self.markets.get(xcsym)
+            if m is None:
+                continue
+            self._set_rates(self.rates, m, bid, ask)
+            changed.append(m)
+        return self._recompute(changed)
+
+    def update_ticker(self, exchange, symbol, ticker):
+        return self.update_prices({(exchange, symbol): (ticker["bid"], ticker["ask"])})
+
+    def update_orderbook(self, exchange, symbol, ob):
+        """
+        Updates the rates from the orderbook (which is also kept for `.size`)
+        :returns: indexes of the recomputed rows
+        """
+        m = self.markets.get((exchange, symbol))
+        if m is None:
+            return np.empty(0, dtype=np.intp)
+        self.orderbooks[exchange, symbol] = ob
+        bids, asks = ob["bids"], ob["asks"]
+        self._set_rates(
+            self.rates, m, bids[0][0] if bids else None, asks[0][0] if asks else None
+        )
+        if self.depth is not None:
+            bid_vwap = _depth_vwap(bids, self.depth)
+            ask_vwap = _depth_vwap(asks, self.depth)
+            self._set_rates(self.vwap_rates, m, bid_vwap, ask_vwap)
+        return self._recompute([m])
+
+    def top(self, k=10, min_return=1.0, vwap=False):
+        """
+        :param vwap: rank by `.vwap_returns` (depth-limited) instead of top of the books
+        :returns: [(path, return), ...] of the k best rows with return > min_return,
+                  best first
+        """
+        returns = self.vwap_returns if vwap else self.returns
+        candidates = np.flatnonzero(returns > min_return)
+        if len(candidates) > k:
+            part = np.argpartition(-returns[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        candidates = candidates[np.argsort(-returns[candidates], kind="stable")]
+        return [(self.paths[i], float(returns[i])) for i in candidates]
+
+    def _simulate(self, row, amount):
+        """
+        Executes `amount` (of the path's first currency) through the orderbooks.
+        :returns: (amount out, marginal return) or None if a book was exhausted
+        """
+        marginal = 1.0
+        for j, (xc, symbol, direction) in enumerate(self.paths[row].entities):
+            ob = self.orderbooks.get((xc, symbol))
+            if ob is None:
+                return None
+            fee_factor = self.fee_factors[self.legs[row, j]]
+            # buy: quote -> base on the asks, sell: base -> quote on the bids
+            price, remainder, cumother = exec_step(
+                iter(ob["asks"] if direction else ob["bids"]),
+                amount,
+                stop="ignore",
+                unit="quote" if direction else "base",
+            )[:3]
+            if not price or remainder < 0:
+                return None
+            marginal *= fee_factor / price if direction else price * fee_factor
+            amount = cumother * fee_factor
+        return amount, marginal
+
+    def size(self, path_or_row, max_amount=None, tolerance=1e-9, max_iter=60):
+        """
+        Depth-aware sizing of a path over the books given to `.update_orderbook`:
+        the largest start amount (<= `max_amount`) at which the marginal return
+        (of the levels reached) is still > 1, found by bisection.
+        :param path_or_row: path (from `.top`) or row index
+        :param max_amount: in the path's first currency; by default the depth of the
+                           first leg's book
+        :returns: {'path', 'amount', 'amount_out', 'return', 'profit'}
+                  (amount is 0 if not profitable)
+        """
+        row = path_or_row if isinstance(path_or_row, (int, np.integer)) else None
+        if row is None:
+            row = self.get_row(path_or_row)
+        path = self.paths[row]
+        if max_amount is None:
+            xc, symbol, direction = path.entities[0]
+            ob = self.orderbooks.get((xc, symbol))
+            if ob is None:
+                max_amount = 0
+            elif direction:
+                max_amount = sum(x[0] * x[1] for x in ob["asks"])
+            else:
+                max_amount = sum(x[1] for x in ob["bids"])
+
+        lo, hi = 0.0, float(max_amount)
+        top = self._simulate(row, hi * tolerance) if hi else None
+        if top is None or not top[1] > 1:
+            pass
+        elif _is_profitable(self._simulate(row, hi)):
+            lo = hi
+        else:
+            for _ in range(max_iter):
+                mid = (lo + hi) / 2
+                if _is_profitable(self._simulate(row, mid)):
+                    lo = mid
+                else:
+                    hi = mid
+                if hi - lo <= tolerance * hi:
+                    break
+
+        amount_out = float(self._simulate(row, lo)[0]) if lo else 0.0
+        return {
+            "path": path,
+            "amount": lo,
+            "amount_out": amount_out,
+            "return": amount_out / lo if lo else None,
+            "profit": amount_out - lo,
+        }
+
+
+def _is_profitable(simulated):
+    return simulated is not None and simulated[1] > 1
+
+
+def _depth_vwap(branch, depth):
+    """vwap of the top `depth` levels"""
+    levels = branch[:depth]
+    volume = sum(x[1] for x in levels)
+    return sum(x[0] * x[1] for x in levels) / volume if volume else None
@@ -0,0 +1,147 @@
+"""
+Market impact of many order sizes / price limits at once.
+
+`BranchDepth` holds the prices and the cumulative base and quote depth of an
+orderbook branch in NumPy arrays, built once per orderbook version. A query for
+any number of sizes or price limits is then answered by a single `searchsorted`.
+The results correspond to those of `get_to_matching_volume` and
+`get_to_matching_price` of `uxs.fintls.ob` (with nothing executed before),
+each key holding an array of the queries' shape.
+"""
+
+import numpy as np
+
+from .basics import quotation_as_string
+
+
+class BranchDepth:
+    def __init__(self, branch, side):
+        """
+        :param branch: orderbook branch, [[price, amount], ...] (best price first)
+        :param side: "bids" / "asks"
+        """
+        self.side = side
+        items = np.array([x[:2] for x in branch], dtype=np.float64).reshape(-1, 2)
+        self.price = items[:, 0]
+        self.amount = items[:, 1]
+        self.cum_base = np.cumsum(self.amount)
+        self.cum_quote = np.cumsum(self.price * self.amount)
+
+    def __len__(self):
+        return len(self.price)
+
+    def _prev(self, cum, k):
+        """cum[k-1] (0 where k == 0)"""
+        return np.where(k > 0, cum[np.maximum(k - 1, 0)], 0.0)
+
+    def by_volume(self, volumes, unit="base"):
+        """
+        Executes each volume from the top of the branch.
+        :param volumes: a volume or a sequence of volumes
+        :param unit: the unit of the volumes ("base" / "quote")
+        :returns: {
+            "price": price of the last level reached,
+            "vwap": average price of the executed volume,
+            "remainder": amount left on the last level (in `unit`; negative if the
+                         branch was exhausted),
+            "cumother": executed volume in the other unit,
+            "i": number of levels reached,
+          }
+          If the branch is exhausted, vwap is of the volume available.
+        """
+        unit = quotation_as_string(unit)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        n = len(self)
+        if not n:
+            nan = np.full(volumes.shape, np.nan)
+            zero = np.zeros(volumes.shape)
+            return {
+                "price": nan,
+                "vwap": nan.copy(),
+                "remainder": -volumes,
+                "cumother": zero,
+                "i": zero.astype(np.intp),
+            }
+        if unit == "base":
+            cum, other = self.cum_base, self.cum_quote
+        else:
+            cum, other = self.cum_quote, self.cum_base
+
+        k = np.searchsorted(cum, volumes, "left")
+        last = np.minimum(k, n - 1)
+        price = self.price[last]
+        filled = np.minimum(volumes, cum[-1])
+        # the executed part of the last level
+        partial = filled - self._prev(cum, last)
+        if unit == "base":
+            cumother = self._prev(other, last) + partial * price
+        else:
+            cumother = self._prev(other, last) + partial / price
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = cumother / filled if unit == "base" else filled / cumother
+
+        return {
+            "price": price,
+            "vwap": vwap,
+            "remainder": cum[last] - volumes,
+            "cumother": cumother,
+            "i": np.minimum(k + 1, n),
+        }
+
+    def by_price(self, prices, closed=True):
+        """
+        Executes each branch up to the price limit.
+        :param prices: a price or a sequence of prices
+        :param closed: whether the levels at the limit price are included
+        :returns: {
+            "volume": executed base volume,
+            "vwap": average price,
+            "remainder": [[price, amount], ...] of the first level not reached
+                         ([nan, 0] if the whole branch is within the limit),
+            "cumother": executed quote volume,
+            "i": number of levels reached,
+          }
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        how = "right" if closed else "left"
+        if self.side == "bids":
+            # descending prices
+            k = np.searchsorted(-self.price, -prices, how)
+        else:
+            k = np.searchsorted(self.price, prices, how)
+
+        volume = self._prev(self.cum_base, k) if len(self) else np.zeros(k.shape)
+        cumother = self._prev(self.cum_quote, k) if len(self) else np.zeros(k.shape)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = cumother / volume
+
+        remainder = np.empty(k.shape + (2,))
+        within = k < len(self)
+        remainder[..., 0] = np.nan
+        remainder[..., 1] = 0.0
+        remainder[within, 0] = self.price[k[within]]
+        remainder[within, 1] = self.amount[k[within]]
+
+        return {
+            "volume": volume,
+            "vwap": vwap,
+            "remainder": remainder,
+            "cumother": cumother,
+            "i": k,
+        }
+
+
+class BookDepth:
+    """`BranchDepth` of both sides of an orderbook (`.bids`, `.asks`)"""
+
+    def __init__(self, ob):
+        self.ob = ob
+        self.nonce = ob.get("nonce")
+        self.bids = BranchDepth(ob["bids"], "bids")
+        self.asks = BranchDepth(ob["asks"], "asks")
+
+    def __getitem__(self, side):
+        if side not in ("bids", "asks"):
+            raise KeyError(side)
+        return getattr(self, side)
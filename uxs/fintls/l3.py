@@ -1,7 +1,10 @@
-from collections import defaultdict
+from bisect import bisect_left, insort
+from collections import defaultdict, OrderedDict
+import itertools
 
 from .utils import resolve_times
 from .ob import sort_branch
+from .ob_engines import LazyBranch, create_branch
 
 
 def parse_l3_item(x, price_key=0, amount_key=1, id_key=2):
@@ -42,7 +45,151 @@ def create_l3_orderbook(
     }
 
 
+class L3Branch(LazyBranch):
+    """
+    L3 branch indexed by order id. Orders are kept in per-price FIFO queues
+    {price: OrderedDict(id: [price, amount, id])}, the prices are kept sorted
+    for bisect lookup, and {id: order} index locates the order of an update in O(1).
+    The list view of [price, amount, id] items is materialized lazily.
+    """
+
+    engine = "index"
+
+    def __init__(self, side="bids", items=()):
+        self._levels = None
+        super().__init__(side, items)
+
+    def _invalidate(self):
+        self._levels = None
+
+    def _build_index(self):
+        self._levels = {}
+        self._keys = []
+        self._orders = {}
+        for item in list.__iter__(self):
+            self._add(item)
+        if len(self._orders) != list.__len__(self):
+            # contained duplicate ids
+            self._stale = True
+
+    def _add(self, item):
+        price, id = item[0], item[2]
+        level = self._levels.get(price)
+        if level is None:
+            level = self._levels[price] = OrderedDict()
+            insort(self._keys, self._key(price))
+        level[id] = item
+        self._orders[id] = item
+
+    def _remove(self, item):
+        price, id = item[0], item[2]
+        level = self._levels[price]
+        del level[id]
+        del self._orders[id]
+        if not level:
+            del self._levels[price]
+            del self._keys[bisect_left(self._keys, self._key(price))]
+
+    def _prices(self):
+        if self._descending:
+            return (-key for key in self._keys)
+        return iter(self._keys)
+
+    def _iter_engine(self):
+        return itertools.chain.from_iterable(
+            self._levels[price].values() for price in self._prices()
+        )
+
+    def _engine_len(self):
+        return len(self._orders)
+
+    def _engine_getitem(self, i):
+        if i == 0 and self._keys:
+            return next(iter(self._levels[next(self._prices())].values()))
+        return super()._engine_getitem(i)
+
+    def _ensure_index(self):
+        if self._levels is None:
+            self._build_index()
+
+    def update_item(self, item, **keys):
+        """
+        Same as `update_l3_branch(item, branch, ...)`
+        :returns: (price, amount, id, previous_price, previous_amount)
+        """
+        new_item = parse_l3_item(item, **keys)
+        price, amount, id = new_item[:3]
+        self._ensure_index()
+        prev_price = prev_amount = 0.0
+        prev_item = self._orders.get(id)
+        if prev_item is not None:
+            prev_price, prev_amount = prev_item[:2]
+            if amount and price and prev_price == price:
+                # the order keeps its place in the queue
+                self._levels[price][id] = self._orders[id] = new_item
+                self._stale = True
+                return (price, amount, id, prev_price, prev_amount)
+            self._remove(prev_item)
+            self._stale = True
+        if not amount or not price:
+            return (price, 0.0, id, prev_price, prev_amount)
+        self._add(new_item)
+        self._stale = True
+        return (price, amount, id, prev_price, prev_amount)
+
+    def get_order(self, id):
+        """:returns: [price, amount, id] or None"""
+        self._ensure_index()
+        return self._orders.get(id)
+
+    def get_level(self, price):
+        """:returns: the orders at the price, in queue order"""
+        self._ensure_index()
+        return list(self._levels.get(price, {}).values())
+
+    def get_queue_position(self, id):
+        """
+        :returns: {'price': <float>, 'position': <int>, 'amount_ahead': <float>},
+                  or None if the order is not in the branch
+        """
+        item = self.get_order(id)
+        if item is None:
+            return None
+        amount_ahead = 0.0
+        for position, (_id, x) in enumerate(self._levels[item[0]].items()):
+            if _id == id:
+                break
+            amount_ahead += x[1]
+        return {"price": item[0], "position": position, "amount_ahead": amount_ahead}
+
+    def loc_by_id(self, id):
+        """:returns: the index of the order in the list view, or None"""
+        item = self.get_order(id)
+        if item is None:
+            return None
+        loc = 0
+        for price in self._prices():
+            level = self._levels[price]
+            if price == item[0]:
+                return loc + next(i for i, _id in enumerate(level) if _id == id)
+            loc += len(level)
+
+
+L3_ENGINES = {
+    "list": list,
+    "index": L3Branch,
+}
+
+
+def create_l3_branch(engine=None, side="bids", items=()):
+    """Create a new l3 branch of the engine ("list" or "index"). `items` must be sorted."""
+    return create_branch(engine, side, items, engines=L3_ENGINES)
+
+
 def get_l3_loc_by_id(branch, id):
+    loc_by_id = getattr(branch, "loc_by_id", None)
+    if loc_by_id is not None:
+        return loc_by_id(id)
     return next((i for i, x in enumerate(branch) if x[2] == id), None)
 
 
@@ -57,7 +204,10 @@ def get_full_l3_loc_by_id(ob, id):
 
 
 def update_l3_branch(item, branch, side="bids"):
-    """:returns: (price, amount, id, previous_price, previous_amount"""
+    """:returns: (price, amount, id, previous_price, previous_amount)"""
+    update_item = getattr(branch, "update_item", None)
+    if update_item is not None:
+        return update_item(item)
     new_item = parse_l3_item(item)
     price, amount, id = new_item[:3]
     empty_value = (-1, [0.0, 0.0, None])
@@ -81,7 +231,8 @@ def update_l3_branch(item, branch, side="bids"):
         branch.insert(loc, new_item)
     else:
         branch.append(new_item)
-    return (price, amount, id, 0.0, 0.0)
+    # if the order was moved to a new price, its previous price/amount is returned
+    return (price, amount, id, ident_price, ident_amount)
 
 
 def assert_l3_integrity(ob):
@@ -107,3 +258,67 @@ def l3_branch_to_l2(branch, side="bids", round_to=None):
 def l3_to_l2(ob, round_to=None):
     bidasks = {ba: l3_branch_to_l2(ob.get(ba), ba, round_to) for ba in ("bids", "asks")}
     return dict(ob, **bidasks)
+
+
+class L2Aggregator:
+    """
+    Keeps the per-price totals of an l3 orderbook, so that its l2 equivalent
+    can be updated level by level instead of re-aggregating the whole l3 book
+    (`l3_to_l2`) on every update.
+    """
+
+    def __init__(self, ob=None, round_to=None):
+        self.round_to = round_to
+        self.totals = {"bids": {}, "asks": {}}
+        if ob is not None:
+            self.reset(ob)
+
+    def reset(self, ob):
+        """Recalculate the totals from the l3 orderbook"""
+        for side in ("bids", "asks"):
+            by_price = defaultdict(float)
+            for item in ob.get(side) or []:
+                by_price[item[0]] += item[1]
+            self.totals[side] = {
+                p: a for p, a in self._round(by_price.items()) if a > 0
+            }
+
+    def _round(self, items):
+        if self.round_to is None:
+            return items
+        return ((p, round(a, self.round_to)) for p, a in items)
+
+    def apply(self, side, deltas):
+        """
+        :param deltas: {price: amount_delta} or [(price, amount_delta), ...]
+        :returns: the changed l2 levels [[price, total_amount], ...];
+                  total amount is 0.0 if the level was removed
+        """
+        totals = self.totals[side]
+        if isinstance(deltas, dict):
+            deltas = deltas.items()
+        changed = {}
+        for p, a in deltas:
+            if not p or not a:
+                continue
+            total = totals.get(p, 0.0) + a
+            if self.round_to is not None:
+                total = round(total, self.round_to)
+            if total > 0:
+                totals[p] = total
+            else:
+                totals.pop(p, None)
+                total = 0.0
+            changed[p] = total
+        return [[p, a] for p, a in changed.items()]
+
+    def to_l2(self, ob=None):
+        """
+        :param ob: l3 orderbook whose other fields (symbol, nonce, timestamp etc)
+                   are to be included
+        """
+        bidasks = {
+            side: sort_branch([[p, a] for p, a in self.totals[side].items()], side)
+            for side in ("bids", "asks")
+        }
+        return dict(ob if ob is not None else {}, **bidasks)
@@ -368,7 +368,15 @@ def update_branch(
     round_to: IntNA = None,
     **keys,
 ):
-    """:param round_to: adding deltas is imprecise, new amount is rounded"""
+    """
+    :param round_to: adding deltas is imprecise, new amount is rounded
+    :returns: (price, previous_amount, new_amount)
+    If `branch` is an engine branch (see `uxs.fintls.ob_engines`), the update is
+    delegated to its `.update_item` method.
+    """
+    update_item = getattr(branch, "update_item", None)
+    if update_item is not None:
+        return update_item(item, is_delta, round_to, **keys)
     new_item = parse_item(item, **keys)
     rate, amount = new_item[:2]
     if not rate:
@@ -377,6 +385,9 @@ def update_branch(
     empty_place = (-1, [rate, 0.0])
     loc, ob_item = next(((i, x) for i, x in enumerate(branch) if op(x[0])), empty_place)
     prev_rate, prev_amount = ob_item[:2]
+    if prev_rate != rate:
+        # the located item is the next level, not the one being updated
+        prev_amount = 0.0
     new_amount = amount
     if loc != -1:
         if prev_rate == rate:  # prices are equal -> item is swapped out / removed
@@ -397,6 +408,147 @@ def update_branch(
     return (rate, prev_amount, max(0.0, new_amount))
 
 
+def _play_level(
+    item: Union[OrderBookItem, None],
+    updates: List[OrderBookItem],
+    is_delta: bool = False,
+    round_to: IntNA = None,
+):
+    """Applies the updates of one price level in sequence, as `update_branch` would.
+    :returns: the resulting item, or None if the level was removed"""
+    for new_item in updates:
+        amount = new_item[1]
+        if item is not None:
+            if is_delta:
+                amount = max(0.0, item[1] + amount)
+                if round_to is not None:
+                    amount = round(amount, round_to)
+                new_item = [new_item[0], amount, *new_item[2:]]  # type: ignore
+            item = new_item if amount else None
+        elif amount > 0:
+            item = new_item
+    return item
+
+
+def update_branch_batch(
+    items,
+    branch: OrderBookBranch,
+    side: OrderBookSide = "bids",
+    is_delta: bool = False,
+    round_to: IntNA = None,
+    **keys,
+):
+    """
+    Applies all the updates of a message to the branch at once. The result is the same
+    as calling `update_branch` on each item, but the updates are grouped by price and
+    merged into a plain list branch in a single pass: O(n + m) instead of O(n * m).
+    Engine branches apply the grouped updates level by level (O(m * log n)).
+    :returns: unique changes [[price, previous_amount, new_amount], ...],
+              ordered as the branch (best price first)
+    """
+    batch = {}
+    for x in items:
+        new_item = parse_item(x, **keys)
+        if new_item[0]:
+            try:
+                batch[new_item[0]].append(new_item)
+            except KeyError:
+                batch[new_item[0]] = [new_item]
+    if not batch:
+        return []
+
+    is_ask = side in ("ask", "asks")
+    prices = sorted(batch, reverse=not is_ask)
+    changes = []
+
+    update_item = getattr(branch, "update_item", None)
+    if update_item is not None:
+        for price in prices:
+            a0 = None
+            for new_item in batch[price]:
+                _, prev_amount, a = update_item(
+                    new_item,
+                    is_delta,
+                    round_to,
+                    count_or_id_key=2 if len(new_item) > 2 else None,
+                )
+                if a0 is None:
+                    a0 = prev_amount
+            changes.append([price, a0, a])
+        return changes
+
+    merged = []
+    n = len(branch)
+    pos = 0
+    for price in prices:
+        loc = pos
+        if is_ask:
+            while loc < n and branch[loc][0] < price:
+                loc += 1
+        else:
+            while loc < n and branch[loc][0] > price:
+                loc += 1
+        merged += branch[pos:loc]
+        prev_item = None
+        if loc < n and branch[loc][0] == price:
+            prev_item = branch[loc]
+            loc += 1
+        item = _play_level(prev_item, batch[price], is_delta, round_to)
+        if item is not None:
+            merged.append(item)
+        changes.append(
+            [
+                price,
+                prev_item[1] if prev_item is not None else 0.0,
+                max(0.0, item[1]) if item is not None else 0.0,
+            ]
+        )
+        pos = loc
+    merged += branch[pos:]
+    branch[:] = merged
+
+    return changes
+
+
+def truncate_branch(
+    branch: OrderBookBranch,
+    limit: int,
+    changes: list = (),
+    side: OrderBookSide = "bids",
+):
+    """
+    Cuts the branch to `limit` levels.
+    If `branch` is an engine branch, it is cut with its `.truncate` method
+    (which keeps the engine's index).
+    :param changes: the unique changes of the update that was just applied to the
+                    branch (as returned by `update_branch_batch`)
+    :returns: the changes as if the update had been truncated: levels that were
+              added and cut off are left out, the others that were cut off are
+              reported as removed
+    """
+    if len(branch) <= limit:
+        return changes
+    removed = {x[0]: x[1] for x in branch[limit:]}
+    truncate = getattr(branch, "truncate", None)
+    if truncate is not None:
+        truncate(limit)
+    else:
+        del branch[limit:]
+
+    truncated_changes = []
+    for price, prev_amount, amount in changes:
+        if price in removed:
+            del removed[price]
+            if not prev_amount:
+                continue
+            amount = 0.0
+        truncated_changes.append([price, prev_amount, amount])
+    if removed:
+        truncated_changes += [[price, amount, 0.0] for price, amount in removed.items()]
+        truncated_changes.sort(key=lambda x: x[0], reverse=side in ("bid", "bids"))
+    return truncated_changes
+
+
 def assert_integrity(ob: OrderBook):
     ask, bid = ob["asks"], ob["bids"]
     assert all(ask[i][0] < ask[i + 1][0] for i in range(max(0, len(ask) - 1)))
@@ -432,7 +584,6 @@ def get_bidask(ob: OrderBook, as_dict: Literal[True] = True) -> dict[str, FloatN
 def get_bidask(ob: OrderBook, as_dict: bool = False):
     bid = ask = bidVolume = askVolume = None
     if ob["bids"]:
-        k = ob["bids"][0]
         bid, bidVolume = ob["bids"][0][:2]
     if ob["asks"]:
         ask, askVolume = ob["asks"][0][:2]
@@ -0,0 +1,344 @@
+"""
+Orderbook branch engines.
+
+An engine branch is a `list` subclass, so that `orderbooks[symbol]["bids"/"asks"]`
+can still be read (and even modified) as the usual list of [price, amount] items,
+but price levels are located in O(log n) instead of scanning the whole branch.
+`update_branch` of `uxs.fintls.ob` delegates to `.update_item` of an engine branch.
+
+Engines:
+    "list"   - plain list, levels are located by linear scan (default)
+    "bisect" - the list itself is kept up to date, a parallel array of sort keys
+               is used for bisect lookup
+    "sorted" - levels are stored in a `sortedcontainers.SortedDict` (requires
+               the `sortedcontainers` package), the list view is materialized
+               lazily, only when it is read as a whole
+
+L3 branches (uxs.fintls.l3) have their own engines.
+"""
+
+from bisect import bisect_left
+import copy as _copy
+import operator
+
+try:
+    from sortedcontainers import SortedDict
+except ImportError:
+    SortedDict = None
+
+from .ob import parse_item, sort_branch
+
+_MUTATORS = (
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+)
+
+_READERS = (
+    "__iter__",
+    "__reversed__",
+    "__contains__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__repr__",
+    "__add__",
+    "__mul__",
+    "__rmul__",
+    "index",
+    "count",
+    "copy",
+)
+
+
+def _mutator(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kw):
+        self._sync_view()
+        r = method(self, *args, **kw)
+        self._invalidate()
+        return r
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+def _reader(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kw):
+        self._sync_view()
+        return method(self, *args, **kw)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+class EngineBranch(list):
+    """
+    Base class of engine branches. Any modification made through the list interface
+    invalidates the engine's index, which is then rebuilt on the next `.update_item`.
+    """
+
+    engine = None
+
+    def __init__(self, side="bids", items=()):
+        list.__init__(self)
+        self.side = side
+        self._descending = side in ("bid", "bids")
+        self._invalidate()
+        if items:
+            self.extend(items)
+
+    def update_item(self, item, is_delta=False, round_to=None, **keys):
+        """
+        Same as `uxs.fintls.ob.update_branch(item, branch, ...)`
+        :returns: (price, previous_amount, new_amount)
+        """
+        raise NotImplementedError
+
+    def truncate(self, limit):
+        """Cuts the branch to `limit` levels"""
+        del self[limit:]
+
+    def _sync_view(self):
+        """Brings the list storage up to date with the engine"""
+        pass
+
+    def _invalidate(self):
+        """Marks the engine's index as outdated"""
+        pass
+
+    def _key(self, price):
+        return -price if self._descending else price
+
+    def __reduce_ex__(self, protocol):
+        # copies / pickles of the branch are plain lists
+        return (list, (list(self),))
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return _copy.deepcopy(list(self), memo)
+
+
+for _name in _MUTATORS:
+    setattr(EngineBranch, _name, _mutator(_name))
+
+
+class BisectBranch(EngineBranch):
+    """
+    The list storage always reflects the current state of the branch.
+    A parallel list of sort keys (price for asks, -price for bids) is used for
+    locating the levels.
+    """
+
+    engine = "bisect"
+
+    def _invalidate(self):
+        self._keys = None
+
+    def _build_keys(self):
+        self._keys = [self._key(x[0]) for x in list.__iter__(self)]
+        return self._keys
+
+    def truncate(self, limit):
+        list.__delitem__(self, slice(limit, None))
+        if self._keys is not None:
+            del self._keys[limit:]
+
+    def update_item(self, item, is_delta=False, round_to=None, **keys):
+        new_item = parse_item(item, **keys)
+        rate, amount = new_item[:2]
+        if not rate:
+            return (0.0, 0.0, 0.0)
+        index = self._keys if self._keys is not None else self._build_keys()
+        key = -rate if self._descending else rate
+        loc = bisect_left(index, key)
+        prev_amount = 0.0
+        new_amount = amount
+        if loc < len(index) and index[loc] == key:
+            prev_amount = list.__getitem__(self, loc)[1]
+            if is_delta:
+                new_amount = max(0.0, prev_amount + amount)
+                if round_to is not None:
+                    new_amount = round(new_amount, round_to)
+                new_item = [rate, new_amount, *new_item[2:]]
+            if new_amount:
+                list.__setitem__(self, loc, new_item)
+            else:
+                list.pop(self, loc)
+                index.pop(loc)
+        elif new_amount > 0:
+            list.insert(self, loc, new_item)
+            index.insert(loc, key)
+
+        return (rate, prev_amount, max(0.0, new_amount))
+
+
+class LazyBranch(EngineBranch):
+    """
+    Base class of engines that don't keep the list storage up to date on every update.
+    The storage is refreshed only when the branch is read as a whole (iteration,
+    comparison, repr etc). Subclasses set `._stale = True` after modifying the engine,
+    and implement `._iter_engine`, `._engine_len` and `._engine_getitem`.
+    """
+
+    _stale = False
+
+    def _iter_engine(self):
+        raise NotImplementedError
+
+    def _engine_len(self):
+        raise NotImplementedError
+
+    def _engine_getitem(self, i):
+        self._sync_view()
+        return list.__getitem__(self, i)
+
+    def _sync_view(self):
+        if self._stale:
+            list.clear(self)
+            list.extend(self, self._iter_engine())
+            self._stale = False
+
+    def __len__(self):
+        if self._stale:
+            return self._engine_len()
+        return list.__len__(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, i):
+        if self._stale:
+            return self._engine_getitem(i)
+        return list.__getitem__(self, i)
+
+
+for _name in _READERS:
+    setattr(LazyBranch, _name, _reader(_name))
+del _name
+
+
+class SortedBranch(LazyBranch):
+    """
+    Levels are kept in a `SortedDict` {price: item}.
+    Length, indexing and slicing are served directly from the `SortedDict`.
+    """
+
+    engine = "sorted"
+
+    def __init__(self, side="bids", items=()):
+        if SortedDict is None:
+            raise ImportError(
+                "orderbook engine 'sorted' requires the `sortedcontainers` package"
+            )
+        self._levels = None
+        super().__init__(side, items)
+
+    def _invalidate(self):
+        self._levels = None
+
+    def _build_levels(self):
+        # Duplicate prices are resolved in favour of the latter item
+        key = operator.neg if self._descending else None
+        self._levels = SortedDict(key, ((x[0], x) for x in list.__iter__(self)))
+        if len(self._levels) != list.__len__(self):
+            self._stale = True
+        return self._levels
+
+    def truncate(self, limit):
+        levels = self._levels
+        if levels is not None:
+            for _ in range(len(levels) - limit):
+                levels.popitem()
+        if not self._stale:
+            list.__delitem__(self, slice(limit, None))
+
+    def _iter_engine(self):
+        return self._levels.values()
+
+    def _engine_len(self):
+        return len(self._levels)
+
+    def _engine_getitem(self, i):
+        return self._levels.values()[i]
+
+    def update_item(self, item, is_delta=False, round_to=None, **keys):
+        new_item = parse_item(item, **keys)
+        rate, amount = new_item[:2]
+        if not rate:
+            return (0.0, 0.0, 0.0)
+        levels = self._levels if self._levels is not None else self._build_levels()
+        prev_item = levels.get(rate)
+        prev_amount = 0.0
+        new_amount = amount
+        if prev_item is not None:
+            prev_amount = prev_item[1]
+            if is_delta:
+                new_amount = max(0.0, prev_amount + amount)
+                if round_to is not None:
+                    new_amount = round(new_amount, round_to)
+                new_item = [rate, new_amount, *new_item[2:]]
+            if new_amount:
+                levels[rate] = new_item
+            else:
+                del levels[rate]
+            self._stale = True
+        elif new_amount > 0:
+            levels[rate] = new_item
+            self._stale = True
+
+        return (rate, prev_amount, max(0.0, new_amount))
+
+
+ENGINES = {
+    "list": list,
+    "bisect": BisectBranch,
+    "sorted": SortedBranch,
+}
+
+
+def get_engine(engine=None, engines=None):
+    """
+    :param engine: engine name, or a `list` (sub)class accepting args (side, items)
+    :param engines: {name: engine}; defaults to `ENGINES`
+    """
+    if engine is None:
+        return list
+    if isinstance(engine, str):
+        try:
+            return (engines if engines is not None else ENGINES)[engine]
+        except KeyError:
+            raise ValueError("Unknown orderbook engine: {}".format(engine))
+    if not isinstance(engine, type) or not issubclass(engine, list):
+        raise TypeError("Orderbook engine must be a list subclass: {}".format(engine))
+    return engine
+
+
+def create_branch(engine=None, side="bids", items=(), engines=None):
+    """Create a new branch of the engine. `items` must be sorted."""
+    cls = get_engine(engine, engines)
+    if cls is list:
+        return list(items)
+    return cls(side, items)
+
+
+def as_engine_branch(branch, engine=None, side="bids"):
+    """Convert a branch (sorted or unsorted) to the engine's branch"""
+    return create_branch(engine, side, sort_branch(branch, side))
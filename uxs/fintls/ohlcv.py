@@ -4,6 +4,8 @@ from typing import List, Union  # Tuple, Set, Dict, Any, Optional, Iterable, Cal
 import pandas as pd
 import ccxt, ccxt.async_support
 import asyncio
+from collections import deque
+from fons.iter import unique
 from fons.time import dt_round
 from dateutil.parser import parse as parsedate
 import datetime
@@ -16,6 +18,9 @@ FULL_NAMES_LOWERCASE = [x.lower() for x in FULL_NAMES]
 SHORT_NAMES = ["timestamp", "O", "H", "L", "C", "V"]
 SHORT_NAMES_LOWERCASE = [x.lower() for x in SHORT_NAMES]
 
+# weekly candles start on Monday (1970-01-05), the epoch was a Thursday
+WEEK_OFFSET_MS = 4 * 86400 * 1000
+
 SETS = {
     "full": FULL_NAMES,
     "short": SHORT_NAMES,
@@ -144,3 +149,82 @@ def yf_download(
     pd_timestamps = [pd.Timestamp(x * 1_000_000) for x in timestamps]
     df = pd.DataFrame(data_closes_only, index=pd_timestamps)
     return df
+
+
+def timeframe_to_ms(timeframe):
+    """Fixed length timeframes only ('1s' ... '1w'); months and years vary in length"""
+    if timeframe[-1] in ("M", "y"):
+        raise ValueError("Timeframe {} has no fixed length".format(timeframe))
+    return int(ccxt.Exchange.parse_timeframe(timeframe) * 1000)
+
+
+class CandleBuilder:
+    """
+    Builds the OHLCV candles of one symbol from its trades, for any number of
+    timeframes. Each trade updates the current candle of every timeframe in O(1);
+    a new candle is started when a trade falls after the current one (candles
+    without trades are not created, as with the exchanges' own ohlcv).
+    The candles are kept in `.candles[timeframe]` as
+    deque([[timestamp_ms, o, h, l, c, volume], ...]), which may be shared with
+    (and overwritten by) fetched ohlcv.
+    """
+
+    def __init__(self, timeframes, candles=None, maxlen=1000):
+        """
+        :param candles: {timeframe: deque} to be continued
+        """
+        candles = candles if candles is not None else {}
+        self.timeframes = list(unique(timeframes))
+        self.periods = {tf: timeframe_to_ms(tf) for tf in self.timeframes}
+        self.offsets = {
+            tf: WEEK_OFFSET_MS if tf.endswith("w") else 0 for tf in self.timeframes
+        }
+        self.candles = {
+            tf: candles[tf] if tf in candles else deque(maxlen=maxlen)
+            for tf in self.timeframes
+        }
+        self.last_key = None
+
+    def _apply(self, timeframe, timestamp, price, amount):
+        period = self.periods[timeframe]
+        start = timestamp - (timestamp - self.offsets[timeframe]) % period
+        candles = self.candles[timeframe]
+        if not candles or start > candles[-1][0]:
+            candle = [start, price, price, price, price, amount]
+            candles.append(candle)
+            return candle
+        if start == candles[-1][0]:
+            candle = candles[-1]
+            candle[4] = price
+        else:
+            # a late trade (rare): its candle's open/close are left as they are
+            candle = next((x for x in reversed(candles) if x[0] <= start), None)
+            if candle is None or candle[0] != start:
+                return None
+        if price > candle[2]:
+            candle[2] = price
+        if price < candle[3]:
+            candle[3] = price
+        candle[5] += amount
+        return candle
+
+    def add_trades(self, trades, key=None):
+        """
+        :param trades: [{'timestamp', 'price', 'amount', ...}, ...] sorted by `key`.
+                       If `key` is given, trades that aren't newer than the last added
+                       trade (resent trades) are skipped.
+        :returns: {timeframe: [changed candle, ...]}
+        """
+        changed = {tf: {} for tf in self.timeframes}
+        for t in trades:
+            if key is not None:
+                k = key(t)
+                if self.last_key is not None and k <= self.last_key:
+                    continue
+                self.last_key = k
+            timestamp, price, amount = t["timestamp"], t["price"], t["amount"]
+            for tf in self.timeframes:
+                candle = self._apply(tf, timestamp, price, amount)
+                if candle is not None:
+                    changed[tf][candle[0]] = candle
+        return {tf: list(x.values()) for tf, x in changed.items() if x}
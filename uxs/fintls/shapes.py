@@ -1,10 +1,24 @@
 from __future__ import annotations  # `tuple` etc for py 3.7 and 3.8
-from typing import Union, Tuple, List, Set, Dict, Any, Optional, Iterable, Callable
+from typing import (
+    Union,
+    Tuple,
+    List,
+    Set,
+    Dict,
+    Any,
+    Optional,
+    Iterable,
+    Iterator,
+    Callable,
+)
 
 import itertools
+import multiprocessing
 from collections import defaultdict
 import time
 import logging
+import array
+import numpy as np
 from ccxt.base.types import Market, Ticker  # , Currency
 
 from .basics import as_direction
@@ -632,31 +646,11 @@ def get_shape_tuples(
     # 2. Match the currency paths to (exchange, symbol) paths
 
     def find_symbol_paths_for_cy_trail(cy_trail: Tuple[str]):
-        xcsymbols_lists: List[List[XCSymbolBaseQuote]] = []
-        for i in range(len(cy_trail)):
-            cy = cy_trail[i]
-            next_cy = cy_trail[(i + 1) % len(cy_trail)]
-            symbol_id = tuple(sorted((cy, next_cy)))
-            corresponding_xcsymbols = xcsymbols_by_symbol_id[symbol_id]
-            xcsymbols_lists.append(corresponding_xcsymbols)
-
-        if len(cy_trail) == 2:
-            # Both xcsymbols lists have the same (exchanges, symbol) pairs; use only one list
-            xcsymbols_combinations = itertools.combinations(xcsymbols_lists[0], 2)
-        else:
-            # No repeating (exchange, symbol) between any of the lists
-            xcsymbols_combinations = itertools.product(*xcsymbols_lists)
-
-        if max_unique_exchanges:
-            xcsymbols_combinations = [
-                x
-                for x in xcsymbols_combinations
-                if len(set(_[0] for _ in x)) <= max_unique_exchanges
-            ]
-        else:
-            xcsymbols_combinations = list(xcsymbols_combinations)
-
-        return xcsymbols_combinations
+        return list(
+            _iter_symbol_paths_of_cy_trail(
+                cy_trail, xcsymbols_by_symbol_id, max_unique_exchanges
+            )
+        )
 
     xcsymbols_combinations = []
 
@@ -671,6 +665,135 @@ def get_shape_tuples(
     return xcsymbols_combinations
 
 
+def _iter_symbol_paths_of_cy_trail(
+    cy_trail: Tuple[str, ...],
+    xcsymbols_by_symbol_id: XCSymbols_By_SymbolID,
+    max_unique_exchanges: int | None = None,
+) -> Iterator[Tuple[XCSymbolBaseQuote, ...]]:
+    """Match the currency trail to (exchange, symbol) paths"""
+    xcsymbols_lists: List[Set[XCSymbolBaseQuote]] = []
+    for i in range(len(cy_trail)):
+        cy = cy_trail[i]
+        next_cy = cy_trail[(i + 1) % len(cy_trail)]
+        symbol_id = tuple(sorted((cy, next_cy)))
+        xcsymbols_lists.append(xcsymbols_by_symbol_id[symbol_id])
+
+    if len(cy_trail) == 2:
+        # Both xcsymbols lists have the same (exchanges, symbol) pairs; use only one list
+        xcsymbols_combinations = itertools.combinations(xcsymbols_lists[0], 2)
+    else:
+        # No repeating (exchange, symbol) between any of the lists
+        xcsymbols_combinations = itertools.product(*xcsymbols_lists)
+
+    if max_unique_exchanges:
+        return (
+            x
+            for x in xcsymbols_combinations
+            if len(set(_[0] for _ in x)) <= max_unique_exchanges
+        )
+    return xcsymbols_combinations
+
+
+def _iter_cy_trails_of_start(
+    start: str, currency_graph: CurrencyGraph, n_values: Tuple[int, ...]
+) -> Iterator[Tuple[str, ...]]:
+    """
+    Yields the circular currency trails in which `start` is the smallest currency,
+    in the orientation where trail[1] < trail[-1]. As every trail has exactly one
+    such canonical form, the trails of all the start currencies are unique
+    without keeping track of the ones already seen.
+    """
+    max_n = max(n_values)
+
+    def rec_cy_trail(trail: Tuple[str, ...]):
+        n = len(trail)
+        for next_cy in currency_graph[trail[-1]]:
+            if next_cy == start:
+                if n in n_values and (n == 2 or trail[1] < trail[-1]):
+                    yield trail
+            elif next_cy > start and n < max_n and next_cy not in trail:
+                yield from rec_cy_trail(trail + (next_cy,))
+
+    return rec_cy_trail((start,))
+
+
+# The state of a pool worker of `iter_shape_tuples`
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(currency_graph: CurrencyGraph, n_values: Tuple[int, ...]):
+    _worker_state["currency_graph"] = currency_graph
+    _worker_state["n_values"] = n_values
+
+
+def _find_cy_trails_of_start(start: str) -> List[Tuple[str, ...]]:
+    return list(
+        _iter_cy_trails_of_start(
+            start, _worker_state["currency_graph"], _worker_state["n_values"]
+        )
+    )
+
+
+def iter_shape_tuples(
+    n: Union[int, List[int]],
+    markets_coll: MarketsCollection,
+    tickers_coll: TickersCollection = {},
+    max_unique_exchanges: int | None = None,
+    processes: int | None = None,
+) -> Iterator[Tuple[XCSymbolBaseQuote, ...]]:
+    """
+    Streaming version of `get_shape_tuples`: yields the same shape tuples (albeit
+    in a different order and possibly in the opposite direction) one by one,
+    without materializing them. The currency trails are searched per start
+    currency, and with `processes` > 1 the start currencies are sharded across
+    a process pool, whose results are yielded as soon as they arrive.
+    """
+    n_values = (n,) if isinstance(n, int) else tuple(n)
+    if min(n_values) < 2:
+        raise ValueError("`n` must be >= 2; got: {}".format(n))
+
+    markets_coll = Helpers.add_markets_from_tickers(markets_coll, tickers_coll)
+    currency_graph, xcsymbols_by_symbol_id = _create_currency_graph(markets_coll)
+    # The most connected currencies first, as they take the longest
+    starts = sorted(currency_graph, key=lambda cy: -len(currency_graph[cy]))
+
+    def yield_shape_tuples(cy_trails):
+        for cy_trail in cy_trails:
+            yield from _iter_symbol_paths_of_cy_trail(
+                cy_trail, xcsymbols_by_symbol_id, max_unique_exchanges
+            )
+
+    _started = time.time()
+    if processes is None or processes < 2:
+        for start in starts:
+            yield from yield_shape_tuples(
+                _iter_cy_trails_of_start(start, currency_graph, n_values)
+            )
+    else:
+        with multiprocessing.Pool(
+            processes, _init_worker, (currency_graph, n_values)
+        ) as pool:
+            for cy_trails in pool.imap_unordered(_find_cy_trails_of_start, starts):
+                yield from yield_shape_tuples(cy_trails)
+    sh_logger.debug(
+        f"Iterating the shape tuples took {time.time()-_started:.2f} seconds"
+    )
+
+
+def iter_shapes(
+    n: Union[int, List[int]],
+    markets_coll: MarketsCollection,
+    tickers_coll: TickersCollection = {},
+    max_unique_exchanges: int | None = None,
+    processes: int | None = None,
+) -> Iterator[Shape]:
+    """Yields Shape objects (see `iter_shape_tuples`)."""
+    for shape_tuple in iter_shape_tuples(
+        n, markets_coll, tickers_coll, max_unique_exchanges, processes
+    ):
+        yield Shape(shape_tuple)
+
+
 def _initiate_shapes(shape_tuple: List[Tuple[XCSymbolBaseQuote, ...]]) -> List[Shape]:
     _started = time.time()
     shapes = [Shape(st) for st in shape_tuple]
@@ -694,3 +817,360 @@ def get_shapes(
         n, markets_coll, tickers_coll, max_unique_exchanges, use_cython
     )
     return _initiate_shapes(shape_tuples)
+
+
+# Compact representation
+#  - exchanges, symbols and currencies are interned to integer ids
+#  - shapes are rows of NumPy arrays: market ids of the legs and their directions
+#  - shapes / paths are returned as lightweight views, which resolve the strings
+#    only when accessed
+
+
+class Interner:
+    """Bidirectional mapping of values to consecutive integer ids"""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self, values: Iterable = ()):
+        self.values = []
+        self.ids = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value) -> int:
+        try:
+            return self.ids[value]
+        except KeyError:
+            self.ids[value] = i = len(self.values)
+            self.values.append(value)
+            return i
+
+    def get_id(self, value) -> int:
+        return self.ids[value]
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self.ids = {value: i for i, value in enumerate(values)}
+
+
+_MARKET_ARRAYS = ("market_exchanges", "market_symbols", "market_bases", "market_quotes")
+
+
+class ShapeTable:
+    """
+    Integer-encoded shapes. Shape `i` consists of the markets `.legs[i, :n[i]]`
+    (ids of `(xc, symbol, base, quote)`, as in `Shape.xc_symbol_base_quotes`) and
+    `.directions[i, :n[i]]` (as `Shape.directions`), padded with -1. Indexing /
+    iterating returns `ShapeView`s, whose paths are `PathView`s.
+
+    Pickles only the arrays and the interned strings, so sending it to worker
+    processes is cheap.
+    """
+
+    def __init__(
+        self, shapes: Iterable[Union[Tuple[XCSymbolBaseQuote, ...], Line]] = ()
+    ):
+        """:param shapes: shape tuples (as returned by `get_shape_tuples`) or Shapes"""
+        self.exchanges = Interner()
+        self.symbols = Interner()
+        self.currencies = Interner()
+        # (exchange id, symbol id, base id, quote id) -> market id
+        self._markets = Interner()
+
+        ns = array.array("b")
+        legs = array.array("i")
+        directions = array.array("b")
+        width = 0
+        rows = []
+        for shape in shapes:
+            if isinstance(shape, Line):
+                xc_symbol_base_quotes = shape.xc_symbol_base_quotes
+                shape_directions = shape.directions
+            else:
+                xc_symbol_base_quotes = tuple(shape)
+                shape_directions = _get_shape_directions(xc_symbol_base_quotes)
+            n = len(xc_symbol_base_quotes)
+            ns.append(n)
+            rows.append(len(legs))
+            legs.extend(self._intern_market(x) for x in xc_symbol_base_quotes)
+            directions.extend(shape_directions)
+            width = max(width, n)
+
+        self.n = np.frombuffer(ns, dtype=np.int8).copy()
+        self.legs = np.full((len(ns), width), -1, dtype=np.int32)
+        self.directions = np.full((len(ns), width), -1, dtype=np.int8)
+        if len(ns):
+            # scatter the flat legs into the padded rows
+            positions = np.arange(len(legs)) - np.repeat(rows, self.n)
+            shape_indexes = np.repeat(np.arange(len(ns)), self.n)
+            self.legs[shape_indexes, positions] = np.frombuffer(legs, dtype=np.int32)
+            self.directions[shape_indexes, positions] = np.frombuffer(
+                directions, dtype=np.int8
+            )
+        self._init_market_arrays()
+
+    def _intern_market(self, xc_symbol_base_quote: XCSymbolBaseQuote) -> int:
+        xc, symbol, base, quote = xc_symbol_base_quote
+        return self._markets.intern(
+            (
+                self.exchanges.intern(xc),
+                self.symbols.intern(symbol),
+                self.currencies.intern(base),
+                self.currencies.intern(quote),
+            )
+        )
+
+    def _init_market_arrays(self):
+        markets = np.array(self._markets.values, dtype=np.int32).reshape(-1, 4)
+        # the exchange, symbol, base and quote id of each market
+        for attr, ids in zip(_MARKET_ARRAYS, markets.T):
+            setattr(self, attr, ids)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # derived from `._markets`
+        for attr in _MARKET_ARRAYS:
+            del state[attr]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_market_arrays()
+
+    def __len__(self):
+        return len(self.n)
+
+    def __getitem__(self, i) -> ShapeView:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return ShapeView(self, i)
+
+    def __iter__(self) -> Iterator[ShapeView]:
+        return (ShapeView(self, i) for i in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """size of the shape arrays"""
+        return self.n.nbytes + self.legs.nbytes + self.directions.nbytes
+
+    def market(self, market_id: int) -> XCSymbolBaseQuote:
+        xc, symbol, base, quote = self._markets[market_id]
+        return (
+            self.exchanges[xc],
+            self.symbols[symbol],
+            self.currencies[base],
+            self.currencies[quote],
+        )
+
+    def get_path(self, i: int, start: int = 0, polarity: int = 1) -> PathView:
+        return self[i].get_path(start, polarity)
+
+    def to_shape(self, i: int) -> Shape:
+        return self[i].to_shape()
+
+
+def _get_shape_directions(xc_symbol_base_quotes):
+    n = len(xc_symbol_base_quotes)
+    cys, cy_sides = Line._init_cys(n, xc_symbol_base_quotes)
+    if cys[0] != cys[-1]:
+        raise ValueError(
+            "Line isn't circular: {}".format(tuple(x[1] for x in xc_symbol_base_quotes))
+        )
+    return tuple(int(not cy_sides[i]) for i in range(n))
+
+
+class ShapeView:
+    """Shape `i` of a ShapeTable, with (mostly) the accessors of `Shape`"""
+
+    __slots__ = ("table", "i")
+
+    def __init__(self, table: ShapeTable, i: int):
+        self.table = table
+        self.i = i
+
+    @property
+    def n(self) -> int:
+        return int(self.table.n[self.i])
+
+    @property
+    def market_ids(self) -> Tuple[int, ...]:
+        return tuple(self.table.legs[self.i, : self.n].tolist())
+
+    @property
+    def xc_symbol_base_quotes(self) -> Tuple[XCSymbolBaseQuote, ...]:
+        return tuple(self.table.market(m) for m in self.market_ids)
+
+    @property
+    def directions(self) -> Tuple[int, ...]:
+        return tuple(self.table.directions[self.i, : self.n].tolist())
+
+    @property
+    def exchanges(self):
+        return tuple(x[0] for x in self.xc_symbol_base_quotes)
+
+    @property
+    def symbols(self):
+        return tuple(x[1] for x in self.xc_symbol_base_quotes)
+
+    @property
+    def xcsyms(self):
+        return tuple(x[:2] for x in self.xc_symbol_base_quotes)
+
+    @property
+    def cys(self):
+        return self.get_path(0, 1).cys
+
+    @property
+    def xccys(self):
+        return tuple(zip(self.exchanges + (None,), self.cys))
+
+    @property
+    def paths(self) -> List[PathView]:
+        return [
+            PathView(self, start, polarity)
+            for start in range(self.n)
+            for polarity in (1, -1)
+        ]
+
+    def get_path(self, start: int = 0, polarity: int = 1) -> PathView:
+        return PathView(self, start, polarity)
+
+    def to_shape(self) -> Shape:
+        return Shape(self.xc_symbol_base_quotes)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ShapeView)
+            and self.table is other.table
+            and self.i == other.i
+        )
+
+    def __hash__(self):
+        return hash((id(self.table), self.i))
+
+    def __repr__(self):
+        return "ShapeView({}, {})".format(self.i, self.xcsyms)
+
+
+class PathView:
+    """Path of a ShapeView, with the accessors of `Path`"""
+
+    __slots__ = ("shape", "start", "polarity")
+
+    def __init__(self, shape: ShapeView, start: int = 0, polarity: int = 1):
+        if polarity not in (1, -1):
+            raise ValueError(polarity)
+        self.shape = shape
+        self.start = start
+        self.polarity = polarity
+
+    @property
+    def n(self) -> int:
+        return self.shape.n
+
+    @property
+    def line(self):
+        return self.shape
+
+    @property
+    def indexes(self) -> Tuple[int, ...]:
+        n = self.n
+        return tuple((self.start + self.polarity * j) % n for j in range(n))
+
+    @property
+    def market_ids(self) -> Tuple[int, ...]:
+        market_ids = self.shape.market_ids
+        return tuple(market_ids[i] for i in self.indexes)
+
+    @property
+    def directions(self) -> Tuple[int, ...]:
+        directions = self.shape.directions
+        if self.polarity == 1:
+            return tuple(directions[i] for i in self.indexes)
+        return tuple(int(not directions[i]) for i in self.indexes)
+
+    @property
+    def exchanges(self):
+        table = self.shape.table
+        return tuple(
+            table.exchanges[table.market_exchanges[m]] for m in self.market_ids
+        )
+
+    @property
+    def symbols(self):
+        table = self.shape.table
+        return tuple(table.symbols[table.market_symbols[m]] for m in self.market_ids)
+
+    @property
+    def cys(self):
+        """the spent currency of each leg, followed by the final currency"""
+        table = self.shape.table
+        cys = tuple(
+            table.currencies[
+                table.market_quotes[m] if direction else table.market_bases[m]
+            ]
+            for m, direction in zip(self.market_ids, self.directions)
+        )
+        return cys + cys[:1]
+
+    xcsyms = Path.xcsyms
+    xccys = Path.xccys
+    entities = Path.entities
+    conv_pairs = Path.conv_pairs
+    id = Path.id
+    id2 = Path.id2
+    get = Path.get
+    __getitem__ = Path.__getitem__
+    __iter__ = Path.__iter__
+    __str__ = Path.__str__
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PathView)
+            and self.shape == other.shape
+            and self.start == other.start
+            and self.polarity == other.polarity
+        )
+
+    def __hash__(self):
+        return hash((self.shape, self.start, self.polarity))
+
+    def __repr__(self):
+        return "PathView({})".format(self.id2)
+
+
+def get_shape_table(
+    n: Union[int, List[int]],
+    markets_coll: MarketsCollection,
+    tickers_coll: TickersCollection = {},
+    max_unique_exchanges: int | None = None,
+    processes: int | None = None,
+) -> ShapeTable:
+    """Returns the shapes as a ShapeTable (see `iter_shape_tuples`)."""
+    _started = time.time()
+    table = ShapeTable(
+        iter_shape_tuples(
+            n, markets_coll, tickers_coll, max_unique_exchanges, processes
+        )
+    )
+    sh_logger.debug(
+        f"Creating a table of {len(table)} shapes took {time.time()-_started:.2f} seconds"
+    )
+    return table
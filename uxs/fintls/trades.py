@@ -0,0 +1,217 @@
+"""
+Columnar storage of trades.
+
+`TradeStore` keeps the latest `maxlen` trades of a symbol in preallocated NumPy
+arrays (timestamp, price, amount, side) plus the trade ids, with ring-buffer
+semantics. Each array has a size of 2*maxlen and every item is written twice
+(at i and i + maxlen), so that any range of stored trades is a contiguous slice
+and can be returned as a view, without copying. The other fields of a trade
+(symbol, datetime, order, type, takerOrMaker, cost, fee, info, ...) are kept
+in a side-table, and are only used when the trade dicts are rebuilt.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("timestamp", "price", "amount", "side")
+SIDES = {"buy": 1, "sell": -1}
+SIDE_NAMES = {1: "buy", -1: "sell", 0: None}
+# fields that are always restored from the arrays
+_ARRAY_FIELDS = ("id", "price", "amount")
+
+
+class TradeStore:
+    def __init__(self, maxlen=1000, key=None):
+        """
+        :param maxlen: the number of latest trades to be kept
+        :param key: sort key of trade dicts; by default trades are assumed to be
+                    received in order (and are stored in the order received)
+        """
+        if maxlen is None or maxlen < 1:
+            raise ValueError("TradeStore requires maxlen >= 1, got: {}".format(maxlen))
+        self.maxlen = maxlen
+        self.key = key
+        self.timestamp = np.zeros(2 * maxlen, dtype=np.int64)
+        self.price = np.zeros(2 * maxlen, dtype=np.float64)
+        self.amount = np.zeros(2 * maxlen, dtype=np.float64)
+        self.side = np.zeros(2 * maxlen, dtype=np.int8)
+        self.ids = np.empty(2 * maxlen, dtype=object)
+        # the remaining fields of each trade {field: value}
+        self.extras = np.empty(2 * maxlen, dtype=object)
+        # position of the oldest trade
+        self._start = 0
+        self._len = 0
+        self._id_set = set()
+        self._last_key = None
+        # whether the timestamps are non-decreasing (for binary search)
+        self._ts_sorted = True
+
+    def __len__(self):
+        return self._len
+
+    def _slice(self, start=0, stop=None):
+        """Slice of the arrays covering trades[start:stop] (0 = oldest)"""
+        if stop is None or stop > self._len:
+            stop = self._len
+        return slice(self._start + start, self._start + max(start, stop))
+
+    def _write(self, trade, timestamp):
+        maxlen = self.maxlen
+        if self._len == maxlen:
+            evicted = self.ids[self._start]
+            if evicted is not None:
+                self._id_set.discard(evicted)
+            self._start = (self._start + 1) % maxlen
+            self._len -= 1
+        i = (self._start + self._len) % maxlen
+        side = SIDES.get(trade.get("side"), 0)
+        id = trade.get("id")
+        extra = {k: v for k, v in trade.items() if k not in _ARRAY_FIELDS}
+        # timestamp / side are restored from the arrays only if they're representable
+        if extra.get("timestamp") is not None:
+            del extra["timestamp"]
+        if side:
+            del extra["side"]
+        for j in (i, i + maxlen):
+            self.timestamp[j] = timestamp
+            self.price[j] = trade["price"]
+            self.amount[j] = trade["amount"]
+            self.side[j] = side
+            self.ids[j] = id
+            self.extras[j] = extra
+        self._len += 1
+        if id is not None:
+            self._id_set.add(id)
+
+    def extend(self, trades):
+        """
+        Adds the trades, skipping the ones whose id is already stored.
+        :param trades: [{'id', 'timestamp', 'price', 'amount', 'side', ...}, ...]
+        :returns: the added trades
+        """
+        key = self.key
+        seen = set()
+        added = []
+        for t in trades:
+            id = t.get("id")
+            if id is not None:
+                if id in self._id_set or id in seen:
+                    continue
+                seen.add(id)
+            added.append(t)
+        if not added:
+            return added
+        if key is not None:
+            added.sort(key=key)
+            first_key = key(added[0])
+            if self._last_key is not None and first_key < self._last_key:
+                # slow path: out of order trades
+                self._merge(added)
+                return added
+            self._last_key = key(added[-1])
+
+        last_ts = self.timestamp[self._start + self._len - 1] if self._len else None
+        for t in added:
+            ts = t.get("timestamp") or 0
+            if last_ts is not None and ts < last_ts:
+                self._ts_sorted = False
+            self._write(t, ts)
+            last_ts = ts
+        return added
+
+    def _merge(self, added):
+        """Rewrites the store with the added trades inserted in key order"""
+        merged = sorted(list(self) + added, key=self.key)[-self.maxlen :]
+        self.clear()
+        for t in merged:
+            self._write(t, t.get("timestamp") or 0)
+        self._last_key = self.key(merged[-1])
+        ts = self.timestamp[self._slice()]
+        self._ts_sorted = bool(np.all(ts[1:] >= ts[:-1]))
+
+    def clear(self):
+        self._start = self._len = 0
+        self._id_set.clear()
+        self._last_key = None
+        self._ts_sorted = True
+
+    def _trade(self, i):
+        trade = {
+            "id": self.ids[i],
+            "timestamp": int(self.timestamp[i]),
+            "price": float(self.price[i]),
+            "amount": float(self.amount[i]),
+            "side": SIDE_NAMES[int(self.side[i])],
+        }
+        trade.update(self.extras[i])
+        return trade
+
+    def __getitem__(self, i):
+        """:returns: trade dict, with all the fields of the trade as it was added"""
+        if isinstance(i, slice):
+            return [self._trade(self._start + j) for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("TradeStore index out of range")
+        return self._trade(self._start + i)
+
+    def __iter__(self):
+        return (self._trade(self._start + i) for i in range(self._len))
+
+    def columns(self, start=0, stop=None):
+        """
+        :returns: {'timestamp', 'price', 'amount', 'side', 'id'} of trades[start:stop],
+                  as views of the underlying arrays (valid until the next update).
+                  side: 1 = buy, -1 = sell, 0 = unknown
+        """
+        s = self._slice(start, stop)
+        cols = {name: getattr(self, name)[s] for name in COLUMNS}
+        cols["id"] = self.ids[s]
+        return cols
+
+    def _locate(self, ts):
+        return int(np.searchsorted(self.timestamp[self._slice()], ts, "left"))
+
+    def trades_since(self, timestamp):
+        """Columns (see `.columns`) of the trades with timestamp >= `timestamp`"""
+        return self.trades_between(timestamp, None)
+
+    def trades_between(self, start=None, end=None):
+        """Columns (see `.columns`) of the trades with `start` <= timestamp < `end`"""
+        if not self._ts_sorted:
+            ts = self.timestamp[self._slice()]
+            mask = np.ones(len(ts), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts < end
+            return {name: col[mask] for name, col in self.columns().items()}
+        i0 = self._locate(start) if start is not None else 0
+        i1 = self._locate(end) if end is not None else self._len
+        return self.columns(i0, i1)
+
+    def to_numpy(self):
+        """:returns: structured array (copy) of the stored trades"""
+        cols = self.columns()
+        arr = np.empty(
+            self._len,
+            dtype=[
+                ("timestamp", np.int64),
+                ("price", np.float64),
+                ("amount", np.float64),
+                ("side", np.int8),
+                ("id", object),
+            ],
+        )
+        for name, col in cols.items():
+            arr[name] = col
+        return arr
+
+    def to_pandas(self):
+        """:returns: DataFrame of the stored trades, indexed by timestamp (ms)"""
+        cols = self.columns()
+        return pd.DataFrame(
+            {name: cols[name].copy() for name in ("id",) + COLUMNS[1:]},
+            index=pd.Index(cols["timestamp"].copy(), name="timestamp"),
+        )
@@ -9,6 +9,7 @@ dt = datetime.datetime
 td = datetime.timedelta
 
 from uxs.base.socket import ExchangeSocket
+from uxs.fintls.checksum import kraken_checksum, decimals_from_precision
 
 from fons.sched import AsyncTicker
 from fons.time import ctime_ms
@@ -269,6 +270,10 @@ class kraken(ExchangeSocket):
         "default_limit": 10,
         "limits": [10, 25, 100, 500, 1000],
         "has_3rd_item": True,
+        # updates contain CRC32 of the top 10 levels
+        "checksum": True,
+        # levels pushed beyond the subscribed depth are not deleted by the exchange
+        "truncate_to_limit": True,
     }
     order = {
         "cancel_automatically": "if-not-subbed-to-account",
@@ -293,7 +298,9 @@ class kraken(ExchangeSocket):
         "ticker": None,
         "last_ticker_id": -1,
     }
-    __deepcopy_on_init__ = ["_cached_wstoken"]
+    # {symbol: CRC32Checksum}
+    _ob_checksums = {}
+    __deepcopy_on_init__ = ["_cached_wstoken", "_ob_checksums"]
 
     def setup_test_env(self):
         return {
@@ -680,11 +687,13 @@ class kraken(ExchangeSocket):
         bids = r[1].get(bid_key, [])
         asks = r[1].get(ask_key, [])
 
+        checksum = r[1].get("c")
         if not is_snapshot and isinstance(r[2], dict):
             if bid_key in r[2]:
                 bids = r[2][bid_key]
             if ask_key in r[2]:
                 asks = r[2][ask_key]
+            checksum = r[2].get("c", checksum)
 
         ob = {
             "symbol": symbol,
@@ -701,8 +710,22 @@ class kraken(ExchangeSocket):
         if is_snapshot:
             self.orderbook_maintainer.send_orderbook(ob)
         else:
+            if checksum is not None:
+                ob["checksum"] = int(checksum)
             self.orderbook_maintainer.send_update(ob)
 
+    def calc_ob_checksum(self, ob):
+        symbol = ob["symbol"]
+        calc = self._ob_checksums.get(symbol)
+        if calc is None:
+            precision = self.markets[symbol]["precision"]
+            is_tick_size = self.api.precisionMode == ccxt.TICK_SIZE
+            calc = self._ob_checksums[symbol] = kraken_checksum(
+                decimals_from_precision(precision["price"], is_tick_size),
+                decimals_from_precision(precision["amount"], is_tick_size),
+            )
+        return calc(ob)
+
     def on_ohlcv(self, r):
         """
         channelID     integer     ChannelID of pair-ohlc subscription